@@ -0,0 +1,115 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from benchmarks.replay_server import ReplayServer, load_pages
+from utils.extract import HEADERS, scrape_data
+from utils.load import get_sink
+from utils.session import PooledSession
+from utils.transform import transform_data
+
+# Sinks that run offline; google_sheets needs credentials and the network.
+OFFLINE_SINKS = {
+    'csv': ('products.csv', {}),
+    'parquet': ('products.parquet', {}),
+    'feather': ('products.feather', {}),
+    'database': ('products.db', {}),
+    'history': ('history', {})
+}
+
+def cpu_seconds():
+    # Includes finished child processes, so process-pool parsing is counted too.
+    children = os.times()
+    return time.process_time() + children.children_user + children.children_system
+
+def measure(stages, name, function, *args, **kwargs):
+    """
+    Runs function, records its wall and CPU seconds under name in stages and returns its result.
+    """
+    wall, cpu = time.perf_counter(), cpu_seconds()
+    result = function(*args, **kwargs)
+    stages[name] = {'wall': time.perf_counter() - wall, 'cpu': cpu_seconds() - cpu}
+    return result
+
+def run_benchmark(latency=0.0, jitter=0.0, error_rate=0.0, max_workers=8, parser='lxml', parse_workers=0,
+                  sinks=tuple(OFFLINE_SINKS), seed=0, pages=None):
+    """
+    Runs extract, transform and each offline sink against a local ReplayServer.
+    Returns a report dict with page/product throughput and per-stage wall and CPU seconds.
+    """
+    stages = {}
+    with ReplayServer(pages=pages, latency=latency, jitter=jitter, error_rate=error_rate, seed=seed) as server, \
+            PooledSession(headers=HEADERS, pool_maxsize=max(max_workers, 10), max_retries=8,
+                          backoff_factor=0.01, backoff_max=0.2) as session, \
+            tempfile.TemporaryDirectory() as directory:
+        df = measure(stages, 'extract', scrape_data, max_workers=max_workers, session=session, parser=parser,
+                     parse_workers=parse_workers, base_url=server.base_url)
+        if df.empty:
+            raise RuntimeError("Extraction returned no rows.")
+        pages_scraped = df['page_number'].nunique()
+        products = len(df)
+        transformed = measure(stages, 'transform', transform_data, df)
+        for name in sinks:
+            target, options = OFFLINE_SINKS[name]
+            measure(stages, f"load:{name}", get_sink(name), transformed, os.path.join(directory, target), **options)
+        http = session.stats
+        server_stats = dict(server.stats)
+
+    extract_wall = stages['extract']['wall']
+    return {
+        'pages': pages_scraped,
+        'products': products,
+        'rows_loaded': len(transformed),
+        'pages_per_sec': pages_scraped / extract_wall,
+        'products_per_sec': products / extract_wall,
+        'stages': stages,
+        'http': http,
+        'server': server_stats,
+        'config': {'latency': latency, 'jitter': jitter, 'error_rate': error_rate, 'max_workers': max_workers,
+                   'parser': parser, 'parse_workers': parse_workers}
+    }
+
+def format_report(report):
+    lines = [
+        f"pages: {report['pages']}, products: {report['products']}, rows loaded: {report['rows_loaded']}",
+        f"extract throughput: {report['pages_per_sec']:.1f} pages/s, {report['products_per_sec']:.1f} products/s",
+        f"http: {report['http']['requests']} requests, {report['http']['retries']} retries, "
+        f"server errors injected: {report['server']['errors']}",
+        f"{'stage':<18}{'wall':>10}{'cpu':>10}"
+    ]
+    for name, stage in report['stages'].items():
+        lines.append(f"{name:<18}{stage['wall'] * 1000:>8.1f}ms{stage['cpu'] * 1000:>8.1f}ms")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ETL pipeline offline against a local replay of the catalogue.")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random seconds per response, up to this value")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of responses that fail with 503")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--parser', default='lxml')
+    parser.add_argument('--parse-workers', type=int, default=0)
+    parser.add_argument('--sinks', default=','.join(OFFLINE_SINKS), help="comma-separated offline sinks to time")
+    parser.add_argument('--synthetic', action='store_true', help="ignore recordings and serve synthetic pages")
+    parser.add_argument('--json', metavar='PATH', help="also write the report as JSON")
+    parser.add_argument('--min-pages-per-sec', type=float, default=0.0, help="exit non-zero below this throughput")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    report = run_benchmark(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                           max_workers=args.workers, parser=args.parser, parse_workers=args.parse_workers,
+                           sinks=[name for name in args.sinks.split(',') if name],
+                           pages=load_pages(recordings_dir=None) if args.synthetic else None)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if report['pages_per_sec'] < args.min_pages_per_sec:
+        print(f"Throughput {report['pages_per_sec']:.1f} pages/s is below {args.min_pages_per_sec} pages/s", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
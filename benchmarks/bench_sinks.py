@@ -0,0 +1,59 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+import pandas as pd
+from benchmarks.bench_transform import make_synthetic_frame
+from utils.load import save_to_csv, save_to_feather, save_to_parquet
+from utils.transform import compact_dtypes, transform_data
+
+CATALOGUE_CSV = 'products.csv'
+
+FORMATS = [
+    ('csv', 'csv', lambda df, path: save_to_csv(df, path), pd.read_csv),
+    ('parquet-snappy', 'parquet', lambda df, path: save_to_parquet(df, path, compression='snappy'), pd.read_parquet),
+    ('parquet-zstd', 'parquet', lambda df, path: save_to_parquet(df, path, compression='zstd'), pd.read_parquet),
+    ('feather-lz4', 'feather', lambda df, path: save_to_feather(df, path, compression='lz4'), pd.read_feather),
+    ('feather-zstd', 'feather', lambda df, path: save_to_feather(df, path, compression='zstd'), pd.read_feather),
+]
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_frame(label, df, directory, repeat):
+    print(f"\n{label}: {len(df)} rows")
+    print(f"{'format':<16}{'write':>10}{'read':>10}{'size':>12}")
+    for name, extension, write, read in FORMATS:
+        path = os.path.join(directory, f"{label}-{name}.{extension}")
+        write_time = best_time(lambda: write(df, path), repeat)
+        read_time = best_time(lambda: read(path), repeat)
+        size = os.path.getsize(path)
+        print(f"{name:<16}{write_time * 1000:>8.1f}ms{read_time * 1000:>8.1f}ms{size / 1024:>10.1f}KB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV, Parquet and Feather sinks on write/read time and file size.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="rows in the synthetic transformed frame")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--compact', action='store_true', help="apply compact_dtypes before writing")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    frames = []
+    if os.path.exists(CATALOGUE_CSV):
+        frames.append(('catalogue', pd.read_csv(CATALOGUE_CSV)))
+    # transform_data drops most invalid synthetic rows, so resample its output up to the requested size.
+    synthetic = transform_data(make_synthetic_frame(args.rows))
+    frames.append(('synthetic', synthetic.sample(n=args.rows, replace=True, random_state=0).reset_index(drop=True)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, df in frames:
+            bench_frame(label, compact_dtypes(df) if args.compact else df, directory, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import logging
+import re
+import time
+import numpy as np
+import pandas as pd
+from utils.transform import transform_data
+
+def transform_data_rowwise(df):
+    """
+    The previous transform_data implementation (per-row Series.apply callbacks and repeated
+    filtered-slice assignments), kept here as the baseline and as the output-equivalence oracle.
+    """
+    try:
+        if df.empty:
+            return df
+
+        df = df.dropna(subset=['Title'])
+        df = df[~df['Title'].str.lower().isin(['unknown product', ''])]
+
+        df['Price'] = pd.to_numeric(df['Price'], errors='coerce').fillna(0)
+        df = df[df['Price'] > 0]
+        df['Price'] = df['Price'] * 16000
+
+        def extract_rating(rating_str):
+            if rating_str is None:
+                return 0.0
+            match = re.search(r'(\d+\.\d+|\d+)\s*/\s*5', rating_str)
+            return float(match.group(1)) if match else 0.0
+
+        df['Rating'] = df['Rating'].apply(extract_rating)
+        df = df[df['Rating'] >= 0]
+
+        def extract_colors(colors_str):
+            match = re.search(r'(\d+)\s*Colors?', colors_str)
+            return int(match.group(1)) if match else 0
+
+        df['Colors'] = df['Colors'].apply(extract_colors)
+        df = df[df['Colors'] > 0]
+
+        df['Size'] = df['Size'].str.replace('Size: ', '').str.strip()
+        df['Gender'] = df['Gender'].str.replace('Gender: ', '').str.strip()
+        df = df[(df['Size'] != '') & (df['Gender'] != '')]
+        df = df.drop_duplicates(subset=['Title'], keep='first')
+
+        df['Price'] = df['Price'].astype(float)
+        df['Rating'] = df['Rating'].astype(float)
+        df['Colors'] = df['Colors'].astype(int)
+        df['Size'] = df['Size'].astype(str)
+        df['Gender'] = df['Gender'].astype(str)
+        df['timestamp'] = df['timestamp'].astype(str)
+        df['page_number'] = df['page_number'].astype(int)
+
+        if df.isnull().any().any():
+            df = df.dropna()
+
+        if len(df) == 0:
+            return pd.DataFrame()
+
+        return df
+
+    except Exception:
+        return pd.DataFrame()
+
+def make_synthetic_frame(rows, seed=0):
+    """
+    Builds a raw scrape-shaped frame with realistic values plus the invalid cases transform_data
+    filters out (unknown titles, unavailable prices, missing colors, empty sizes, duplicates).
+    """
+    rng = np.random.default_rng(seed)
+    titles = np.array([f"Product {i}" for i in range(rows // 2)] + ["Unknown Product", ""], dtype=object)
+    prices = np.array(["102.15", "49.99", "250", "Price Unavailable", "invalid", "0"], dtype=object)
+    ratings = np.array(["4.5 / 5", "3.9 / 5", "Rating: 0.0 / 5", "Invalid Rating / 5", None, "5 / 5"], dtype=object)
+    colors = np.array(["3 Colors", "5 Colors", "1 Color", "Invalid Colors", "0 Colors"], dtype=object)
+    sizes = np.array(["M", "L", "XL", "S", "XXL", ""], dtype=object)
+    genders = np.array(["Men", "Women", "Unisex", ""], dtype=object)
+    return pd.DataFrame({
+        'Title': titles[rng.integers(0, len(titles), rows)],
+        'Price': prices[rng.integers(0, len(prices), rows)],
+        'Rating': ratings[rng.integers(0, len(ratings), rows)],
+        'Colors': colors[rng.integers(0, len(colors), rows)],
+        'Size': sizes[rng.integers(0, len(sizes), rows)],
+        'Gender': genders[rng.integers(0, len(genders), rows)],
+        'timestamp': '2025-05-12 02:19:26',
+        'page_number': rng.integers(1, 51, rows)
+    })
+
+def time_call(function, df, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(df.copy())
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized transform_data against the row-wise baseline.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    df = make_synthetic_frame(args.rows)
+
+    rowwise_time, expected = time_call(transform_data_rowwise, df, args.repeat)
+    vectorized_time, actual = time_call(transform_data, df, args.repeat)
+    pd.testing.assert_frame_equal(actual, expected)
+
+    print(f"rows: {args.rows}, kept: {len(actual)}")
+    print(f"row-wise:   {rowwise_time:.3f}s")
+    print(f"vectorized: {vectorized_time:.3f}s")
+    print(f"speedup:    {rowwise_time / vectorized_time:.1f}x")
+
+if __name__ == '__main__':
+    main()
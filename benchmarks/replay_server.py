@@ -0,0 +1,205 @@
+import argparse
+import html
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.extract import BASE_URL, HEADERS, TOTAL_PAGES, build_page_url
+from utils.session import PooledSession
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), 'recordings')
+PRODUCTS_PER_PAGE = 20
+PRODUCT_NAMES = ['T-shirt', 'Hoodie', 'Pants', 'Outerwear', 'Jacket', 'Shoes', 'Crewneck', 'Dress']
+SIZES = ['S', 'M', 'L', 'XL', 'XXL']
+GENDERS = ['Men', 'Women', 'Unisex']
+
+def pagination(page, total_pages):
+    """
+    Returns the pagination controls of a catalogue page: the neighbouring page links, a Next
+    link unless page is the last one, and a "Page X of Y" label.
+    """
+    items = []
+    for number in range(max(1, page - 2), min(total_pages, page + 2) + 1):
+        href = '/' if number == 1 else f'/page{number}'
+        items.append(f'<li class="page-item"><a class="page-link" href="{href}">{number}</a></li>')
+    if page < total_pages:
+        items.append(f'<li class="page-item next"><a class="page-link" href="/page{page + 1}">Next</a></li>')
+    return f'''
+    <ul class="pagination">{''.join(items)}</ul>
+    <p class="page-info">Page {page} of {total_pages}</p>'''
+
+def synthetic_page(page, products=PRODUCTS_PER_PAGE, seed=0, total_pages=TOTAL_PAGES):
+    """
+    Returns a catalogue page in the fashion-studio markup with deterministic products, including
+    the invalid cards the real site serves (unknown products, unavailable prices, missing ratings),
+    and pagination controls for a catalogue of total_pages pages.
+    """
+    rng = random.Random(seed * 100003 + page)
+    cards = []
+    for i in range(products):
+        number = (page - 1) * products + i + 1
+        kind = rng.random()
+        if kind < 0.05:
+            title, price = "Unknown Product", "Price Unavailable"
+        else:
+            title, price = f"{rng.choice(PRODUCT_NAMES)} {number}", f"${rng.uniform(10, 500):.2f}"
+        rating = "Not Rated" if kind > 0.95 else f"⭐ {rng.uniform(1, 5):.1f} / 5"
+        cards.append(f"""
+        <div class="collection-card">
+            <div class="product-details">
+                <h3 class="product-title">{html.escape(title)}</h3>
+                <div class="price-container"><span class="price">{price}</span></div>
+                <p style="font-size: 14px; color: #777;">Rating: {rating}</p>
+                <p style="font-size: 14px; color: #777;">{rng.randint(1, 8)} Colors</p>
+                <p style="font-size: 14px; color: #777;">Size: {rng.choice(SIZES)}</p>
+                <p style="font-size: 14px; color: #777;">Gender: {rng.choice(GENDERS)}</p>
+            </div>
+        </div>""")
+    return f"""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Fashion Studio</title></head>
+<body>
+    <div class="collection-grid" id="collectionList">{''.join(cards)}
+    </div>{pagination(page, total_pages)}
+</body>
+</html>
+"""
+
+def load_pages(recordings_dir=RECORDINGS_DIR, total_pages=TOTAL_PAGES, seed=0):
+    """
+    Returns {page: html body} for every page, from recordings_dir/page<N>.html where recorded
+    and synthetic otherwise.
+    """
+    pages = {}
+    for page in range(1, total_pages + 1):
+        path = os.path.join(recordings_dir, f"page{page}.html") if recordings_dir else None
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                pages[page] = f.read()
+        else:
+            pages[page] = synthetic_page(page, seed=seed, total_pages=total_pages)
+    return pages
+
+class ReplayServer:
+    """
+    A local HTTP server that serves catalogue pages under the same paths as the live site
+    ('/', '/page2', ...). Each response is delayed by latency seconds plus up to jitter
+    seconds, and fails with a 503 with probability error_rate.
+    Use as a context manager; base_url points the extractor at it.
+    """
+
+    def __init__(self, pages=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.pages = pages if pages is not None else load_pages(seed=seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'not_found': 0}
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def _handler(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body = replay.respond(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def respond(self, path):
+        """
+        Returns (status, body bytes) for a request path, applying latency and error injection.
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+
+        path = path.split('?', 1)[0].rstrip('/')
+        page = None
+        if path == '':
+            page = 1
+        elif path.startswith('/page') and path[len('/page'):].isdigit():
+            page = int(path[len('/page'):])
+        if page not in self.pages:
+            with self._lock:
+                self.stats['not_found'] += 1
+            return 404, b"Not Found"
+        if fail:
+            with self._lock:
+                self.stats['errors'] += 1
+            return 503, b"Service Unavailable"
+        return 200, self.pages[page].encode('utf-8')
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def record(out_dir=RECORDINGS_DIR, base_url=BASE_URL, total_pages=TOTAL_PAGES):
+    """
+    Saves the live catalogue pages into out_dir for later replay.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with PooledSession(headers=HEADERS) as session:
+        for page in range(1, total_pages + 1):
+            response = session.get(build_page_url(page, base_url))
+            response.raise_for_status()
+            with open(os.path.join(out_dir, f"page{page}.html"), 'w', encoding='utf-8') as f:
+                f.write(response.text)
+            print(f"Recorded page {page}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Record the catalogue or serve it locally for offline benchmarks.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help="save the live pages for replay")
+    record_parser.add_argument('--out', default=RECORDINGS_DIR)
+    serve_parser = commands.add_parser('serve', help="serve recorded or synthetic pages until interrupted")
+    serve_parser.add_argument('--latency', type=float, default=0.0)
+    serve_parser.add_argument('--jitter', type=float, default=0.0)
+    serve_parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.out)
+        return
+    with ReplayServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate) as server:
+        print(f"Serving catalogue at {server.base_url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
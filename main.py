@@ -1,35 +1,347 @@
-import logging
-from utils.extract import scrape_data
-from utils.transform import transform_data
-from utils.load import save_to_csv, save_to_google_sheets
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-def main():
-    """
-    Main function to run the ETL pipeline.
-    """
-    try:
-        logger.info("Starting extraction...")
-        df = scrape_data()
-        if df.empty:
-            raise ValueError("No data extracted from the website.")
-        
-        logger.info("Starting transformation...")
-        df_transformed = transform_data(df)
-        if df_transformed.empty:
-            raise ValueError("No data after transformation.")
-        
-        logger.info("Starting loading...")
-        save_to_csv(df_transformed, "products.csv")
-        save_to_google_sheets(df_transformed, "ETL_Pipeline_Results")
-        
-        logger.info("ETL pipeline completed successfully.")
-    
-    except Exception as e:
-        logger.error(f"ETL pipeline failed: {str(e)}")
-        raise
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import argparse
+import logging
+import os
+import sys
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The stage modules (pandas, requests, bs4, gspread/google-auth) are imported inside the functions
+# that need them, so `--help`, an extract-only run or a load without the Sheets sink skip the rest.
+
+MAX_WORKERS = 8
+# Per-host rate and concurrency start points and bounds; MAX_WORKERS stays the ceiling (see utils/ratelimit.py).
+ADAPTIVE_LIMITS = {'rate': 10.0, 'concurrency': 2, 'max_rate': 50.0}
+# Point the scraper at a mirror, e.g. benchmarks/replay_server.py, with SCRAPE_BASE_URL=http://127.0.0.1:8000/.
+# Unset means utils.extract.BASE_URL.
+SCRAPE_BASE_URL = os.environ.get("SCRAPE_BASE_URL")
+HTTP_CACHE_DIR = ".http_cache"
+# Page body hashes with their parsed records; unchanged pages are not parsed again.
+FINGERPRINT_PATH = ".fingerprints.json"
+# Titles of the last complete run; products are deduplicated on Title while extracting.
+# 'bloom' bounds the index's memory at DEDUP_CAPACITY titles for DEDUP_ERROR_RATE false positives.
+DEDUP_PATH = ".dedup_index"
+DEDUP_BACKEND = "set"
+DEDUP_CAPACITY = 100000
+DEDUP_ERROR_RATE = 0.01
+# Add an is_new column: True for products the last complete run did not have.
+FLAG_NEW_PRODUCTS = False
+# Pages come from the catalogue's pagination links; stop after this many consecutive pages without products.
+MAX_EMPTY_PAGES = 3
+# Per-page status and records of the last extraction; `python main.py --resume` continues from them.
+CHECKPOINT_DIR = ".checkpoints"
+# Sharded mode (`--workers N`): page ranges of SHARD_SIZE pages leased from a SQLite queue (see utils/workqueue.py).
+WORKQUEUE_PATH = "workqueue.db"
+SHARD_DIR = "shards"
+SHARD_SIZE = 10
+PARSER_BACKEND = "lxml"
+# Worker processes for the parse stage; 0 parses in the fetch threads, which is cheaper for 50 pages with lxml.
+PARSE_WORKERS = 0
+# Raw records written by `python main.py extract` and read by `python main.py transform` (.parquet or .csv).
+RAW_PATH = "raw_products.parquet"
+CSV_PATH = "products.csv"
+PARQUET_PATH = "products.parquet"
+FEATHER_PATH = "products.feather"
+DATABASE_PATH = "products.db"
+# Append-only, date-partitioned Parquet history of every run (see utils/history.py). Opt-in: add "history"
+# to LOAD_SINKS or `--sinks`; every run adds a part file, so the directory grows until compacted or pruned.
+HISTORY_DIR = "history"
+SPREADSHEET_NAME = "ETL_Pipeline_Results"
+# 'delta' writes only the rows that changed since the last run; 'replace' clears and rewrites the sheet.
+SHEETS_MODE = "delta"
+# Token, spreadsheet ID and share state reused by the next run (owner-readable only).
+SHEETS_STATE_PATH = ".sheets_state.json"
+# Store the transformed frame with categorical/small-integer/datetime columns (see utils.transform.COMPACT_DTYPES),
+# in every mode: each streamed batch and the merged shards are converted too.
+COMPACT_SCHEMA = False
+SINK_NAMES = ("csv", "parquet", "feather", "database", "history", "google_sheets")
+# Sinks the transformed frame is loaded into, concurrently; add "parquet"/"feather" for typed columnar copies
+# and "history" for the price history.
+# `--sinks` picks others for one run.
+LOAD_SINKS = ("csv", "database", "google_sheets")
+# Threads loading sinks at once; None gives every sink its own thread.
+LOAD_WORKERS = None
+# Counters and histograms of the run, written when main() finishes: Prometheus text, or JSON for a .json path.
+METRICS_PATH = "metrics.prom"
+
+def scrape_base_url():
+    from utils.extract import BASE_URL
+    return SCRAPE_BASE_URL or BASE_URL
+
+def extract_options(resume=False, pages=None):
+    """
+    Returns the scrape_data/scrape_batches options used by the pipeline. pages, a range of page
+    numbers, scrapes only those pages; the titles of such a partial run are not kept as the ones
+    the next run compares against.
+    """
+    from utils.cache import ResponseCache
+    from utils.checkpoint import CheckpointStore
+    from utils.dedup import DedupIndex
+    from utils.fingerprint import FingerprintStore
+    from utils.ratelimit import AdaptiveLimiter
+
+    return {
+        'max_workers': MAX_WORKERS,
+        'cache': ResponseCache(HTTP_CACHE_DIR),
+        'limiter': AdaptiveLimiter(**ADAPTIVE_LIMITS),
+        'fingerprints': FingerprintStore(FINGERPRINT_PATH),
+        'dedup': DedupIndex(DEDUP_PATH if pages is None else None, backend=DEDUP_BACKEND, capacity=DEDUP_CAPACITY, error_rate=DEDUP_ERROR_RATE,
+                            flag_new=FLAG_NEW_PRODUCTS),
+        'parser': PARSER_BACKEND,
+        'parse_workers': PARSE_WORKERS,
+        'base_url': scrape_base_url(),
+        'max_empty_pages': MAX_EMPTY_PAGES,
+        'checkpoint': CheckpointStore(CHECKPOINT_DIR),
+        'resume': resume,
+        'pages': pages
+    }
+
+def load_targets(sinks=None):
+    """
+    Returns the load_concurrently/load_stream targets for the named sinks (LOAD_SINKS by default).
+    """
+    files = {
+        'csv': ('csv', CSV_PATH),
+        'parquet': ('parquet', PARQUET_PATH, {'compression': 'zstd'}),
+        'feather': ('feather', FEATHER_PATH, {'compression': 'lz4'}),
+        'database': ('database', DATABASE_PATH),
+        'history': ('history', HISTORY_DIR)
+    }
+    targets = []
+    for name in sinks or LOAD_SINKS:
+        if name == 'google_sheets':
+            from utils.sheets import SheetsClientCache
+            targets.append(('google_sheets', SPREADSHEET_NAME, {
+                'mode': SHEETS_MODE,
+                'cache': SheetsClientCache(state_path=SHEETS_STATE_PATH)
+            }))
+        elif name in files:
+            targets.append(files[name])
+        else:
+            raise ValueError(f"Unknown sink '{name}'. Available: {', '.join(SINK_NAMES)}")
+    return targets
+
+def check_load(results):
+    """
+    Raises once every sink has finished if any of them failed; the others are already loaded.
+    """
+    failed = [result['sink'] for result in results if result['status'] != 'ok']
+    if failed:
+        raise RuntimeError(f"Loading failed for: {', '.join(failed)}")
+    return results
+
+def load_all(df, sinks=None):
+    from utils.load import load_concurrently
+    return check_load(load_concurrently(df, load_targets(sinks), max_workers=LOAD_WORKERS))
+
+def run_streaming(resume=False, sinks=None, pages=None):
+    """
+    Streams page batches from extraction through transformation into the sinks, so the CSV file
+    (a batch sink) is written while later pages are still being scraped. The other sinks need the
+    whole table and are loaded concurrently once the stream ends.
+    """
+    from utils.extract import scrape_batches
+    from utils.load import load_stream
+    from utils.transform import transform_batches
+
+    logger.info("Starting streaming extraction, transformation and loading...")
+    batches = transform_batches(scrape_batches(**extract_options(resume, pages)))
+    if COMPACT_SCHEMA:
+        batches = (compact(batch, report=False) for batch in batches)
+    check_load(load_stream(batches, load_targets(sinks), max_workers=LOAD_WORKERS))
+
+def run_sharded(processes, resume=False, sinks=None):
+    """
+    Scrapes the catalogue with processes local workers that lease page ranges from the work queue,
+    then merges the shard files, transforms and deduplicates them and loads the result.
+    With resume=True the queue of an interrupted run is continued instead of started afresh.
+    """
+    from utils.extract import HEADERS
+    from utils.session import PooledSession
+    from utils.workqueue import WorkQueue, discover_last_page, merge_shards, reset_run, run_workers
+
+    if not resume:
+        reset_run(WORKQUEUE_PATH, SHARD_DIR)
+    with PooledSession(headers=HEADERS) as session:
+        WorkQueue(WORKQUEUE_PATH).seed(discover_last_page(session, scrape_base_url()), SHARD_SIZE)
+    timed_stage('extract', run_workers, processes, WORKQUEUE_PATH, SHARD_DIR, max_workers=MAX_WORKERS,
+                parser=PARSER_BACKEND, base_url=scrape_base_url())
+    df_transformed = timed_stage('transform', merge_shards, SHARD_DIR, WORKQUEUE_PATH)
+    if COMPACT_SCHEMA:
+        df_transformed = compact(df_transformed)
+    logger.info("Starting loading...")
+    timed_stage('load', load_all, df_transformed, sinks)
+
+def timed_stage(stage, function, *args, **kwargs):
+    """
+    Runs one pipeline stage and records its wall time in the pipeline_stage_seconds histogram.
+    """
+    from utils.metrics import STAGE_SECONDS
+
+    started = time.perf_counter()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+def extract(resume=False, pages=None):
+    """
+    Scrapes the catalogue into a DataFrame of raw records.
+    """
+    from utils.extract import scrape_data
+
+    logger.info("Starting extraction...")
+    df = timed_stage('extract', scrape_data, **extract_options(resume, pages))
+    if df.empty:
+        raise ValueError("No data extracted from the website.")
+    return df
+
+def transform(df):
+    """
+    Transforms raw records, converting them to the compact schema when COMPACT_SCHEMA is set.
+    """
+    from utils.transform import transform_data
+
+    logger.info("Starting transformation...")
+    df_transformed = timed_stage('transform', transform_data, df)
+    if df_transformed.empty:
+        raise ValueError("No data after transformation.")
+
+    if COMPACT_SCHEMA:
+        df_transformed = compact(df_transformed)
+    return df_transformed
+
+def compact(df, report=True):
+    """
+    Converts a transformed frame to the compact schema, logging the memory saved when report is set.
+    """
+    from utils.transform import compact_dtypes, memory_report
+
+    df_compact = compact_dtypes(df)
+    if report:
+        memory_report(df, df_compact)
+    return df_compact
+
+def run_pipeline(stream=False, resume=False, workers=0, sinks=None, pages=None):
+    if workers:
+        run_sharded(workers, resume, sinks)
+    elif stream:
+        timed_stage('streaming', run_streaming, resume, sinks, pages)
+    else:
+        df_transformed = transform(extract(resume=resume, pages=pages))
+        logger.info("Starting loading...")
+        timed_stage('load', load_all, df_transformed, sinks)
+
+def run_extract(output=RAW_PATH, resume=False, pages=None):
+    """
+    Scrapes the catalogue and saves the raw records to output (Parquet, or CSV for a .csv path)
+    for a later `transform` run.
+    """
+    from utils.load import get_sink
+
+    df = extract(resume=resume, pages=pages)
+    get_sink('csv' if output.lower().endswith('.csv') else 'parquet')(df, output)
+
+def run_transform(input_path=RAW_PATH, sinks=None):
+    """
+    Transforms the raw records saved by run_extract and loads them into the sinks.
+    """
+    import pandas as pd
+
+    logger.info(f"Reading raw records from {input_path}")
+    if input_path.lower().endswith('.csv'):
+        df = pd.read_csv(input_path, dtype={'Title': str}, keep_default_na=False)
+    else:
+        df = pd.read_parquet(input_path)
+    df_transformed = transform(df)
+    logger.info("Starting loading...")
+    timed_stage('load', load_all, df_transformed, sinks)
+
+def run_command(name, function, *args, **kwargs):
+    """
+    Runs one CLI command and writes the run's metrics to METRICS_PATH at the end, also when it fails.
+    """
+    try:
+        function(*args, **kwargs)
+        logger.info(f"{name} completed successfully.")
+    except Exception as e:
+        logger.error(f"{name} failed: {str(e)}")
+        raise
+    finally:
+        if METRICS_PATH:
+            from utils.metrics import REGISTRY
+            REGISTRY.write(METRICS_PATH)
+
+def main(stream=False, resume=False, workers=0, sinks=None, pages=None):
+    """
+    Main function to run the ETL pipeline.
+    With stream=True, records flow through the pipeline page by page instead of as one DataFrame.
+    With workers > 0, that many processes scrape shards of the catalogue through the work queue.
+    With resume=True, pages checkpointed (or shards completed) by an interrupted run are not scraped again.
+    sinks names the sinks to load (LOAD_SINKS by default) and pages, a range of page numbers,
+    limits the scrape to those pages.
+    The run's metrics are written to METRICS_PATH at the end, also when it fails.
+    """
+    run_command("ETL pipeline", run_pipeline, stream, resume, workers, sinks, pages)
+
+def page_range(text):
+    """
+    Parses a --pages value, "N" or "FIRST-LAST", into a range of page numbers.
+    """
+    first, _, last = text.partition('-')
+    try:
+        first, last = int(first), int(last or first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected N or FIRST-LAST, got '{text}'")
+    if not 1 <= first <= last:
+        raise argparse.ArgumentTypeError(f"expected 1 <= FIRST <= LAST, got '{text}'")
+    return range(first, last + 1)
+
+COMMANDS = ('run', 'extract', 'transform')
+
+def parse_args(argv=None):
+    """
+    Parses the command line. Without a command, `run` is assumed, so `python main.py --stream` still works.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0].startswith('-') and argv[0] not in ('-h', '--help')):
+        argv = ['run'] + argv
+
+    parser = argparse.ArgumentParser(description="Scrape the fashion-studio catalogue, transform it and load it into the configured sinks.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scrape_options = argparse.ArgumentParser(add_help=False)
+    scrape_options.add_argument('--resume', action='store_true',
+                                help=f"skip pages an interrupted run checkpointed in {CHECKPOINT_DIR}; re-scrape failed or missing ones")
+    scrape_options.add_argument('--pages', type=page_range, metavar='N|FIRST-LAST',
+                                help="scrape only these pages instead of following the pagination links")
+    sink_options = argparse.ArgumentParser(add_help=False)
+    sink_options.add_argument('--sinks', nargs='+', choices=SINK_NAMES, metavar='SINK',
+                              help=f"sinks to load ({', '.join(SINK_NAMES)}); default: {' '.join(LOAD_SINKS)}")
+
+    run_parser = commands.add_parser('run', parents=[scrape_options, sink_options], help="extract, transform and load (the default)")
+    run_parser.add_argument('--stream', action='store_true', help="move records through the pipeline page by page")
+    run_parser.add_argument('--workers', type=int, default=0,
+                     help=f"scrape with this many processes sharing the work queue in {WORKQUEUE_PATH}")
+    extract_parser = commands.add_parser('extract', parents=[scrape_options], help="scrape and save the raw records only")
+    extract_parser.add_argument('--output', default=RAW_PATH, help=f"raw records file, .parquet or .csv (default: {RAW_PATH})")
+    transform_parser = commands.add_parser('transform', parents=[sink_options], help="transform a saved raw file and load it")
+    transform_parser.add_argument('--input', default=RAW_PATH, help=f"raw records file written by extract (default: {RAW_PATH})")
+
+    args = parser.parse_args(argv)
+    if args.command == 'run' and args.workers and args.pages:
+        parser.error("--pages cannot be combined with --workers; shards cover the whole catalogue.")
+    return args
+
+def cli(argv=None):
+    args = parse_args(argv)
+    if args.command == 'extract':
+        run_command("Extraction", run_extract, args.output, args.resume, args.pages)
+    elif args.command == 'transform':
+        run_command("Transformation", run_transform, args.input, args.sinks)
+    else:
+        main(stream=args.stream, resume=args.resume, workers=args.workers, sinks=args.sinks, pages=args.pages)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,47 @@
+import unittest
+import requests
+from benchmarks.bench_pipeline import OFFLINE_SINKS, format_report, run_benchmark
+from benchmarks.replay_server import ReplayServer, load_pages, synthetic_page
+from utils.extract import parse_products, scrape_data
+
+class TestReplayBenchmark(unittest.TestCase):
+    def test_replay_server_serves_catalogue_paths(self):
+        with ReplayServer(pages={1: "<html>one</html>", 2: "<html>two</html>"}) as server:
+            self.assertEqual(requests.get(server.base_url).text, "<html>one</html>")
+            self.assertEqual(requests.get(f"{server.base_url}page2").text, "<html>two</html>")
+            self.assertEqual(requests.get(f"{server.base_url}page3").status_code, 404)
+        self.assertEqual(server.stats['requests'], 3)
+
+    def test_replay_server_injects_errors(self):
+        with ReplayServer(pages={1: "<html></html>"}, error_rate=1.0) as server:
+            self.assertEqual(requests.get(server.base_url).status_code, 503)
+        self.assertEqual(server.stats['errors'], 1)
+
+    def test_synthetic_pages_parse_like_the_catalogue(self):
+        self.assertEqual(synthetic_page(3), synthetic_page(3))
+        records = parse_products(synthetic_page(3), 3, parser='lxml')
+        self.assertTrue(0 < len(records) <= 20)
+        self.assertEqual(len(load_pages(recordings_dir=None)), 50)
+
+    def test_pipeline_benchmark_smoke(self):
+        expected = sum(len(parse_products(html, page, parser='lxml')) for page, html in load_pages(recordings_dir=None).items())
+        report = run_benchmark(error_rate=0.1, max_workers=4, pages=load_pages(recordings_dir=None))
+        self.assertEqual(report['pages'], 50)
+        self.assertEqual(report['products'], expected)
+        self.assertGreater(report['pages_per_sec'], 0)
+        self.assertEqual(list(report['stages']), ['extract', 'transform'] + [f"load:{name}" for name in OFFLINE_SINKS])
+        self.assertEqual(report['http']['retries'], report['server']['errors'])
+        self.assertIn('pages/s', format_report(report))
+
+    def test_scrape_discovers_a_grown_catalogue(self):
+        pages = load_pages(recordings_dir=None, total_pages=60)
+        for parse_workers in (0, 2):
+            with self.subTest(parse_workers=parse_workers), ReplayServer(pages=pages) as server:
+                df = scrape_data(max_workers=4, parser='lxml', parse_workers=parse_workers, base_url=server.base_url)
+                self.assertEqual(df['page_number'].max(), 60)
+                self.assertEqual(df['page_number'].nunique(), 60)
+                self.assertEqual(server.stats['requests'], 60)
+                self.assertEqual(server.stats['not_found'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
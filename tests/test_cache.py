@@ -0,0 +1,148 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.cache import ResponseCache, atomic_write
+from utils.extract import fetch_page
+from utils.metrics import BYTES_DOWNLOADED
+from utils.session import PooledSession
+from unittest.mock import patch, MagicMock
+
+def make_response(body, headers=None):
+    response = MagicMock()
+    response.status_code = 200
+    response.content = body
+    response.encoding = 'utf-8'
+    response.headers = headers if headers is not None else {'ETag': '"v1"'}
+    return response
+
+class ETagHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body = b"<html>catalogue</html>"
+    etag = '"v1"'
+    full_responses = 0
+    not_modified = 0
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.etag:
+            type(self).not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        type(self).full_responses += 1
+        self.send_response(200)
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_atomic_write(self):
+        path = os.path.join(self.directory, 'file.bin')
+        atomic_write(path, b"data")
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"data")
+        self.assertEqual(os.listdir(self.directory), ['file.bin'])
+
+    def test_put_and_conditional_headers(self):
+        cache = ResponseCache(self.directory)
+        self.assertTrue(cache.put('http://x/', make_response(b"body", {'ETag': '"abc"', 'Last-Modified': 'Mon, 05 May 2025 00:00:00 GMT'})))
+        headers = cache.conditional_headers('http://x/')
+        self.assertEqual(headers['If-None-Match'], '"abc"')
+        self.assertEqual(headers['If-Modified-Since'], 'Mon, 05 May 2025 00:00:00 GMT')
+
+    def test_skips_responses_without_validators(self):
+        cache = ResponseCache(self.directory)
+        self.assertFalse(cache.put('http://x/', make_response(b"body", {})))
+        self.assertEqual(len(cache), 0)
+
+    def test_persists_across_instances(self):
+        ResponseCache(self.directory).put('http://x/', make_response(b"body"))
+        cache = ResponseCache(self.directory)
+        self.assertEqual(len(cache), 1)
+        cached = cache.revalidated('http://x/', make_response(b"", {}))
+        self.assertEqual(cached.content, b"body")
+        self.assertEqual(cached.status_code, 200)
+        self.assertTrue(cached.from_cache)
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(self.directory, ttl=60)
+        with patch('utils.cache.time.time', return_value=1000.0):
+            cache.put('http://x/', make_response(b"body"))
+        with patch('utils.cache.time.time', return_value=1061.0):
+            self.assertIsNone(cache.get('http://x/'))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_size_bounded_eviction(self):
+        cache = ResponseCache(self.directory, ttl=None, max_bytes=10)
+        with patch('utils.cache.time.time', return_value=1000.0):
+            cache.put('http://a/', make_response(b"aaaaaa"))
+        with patch('utils.cache.time.time', return_value=1001.0):
+            cache.put('http://b/', make_response(b"bbbbbb"))
+        self.assertIsNone(cache.get('http://a/'))
+        self.assertIsNotNone(cache.get('http://b/'))
+        self.assertLessEqual(cache.total_bytes, 10)
+
+    def test_drops_corrupt_entries(self):
+        cache = ResponseCache(self.directory)
+        cache.put('http://x/', make_response(b"body"))
+        meta_file = [name for name in os.listdir(self.directory) if name.endswith('.json')][0]
+        with open(os.path.join(self.directory, meta_file), 'w') as f:
+            f.write("{not json")
+        self.assertEqual(len(ResponseCache(self.directory)), 0)
+
+    def test_session_revalidates_with_conditional_request(self):
+        ETagHandler.full_responses = 0
+        ETagHandler.not_modified = 0
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ETagHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/"
+            with PooledSession(cache=ResponseCache(self.directory)) as session:
+                first = session.get(url)
+            with PooledSession(cache=ResponseCache(self.directory)) as session:
+                second = session.get(url)
+                stats = session.stats
+            self.assertEqual(first.text, "<html>catalogue</html>")
+            self.assertEqual(second.text, "<html>catalogue</html>")
+            self.assertEqual(ETagHandler.full_responses, 1)
+            self.assertEqual(ETagHandler.not_modified, 1)
+            self.assertEqual(stats['cache_hits'], 1)
+            self.assertEqual(stats['cache_misses'], 0)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_revalidated_pages_count_no_downloaded_bytes(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ETagHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/"
+            with PooledSession(cache=ResponseCache(self.directory)) as session:
+                before = BYTES_DOWNLOADED.value()
+                fetch_page(1, session, url)
+                self.assertEqual(BYTES_DOWNLOADED.value() - before, len(ETagHandler.body))
+                fetch_page(1, session, url)
+                self.assertEqual(BYTES_DOWNLOADED.value() - before, len(ETagHandler.body))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
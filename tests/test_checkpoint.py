@@ -0,0 +1,90 @@
+import unittest
+import os
+import tempfile
+import requests
+from unittest.mock import patch, MagicMock
+from utils.checkpoint import CheckpointStore
+from utils.extract import scrape_data
+
+def make_get(requested, down_from=None):
+    def fake_get(url, **kwargs):
+        page = 1 if url.endswith('/') else int(url.rsplit('page', 1)[1])
+        requested.append(page)
+        if down_from is not None and page >= down_from:
+            raise requests.ConnectionError("Mocked network drop")
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<html><body></body></html>" if page == 5 else f"""
+        <div class="collection-card">
+            <h3 class="product-title">Product {page}</h3>
+            <span class="price">$10</span>
+            <p style="font-size: 14px; color: #777;">Size: M</p>
+            <p style="font-size: 14px; color: #777;">Gender: Men</p>
+        </div>
+        """
+        return mock_response
+    return fake_get
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, 'checkpoints')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_and_load(self):
+        store = CheckpointStore(self.directory)
+        store.save(1, 'ok', [{'Title': 'Product 1', 'Price': 10.0}], last_page=50)
+        store.save(2, 'empty')
+        store.save(3, 'failed', error="fetch failed: timeout")
+        checkpoint = store.load(1)
+        self.assertEqual(checkpoint['records'], [{'Title': 'Product 1', 'Price': 10.0}])
+        self.assertEqual(checkpoint['last_page'], 50)
+        self.assertEqual(store.load(3)['error'], "fetch failed: timeout")
+        self.assertIsNone(store.load(4))
+        self.assertEqual(store.pages(), [1, 2, 3])
+        self.assertEqual(sorted(store.completed()), [1, 2])
+        self.assertEqual([name for name in os.listdir(self.directory) if name.startswith('.tmp-')], [])
+        with self.assertRaises(ValueError):
+            store.save(4, 'done')
+        store.clear()
+        self.assertEqual(store.pages(), [])
+
+    def test_partial_checkpoint_is_treated_as_missing(self):
+        store = CheckpointStore(self.directory)
+        store.save(1, 'ok', [{'Title': 'Product 1'}])
+        with open(os.path.join(self.directory, 'page2.json'), 'w') as f:
+            f.write('{"page": 2, "status": "ok", "reco')
+        self.assertIsNone(store.load(2))
+        self.assertEqual(list(store.completed()), [1])
+
+    @patch('utils.session.time.sleep')
+    @patch('requests.Session.get')
+    def test_resume_scrapes_only_failed_and_missing_pages(self, mock_get, mock_sleep):
+        for parse_workers in (0, 2):
+            with self.subTest(parse_workers=parse_workers):
+                store = CheckpointStore(self.directory)
+                requested = []
+                mock_get.side_effect = make_get(requested, down_from=38)
+                df = scrape_data(max_workers=4, parse_workers=parse_workers, checkpoint=store)
+                self.assertEqual(df['page_number'].max(), 37)
+                self.assertEqual(store.load(38)['status'], 'failed')
+                self.assertEqual(store.load(5)['status'], 'empty')
+
+                requested = []
+                mock_get.side_effect = make_get(requested)
+                df = scrape_data(max_workers=4, parse_workers=parse_workers, checkpoint=store, resume=True)
+                self.assertEqual(sorted(requested), list(range(38, 51)))
+                self.assertEqual(df['page_number'].tolist(), [page for page in range(1, 51) if page != 5])
+                self.assertEqual(sorted(store.completed()), list(range(1, 51)))
+
+                # Without resume the checkpoints are discarded and every page is scraped again.
+                requested = []
+                mock_get.side_effect = make_get(requested)
+                scrape_data(max_workers=4, parse_workers=parse_workers, checkpoint=store)
+                self.assertEqual(sorted(requested), list(range(1, 51)))
+                store.clear()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from benchmarks.replay_server import ReplayServer, load_pages, synthetic_page
+from utils.dedup import BloomFilter, DedupIndex, MemoryIndex, read_index, write_index
+from utils.extract import scrape_data
+from utils.transform import is_valid_record, transform_data
+
+def product(title):
+    return {'Title': title, 'Price': 10.0, 'Rating': '4.5 / 5', 'Colors': '3 Colors', 'Size': 'M', 'Gender': 'Men'}
+
+class TestDedup(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'dedup_index')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_bloom_filter_stays_near_its_error_rate(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        # A new key reads as seen with the error rate; that share of adds reports a duplicate.
+        self.assertGreater(sum(bloom.add(f"Product {i}") for i in range(2000)), 1960)
+        self.assertFalse(bloom.add("Product 7"))
+        self.assertTrue(all(f"Product {i}" in bloom for i in range(2000)))
+        false_positives = sum(f"Other {i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 200)
+        # About 9.6 bits per key at 1%.
+        self.assertLess(bloom.size_bytes, 2500)
+
+    def test_indexes_round_trip(self):
+        for index in (MemoryIndex(), BloomFilter(100, 0.001)):
+            with self.subTest(backend=index.backend):
+                for title in ("T-shirt 1", "Jacket 2", "Hoodie\n3"):
+                    index.add(title)
+                write_index(index, self.path)
+                loaded = read_index(self.path)
+                self.assertEqual(type(loaded), type(index))
+                self.assertEqual(len(loaded), 3)
+                self.assertIn("Hoodie\n3", loaded)
+                self.assertNotIn("Pants 4", loaded)
+
+        with open(self.path, 'wb') as f:
+            f.write(b'{"backend": "bloom", "capacity": 100')
+        self.assertIsNone(read_index(self.path))
+
+    def test_filter_drops_duplicates_and_flags_new_products(self):
+        first = DedupIndex(self.path, flag_new=True)
+        records = [product('T-shirt 1'), product('Jacket 2'), product('T-shirt 1')]
+        self.assertEqual(first.filter(records), [{**product('T-shirt 1'), 'is_new': True}, {**product('Jacket 2'), 'is_new': True}])
+        self.assertEqual(first.stats, {'kept': 2, 'duplicate': 1, 'new': 2})
+        first.save()
+
+        for backend in ('set', 'bloom'):
+            with self.subTest(backend=backend):
+                second = DedupIndex(self.path, backend=backend, capacity=1000, flag_new=True)
+                kept = second.filter([product('Jacket 2'), product('Hoodie 3'), product('Hoodie 3')])
+                self.assertEqual([record['is_new'] for record in kept], [False, True])
+
+    def test_invalid_record_does_not_shadow_a_later_valid_one(self):
+        record = {'Title': 'Hoodie 7', 'Price': 25.0, 'Rating': '4.5 / 5', 'Size': 'M', 'Gender': 'Men',
+                  'timestamp': '2025-05-05 00:00:00', 'page_number': 1}
+        records = [{**record, 'Colors': '0 Colors'}, {**record, 'Colors': '3 Colors'}]
+        self.assertEqual([is_valid_record(r) for r in records], [False, True])
+        plain = transform_data(pd.DataFrame(records))
+        deduped = transform_data(pd.DataFrame(DedupIndex().filter(records)))
+        self.assertEqual(len(plain), 1)
+        self.assertEqual(deduped['Colors'].tolist(), plain['Colors'].tolist())
+        for invalid in ({**record, 'Colors': '3 Colors', 'Title': 'Unknown Product'}, {**record, 'Colors': '3 Colors', 'Price': 0},
+                        {**record, 'Colors': '3 Colors', 'Size': ' '}, {**record, 'Colors': '3 Colors', 'Gender': 'Gender: '}):
+            with self.subTest(invalid=invalid):
+                self.assertFalse(is_valid_record(invalid))
+                self.assertTrue(transform_data(pd.DataFrame([invalid])).empty)
+
+    def test_scrape_drops_duplicates_as_pages_arrive(self):
+        pages = load_pages(recordings_dir=None, total_pages=8)
+        # Page 5 repeats page 2's products, as a catalogue that reshuffles between requests can.
+        pages[5] = synthetic_page(2, total_pages=8)
+        for parse_workers in (0, 2):
+            with self.subTest(parse_workers=parse_workers), ReplayServer(pages=pages) as server:
+                DedupIndex(self.path).clear()
+                plain = scrape_data(max_workers=4, parser='lxml', parse_workers=parse_workers, base_url=server.base_url)
+                deduped = scrape_data(max_workers=4, parser='lxml', parse_workers=parse_workers, base_url=server.base_url,
+                                      dedup=DedupIndex(self.path))
+                self.assertFalse(deduped['Title'].duplicated().any())
+                self.assertEqual(len(plain) - len(deduped), int((plain['page_number'] == 2).sum()))
+                self.assertEqual(transform_data(deduped)['Title'].tolist(), transform_data(plain)['Title'].tolist())
+
+                pages[7] = synthetic_page(7, seed=1, total_pages=8)
+                flagged = scrape_data(max_workers=4, parser='lxml', parse_workers=parse_workers, base_url=server.base_url,
+                                      dedup=DedupIndex(self.path, flag_new=True))
+                self.assertEqual(flagged[flagged['is_new']]['page_number'].unique().tolist(), [7])
+                pages[7] = synthetic_page(7, total_pages=8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,139 +1,408 @@
-import unittest
-from utils.extract import scrape_data
-import pandas as pd
-from unittest.mock import patch, MagicMock
-import requests
-
-class TestExtract(unittest.TestCase):
-    @patch('requests.get')
-    def test_scrape_data_success(self, mock_get):
-        # Simulate only one page with a product
-        mock_response = MagicMock()
-        mock_response.text = """
-        <html>
-        <body>
-            <div class="collection-card">
-                <h3 class="product-title">Test Product</h3>
-                <span class="price">$100</span>
-                <p style="font-size: 14px; color: #777;">Rating: ⭐ 4.5 / 5</p>
-                <p style="font-size: 14px; color: #777;">3 Colors</p>
-                <p style="font-size: 14px; color: #777;">Size: M</p>
-                <p style="font-size: 14px; color: #777;">Gender: Men</p>
-            </div>
-        </body>
-        </html>
-        """
-        mock_response.raise_for_status = MagicMock()
-
-        mock_empty_response = MagicMock()
-        mock_empty_response.text = "<html><body></body></html>"
-        mock_empty_response.raise_for_status = MagicMock()
-
-        mock_get.side_effect = [mock_response] + [mock_empty_response] * 49
-
-        df = scrape_data()
-        self.assertFalse(df.empty, "DataFrame should not be empty for valid product")
-        self.assertEqual(len(df), 1, "Should scrape one product")
-        self.assertEqual(df['Title'].iloc[0], "Test Product")
-        self.assertEqual(df['Price'].iloc[0], 100.0)
-        self.assertEqual(df['Rating'].iloc[0], "4.5 / 5")
-        self.assertEqual(df['Colors'].iloc[0], "3 Colors")
-        self.assertEqual(df['Size'].iloc[0], "M")
-        self.assertEqual(df['Gender'].iloc[0], "Men")
-
-    @patch('requests.get')
-    def test_scrape_data_request_failure(self, mock_get):
-        mock_get.side_effect = requests.RequestException("Mocked request failure")
-        df = scrape_data()
-        self.assertTrue(df.empty, "DataFrame should be empty on request failure")
-
-    @patch('requests.get')
-    def test_scrape_data_no_products(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.text = "<html><body></body></html>"
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
-        df = scrape_data()
-        self.assertTrue(df.empty, "DataFrame should be empty when no products are found")
-
-    @patch('requests.get')
-    def test_scrape_data_invalid_product(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.text = """
-        <html>
-        <body>
-            <div class="collection-card">
-                <p style="font-size: 14px; color: #777;">Rating: Not Rated</p>
-            </div>
-        </body>
-        </html>
-        """
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
-        df = scrape_data()
-        self.assertTrue(df.empty, "DataFrame should be empty for invalid product with missing critical fields")
-
-    @patch('requests.get')
-    def test_scrape_data_columns(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.text = """
-        <html>
-        <body>
-            <div class="collection-card">
-                <h3 class="product-title">Test Product</h3>
-                <span class="price">$100</span>
-                <p style="font-size: 14px; color: #777;">Rating: ⭐ 4.5 / 5</p>
-                <p style="font-size: 14px; color: #777;">3 Colors</p>
-                <p style="font-size: 14px; color: #777;">Size: M</p>
-                <p style="font-size: 14px; color: #777;">Gender: Men</p>
-            </div>
-        </body>
-        </html>
-        """
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
-        df = scrape_data()
-        expected_columns = {'Title', 'Price', 'Rating', 'Colors', 'Size', 'Gender', 'timestamp', 'page_number'}
-        self.assertEqual(set(df.columns), expected_columns, "Columns should match expected set")
-
-    @patch('requests.get')
-    def test_scrape_data_attribute_error(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.text = """
-        <html>
-        <body>
-            <div class="collection-card">
-                <h3>Invalid</h3> <!-- Simulate missing product-title class -->
-            </div>
-        </body>
-        </html>
-        """
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
-        df = scrape_data()
-        self.assertTrue(df.empty, "DataFrame should be empty on AttributeError")
-
-    @patch('requests.get')
-    def test_scrape_data_invalid_price_format(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.text = """
-        <html>
-        <body>
-            <div class="collection-card">
-                <h3 class="product-title">Test Product</h3>
-                <span class="price">invalid_price</span>
-                <p style="font-size: 14px; color: #777;">Rating: ⭐ 4.5 / 5</p>
-                <p style="font-size: 14px; color: #777;">3 Colors</p>
-                <p style="font-size: 14px; color: #777;">Size: M</p>
-                <p style="font-size: 14px; color: #777;">Gender: Men</p>
-            </div>
-        </body>
-        </html>
-        """
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
-        df = scrape_data()
-        self.assertTrue(df.empty, "DataFrame should be empty for invalid price format")
-
-if __name__ == '__main__':
+import unittest
+import threading
+import time
+from utils.extract import PageFrontier, build_page_url, scrape_batches, scrape_data
+from utils.session import PooledSession
+import pandas as pd
+from unittest.mock import patch, MagicMock
+import requests
+
+class TestExtract(unittest.TestCase):
+    @patch('requests.Session.get')
+    def test_scrape_data_success(self, mock_get):
+        # Simulate only one page with a product
+        mock_response = MagicMock()
+        mock_response.text = """
+        <html>
+        <body>
+            <div class="collection-card">
+                <h3 class="product-title">Test Product</h3>
+                <span class="price">$100</span>
+                <p style="font-size: 14px; color: #777;">Rating: ⭐ 4.5 / 5</p>
+                <p style="font-size: 14px; color: #777;">3 Colors</p>
+                <p style="font-size: 14px; color: #777;">Size: M</p>
+                <p style="font-size: 14px; color: #777;">Gender: Men</p>
+            </div>
+        </body>
+        </html>
+        """
+        mock_response.raise_for_status = MagicMock()
+
+        mock_empty_response = MagicMock()
+        mock_empty_response.text = "<html><body></body></html>"
+        mock_empty_response.raise_for_status = MagicMock()
+
+        mock_get.side_effect = [mock_response] + [mock_empty_response] * 49
+
+        df = scrape_data()
+        self.assertFalse(df.empty, "DataFrame should not be empty for valid product")
+        self.assertEqual(len(df), 1, "Should scrape one product")
+        self.assertEqual(df['Title'].iloc[0], "Test Product")
+        self.assertEqual(df['Price'].iloc[0], 100.0)
+        self.assertEqual(df['Rating'].iloc[0], "4.5 / 5")
+        self.assertEqual(df['Colors'].iloc[0], "3 Colors")
+        self.assertEqual(df['Size'].iloc[0], "M")
+        self.assertEqual(df['Gender'].iloc[0], "Men")
+
+    @patch('requests.Session.get')
+    def test_scrape_data_request_failure(self, mock_get):
+        mock_get.side_effect = requests.RequestException("Mocked request failure")
+        df = scrape_data()
+        self.assertTrue(df.empty, "DataFrame should be empty on request failure")
+
+    @patch('requests.Session.get')
+    def test_scrape_data_no_products(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.text = "<html><body></body></html>"
+        mock_response.raise_for_status = MagicMock()
+        mock_get.return_value = mock_response
+        df = scrape_data()
+        self.assertTrue(df.empty, "DataFrame should be empty when no products are found")
+
+    @patch('requests.Session.get')
+    def test_scrape_data_invalid_product(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.text = """
+        <html>
+        <body>
+            <div class="collection-card">
+                <p style="font-size: 14px; color: #777;">Rating: Not Rated</p>
+            </div>
+        </body>
+        </html>
+        """
+        mock_response.raise_for_status = MagicMock()
+        mock_get.return_value = mock_response
+        df = scrape_data()
+        self.assertTrue(df.empty, "DataFrame should be empty for invalid product with missing critical fields")
+
+    @patch('requests.Session.get')
+    def test_scrape_data_columns(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.text = """
+        <html>
+        <body>
+            <div class="collection-card">
+                <h3 class="product-title">Test Product</h3>
+                <span class="price">$100</span>
+                <p style="font-size: 14px; color: #777;">Rating: ⭐ 4.5 / 5</p>
+                <p style="font-size: 14px; color: #777;">3 Colors</p>
+                <p style="font-size: 14px; color: #777;">Size: M</p>
+                <p style="font-size: 14px; color: #777;">Gender: Men</p>
+            </div>
+        </body>
+        </html>
+        """
+        mock_response.raise_for_status = MagicMock()
+        mock_get.return_value = mock_response
+        df = scrape_data()
+        expected_columns = {'Title', 'Price', 'Rating', 'Colors', 'Size', 'Gender', 'timestamp', 'page_number'}
+        self.assertEqual(set(df.columns), expected_columns, "Columns should match expected set")
+
+    @patch('requests.Session.get')
+    def test_scrape_data_attribute_error(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.text = """
+        <html>
+        <body>
+            <div class="collection-card">
+                <h3>Invalid</h3> <!-- Simulate missing product-title class -->
+            </div>
+        </body>
+        </html>
+        """
+        mock_response.raise_for_status = MagicMock()
+        mock_get.return_value = mock_response
+        df = scrape_data()
+        self.assertTrue(df.empty, "DataFrame should be empty on AttributeError")
+
+    @patch('requests.Session.get')
+    def test_scrape_data_invalid_price_format(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.text = """
+        <html>
+        <body>
+            <div class="collection-card">
+                <h3 class="product-title">Test Product</h3>
+                <span class="price">invalid_price</span>
+                <p style="font-size: 14px; color: #777;">Rating: ⭐ 4.5 / 5</p>
+                <p style="font-size: 14px; color: #777;">3 Colors</p>
+                <p style="font-size: 14px; color: #777;">Size: M</p>
+                <p style="font-size: 14px; color: #777;">Gender: Men</p>
+            </div>
+        </body>
+        </html>
+        """
+        mock_response.raise_for_status = MagicMock()
+        mock_get.return_value = mock_response
+        df = scrape_data()
+        self.assertTrue(df.empty, "DataFrame should be empty for invalid price format")
+
+    @patch('requests.Session.get')
+    def test_scrape_data_concurrent_keeps_page_order(self, mock_get):
+        def fake_get(url, **kwargs):
+            page = 1 if url.endswith('/') else int(url.rsplit('page', 1)[1])
+            mock_response = MagicMock()
+            mock_response.text = f"""
+            <div class="collection-card">
+                <h3 class="product-title">Product {page}</h3>
+                <span class="price">$10</span>
+                <p style="font-size: 14px; color: #777;">Size: M</p>
+                <p style="font-size: 14px; color: #777;">Gender: Men</p>
+            </div>
+            """
+            mock_response.raise_for_status = MagicMock()
+            return mock_response
+
+        mock_get.side_effect = fake_get
+        df = scrape_data(max_workers=8)
+        self.assertEqual(len(df), 50)
+        self.assertEqual(df['page_number'].tolist(), list(range(1, 51)))
+        self.assertEqual(df['Title'].iloc[36], "Product 37")
+
+    def test_scrape_data_invalid_max_workers(self):
+        df = scrape_data(max_workers=0)
+        self.assertTrue(df.empty, "DataFrame should be empty for an invalid worker count")
+
+    @patch('utils.session.time.sleep')
+    @patch('requests.Session.get')
+    def test_scrape_data_retries_transient_failure(self, mock_get, mock_sleep):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = """
+        <div class="collection-card">
+            <h3 class="product-title">Test Product</h3>
+            <span class="price">$100</span>
+            <p style="font-size: 14px; color: #777;">Size: M</p>
+            <p style="font-size: 14px; color: #777;">Gender: Men</p>
+        </div>
+        """
+        mock_empty_response = MagicMock()
+        mock_empty_response.status_code = 200
+        mock_empty_response.text = "<html><body></body></html>"
+
+        mock_get.side_effect = [requests.ConnectionError("Mocked reset"), mock_response] + [mock_empty_response] * 49
+        session = PooledSession(max_retries=2)
+        df = scrape_data(session=session)
+        self.assertEqual(len(df), 1, "Transient failure should be retried instead of dropping the page")
+        self.assertEqual(session.stats['retries'], 1)
+
+    @patch('requests.Session.get')
+    def test_scrape_data_pipelined_parse_stage(self, mock_get):
+        def fake_get(url, **kwargs):
+            page = 1 if url.endswith('/') else int(url.rsplit('page', 1)[1])
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            if page == 7:
+                mock_response.raise_for_status.side_effect = requests.HTTPError("Mocked 404")
+            # Non-string markup makes the parser raise inside the worker process.
+            mock_response.text = 12345 if page == 9 else f"""
+            <div class="collection-card">
+                <h3 class="product-title">Product {page}</h3>
+                <span class="price">$10</span>
+                <p style="font-size: 14px; color: #777;">Size: M</p>
+                <p style="font-size: 14px; color: #777;">Gender: Men</p>
+            </div>
+            """
+            return mock_response
+
+        mock_get.side_effect = fake_get
+        df = scrape_data(max_workers=4, parse_workers=2, queue_size=3)
+        self.assertEqual(len(df), 48)
+        expected_pages = [page for page in range(1, 51) if page not in (7, 9)]
+        self.assertEqual(df['page_number'].tolist(), expected_pages)
+        self.assertEqual(set(df.attrs['page_errors']), {7, 9})
+        self.assertTrue(df.attrs['page_errors'][9].startswith("parse failed"))
+
+    def test_scrape_data_invalid_parse_workers(self):
+        self.assertTrue(scrape_data(parse_workers=-1).empty)
+
+    @patch('requests.Session.get')
+    def test_scrape_batches_yields_one_frame_per_page(self, mock_get):
+        def fake_get(url, **kwargs):
+            page = 1 if url.endswith('/') else int(url.rsplit('page', 1)[1])
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.text = "<html><body></body></html>" if page % 2 else f"""
+            <div class="collection-card">
+                <h3 class="product-title">Product {page}</h3>
+                <span class="price">$10</span>
+                <p style="font-size: 14px; color: #777;">Size: M</p>
+                <p style="font-size: 14px; color: #777;">Gender: Men</p>
+            </div>
+            """
+            return mock_response
+
+        mock_get.side_effect = fake_get
+        batches = scrape_batches(max_workers=4)
+        first = next(batches)
+        self.assertEqual(first['page_number'].tolist(), [2])
+        rest = list(batches)
+        self.assertEqual(len(rest), 24)
+        self.assertEqual([batch['page_number'].iloc[0] for batch in rest], list(range(4, 51, 2)))
+
+    def test_build_page_url_with_base_url(self):
+        self.assertEqual(build_page_url(1), "https://fashion-studio.dicoding.dev/")
+        self.assertEqual(build_page_url(7, "http://127.0.0.1:8000"), "http://127.0.0.1:8000/page7")
+
+    def catalogue_get(self, total_pages, pagination, empty=(), failing=()):
+        """
+        Returns a fake Session.get serving total_pages pages of one product each and a 404 past them.
+        pagination(page) returns the pagination markup of a page; pages in empty have no product
+        cards and pages in failing raise a ConnectionError.
+        """
+        requested = []
+
+        def fake_get(url, **kwargs):
+            page = 1 if url.endswith('/') else int(url.rsplit('page', 1)[1])
+            requested.append(page)
+            if page in failing:
+                raise requests.ConnectionError("Mocked connection reset")
+            mock_response = MagicMock()
+            if page > total_pages:
+                mock_response.status_code = 404
+                mock_response.raise_for_status.side_effect = requests.HTTPError("Mocked 404", response=mock_response)
+                return mock_response
+            mock_response.status_code = 200
+            mock_response.from_cache = False
+            if page in empty:
+                mock_response.text = f"<div class='empty'>No products</div>{pagination(page)}"
+                return mock_response
+            mock_response.text = f"""
+            <div class="collection-card">
+                <h3 class="product-title">Product {page}</h3>
+                <span class="price">$10</span>
+                <p style="font-size: 14px; color: #777;">Size: M</p>
+                <p style="font-size: 14px; color: #777;">Gender: Men</p>
+            </div>
+            {pagination(page)}
+            """
+            return mock_response
+
+        return fake_get, requested
+
+    @patch('requests.Session.get')
+    def test_scrape_data_follows_next_links_past_total_pages(self, mock_get):
+        def next_link(page):
+            return f'<a class="page-link" href="/page{page + 1}">Next &raquo;</a>' if page < 57 else ''
+
+        mock_get.side_effect, requested = self.catalogue_get(57, next_link)
+        df = scrape_data(max_workers=4)
+        self.assertEqual(df['page_number'].tolist(), list(range(1, 58)))
+        self.assertEqual(sorted(requested), list(range(1, 58)))
+
+    @patch('requests.Session.get')
+    def test_scrape_data_reads_last_page_from_first_response(self, mock_get):
+        mock_get.side_effect, requested = self.catalogue_get(12, lambda page: f"<p>Page {page} of 12</p>")
+        df = scrape_data(max_workers=8)
+        self.assertEqual(df['page_number'].tolist(), list(range(1, 13)))
+        self.assertEqual(sorted(requested), list(range(1, 13)))
+
+    @patch('requests.Session.get')
+    def test_scrape_data_stops_after_consecutive_empty_pages(self, mock_get):
+        # Without pagination links TOTAL_PAGES pages are assumed; the shrunken catalogue ends at page 20.
+        mock_get.side_effect, requested = self.catalogue_get(20, lambda page: "")
+        df = scrape_data(max_empty_pages=2)
+        self.assertEqual(df['page_number'].tolist(), list(range(1, 21)))
+        # Pages already in flight when the second 404 comes back are still fetched, but nothing after them.
+        self.assertEqual(requested[:22], list(range(1, 23)))
+        self.assertLessEqual(len(requested), 23)
+
+    @patch('utils.session.time.sleep')
+    @patch('requests.Session.get')
+    def test_scrape_data_does_not_stop_on_failed_pages(self, mock_get, mock_sleep):
+        # Connection errors on pages 10-12 are failures, not empty pages, so the run goes on.
+        mock_get.side_effect, requested = self.catalogue_get(47, lambda page: "", failing={10, 11, 12})
+        df = scrape_data(max_workers=4)
+        self.assertEqual(df['page_number'].tolist(), list(range(1, 10)) + list(range(13, 48)))
+        self.assertEqual(sorted(set(df.attrs['page_errors']) & {10, 11, 12}), [10, 11, 12])
+
+    @patch('requests.Session.get')
+    def test_scrape_data_does_not_stop_before_stated_page_count(self, mock_get):
+        mock_get.side_effect, requested = self.catalogue_get(30, lambda page: f"<p>Page {page} of 30</p>", empty={10, 11, 12})
+        df = scrape_data(max_workers=4, max_empty_pages=2)
+        self.assertEqual(df['page_number'].tolist(), list(range(1, 10)) + list(range(13, 31)))
+        self.assertEqual(sorted(requested), list(range(1, 31)))
+
+    @patch('requests.Session.get')
+    def test_scrape_data_fetches_ahead_with_neighbour_links(self, mock_get):
+        def neighbour_links(page):
+            links = [f'<a class="page-link" href="/page{number}">{number}</a>' for number in range(max(2, page - 2), min(30, page + 2) + 1)]
+            if page < 30:
+                links.append(f'<a class="page-link" href="/page{page + 1}">Next</a>')
+            return ''.join(links)
+
+        fake_get, requested = self.catalogue_get(30, neighbour_links)
+        in_flight = [0, 0]
+        lock = threading.Lock()
+
+        def slow_get(url, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            try:
+                time.sleep(0.02)
+                return fake_get(url, **kwargs)
+            finally:
+                with lock:
+                    in_flight[0] -= 1
+
+        mock_get.side_effect = slow_get
+        df = scrape_data(max_workers=8)
+        self.assertEqual(df['page_number'].tolist(), list(range(1, 31)))
+        # TOTAL_PAGES stays the lower bound once links are seen, so all workers are kept busy.
+        self.assertEqual(in_flight[1], 8)
+        # The 404s past page 30 count as empty pages and end the run, with at most the window in flight past them.
+        self.assertLessEqual(max(requested), 30 + 3 + 2 * 8)
+
+    def test_scrape_data_does_not_hang_on_unexpected_fetch_errors(self):
+        fake_get, requested = self.catalogue_get(3, lambda page: f"<p>Page {page} of 3</p>")
+
+        def broken_get(url, **kwargs):
+            if url.endswith('page3'):
+                raise OSError("Mocked disk full")
+            return fake_get(url, **kwargs)
+
+        for parse_workers in (0, 1):
+            with self.subTest(parse_workers=parse_workers), patch('requests.Session.get', side_effect=broken_get):
+                result = []
+                thread = threading.Thread(target=lambda: result.append(scrape_data(max_workers=4, parse_workers=parse_workers)),
+                                          daemon=True)
+                thread.start()
+                thread.join(timeout=60)
+                self.assertFalse(thread.is_alive(), "scrape_data hung on an OSError from the fetch")
+                self.assertTrue(result[0].empty)
+
+    def test_page_frontier_waits_for_reports(self):
+        frontier = PageFrontier(expected_pages=5, max_empty_pages=2)
+        pages = iter(frontier)
+        self.assertEqual(next(pages), 1)
+        frontier.report(1, True)
+        self.assertEqual(next(pages), 2)
+        self.assertEqual(next(pages), 3)
+        frontier.report(2, False)
+        frontier.report(3, False)
+        self.assertEqual(list(pages), [])
+        self.assertEqual(frontier.stop_after, 3)
+        with self.assertRaises(ValueError):
+            PageFrontier(max_empty_pages=0)
+
+    def test_page_frontier_failed_and_stated_pages(self):
+        frontier = PageFrontier(expected_pages=5, max_empty_pages=2)
+        pages = iter(frontier)
+        self.assertEqual(next(pages), 1)
+        frontier.discover(1, "<p>Page 1 of 8</p>")
+        self.assertEqual(frontier.last_page, 8)
+        self.assertEqual([next(pages) for _ in range(5)], [2, 3, 4, 5, 6])
+        frontier.report(2, False, failed=True)
+        frontier.report(3, False)
+        frontier.report(4, False)
+        # Pages 3-4 are empty, but the catalogue states 8 pages.
+        self.assertEqual(frontier.stop_after, frontier.max_pages)
+        frontier.report(6, False)
+        frontier.report(7, False)
+        frontier.report(8, False)
+        self.assertEqual(frontier.stop_after, 8)
+
+if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
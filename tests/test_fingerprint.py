@@ -0,0 +1,65 @@
+import unittest
+import json
+import os
+import tempfile
+from collections import Counter
+from benchmarks.replay_server import ReplayServer, load_pages, synthetic_page
+from utils.extract import scrape_data
+from utils.fingerprint import FingerprintStore, fingerprint
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'fingerprints.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lookup_reuses_records_with_a_fresh_timestamp(self):
+        store = FingerprintStore(self.path)
+        record = {'Title': 'T-shirt 1', 'Price': 10.0, 'timestamp': '2025-01-01 00:00:00', 'page_number': 1}
+        store.store(1, fingerprint("<html>one</html>"), [record], Counter(bad_price=2))
+        store.store(2, fingerprint("<html></html>"), None, Counter())
+        store.save()
+
+        reopened = FingerprintStore(self.path)
+        self.assertEqual(len(reopened), 2)
+        self.assertIsNone(reopened.lookup(1, fingerprint("<html>changed</html>")))
+        records, skipped = reopened.lookup(1, fingerprint("<html>one</html>"))
+        self.assertEqual(records[0]['Title'], 'T-shirt 1')
+        self.assertNotEqual(records[0]['timestamp'], '2025-01-01 00:00:00')
+        self.assertEqual(skipped, Counter(bad_price=2))
+        self.assertEqual(reopened.lookup(2, fingerprint("<html></html>")), (None, Counter()))
+        self.assertEqual(reopened.stats, {'reused': 2, 'parsed': 0})
+
+    def test_unreadable_or_outdated_store_starts_empty(self):
+        with open(self.path, 'w') as f:
+            f.write('{"version": 1, "pages": {"1": ')
+        self.assertEqual(len(FingerprintStore(self.path)), 0)
+        with open(self.path, 'w') as f:
+            json.dump({'version': 0, 'pages': {'1': {'hash': 'x', 'records': [], 'skipped': {}}}}, f)
+        self.assertEqual(len(FingerprintStore(self.path)), 0)
+
+    def test_unchanged_pages_are_not_parsed_again(self):
+        pages = load_pages(recordings_dir=None, total_pages=12)
+        for parse_workers in (0, 2):
+            with self.subTest(parse_workers=parse_workers), ReplayServer(pages=pages) as server:
+                FingerprintStore(self.path).clear()
+                first_store = FingerprintStore(self.path)
+                first = scrape_data(max_workers=4, parser='lxml', parse_workers=parse_workers,
+                                    base_url=server.base_url, fingerprints=first_store)
+                self.assertEqual(first_store.stats, {'reused': 0, 'parsed': 12})
+
+                pages[3] = synthetic_page(3, seed=1, total_pages=12)
+                store = FingerprintStore(self.path)
+                second = scrape_data(max_workers=4, parser='lxml', parse_workers=parse_workers,
+                                     base_url=server.base_url, fingerprints=store)
+                self.assertEqual(store.stats, {'reused': 11, 'parsed': 1})
+                unchanged = first['page_number'] != 3
+                self.assertEqual(second[second['page_number'] != 3]['Title'].tolist(), first[unchanged]['Title'].tolist())
+                self.assertNotEqual(second[second['page_number'] == 3]['Title'].tolist(),
+                                    first[~unchanged]['Title'].tolist())
+                pages[3] = synthetic_page(3, total_pages=12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import os
+import shutil
+import tempfile
+import pandas as pd
+from datetime import datetime
+from utils.history import INDEX_FILE, append_history, compact_history, load_index, main, query_history
+from utils.load import SINKS, save_to_sinks
+from utils.transform import compact_dtypes
+from unittest.mock import patch
+
+def run_frame(timestamp, prices):
+    return pd.DataFrame({
+        'Title': [f"Product{i}" for i in range(len(prices))], 'Price': prices, 'Rating': [4.5] * len(prices),
+        'Colors': [3] * len(prices), 'Size': ['M'] * len(prices), 'Gender': ['Men'] * len(prices),
+        'timestamp': [timestamp] * len(prices), 'page_number': [1] * len(prices)
+    })
+
+class TestHistory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def partition_files(self, date):
+        return os.listdir(os.path.join(self.directory, f"date={date}"))
+
+    def test_append_partitions_by_date_and_indexes_titles(self):
+        append_history(run_frame('2025-05-01 08:00:00', [100.0, 200.0]), self.directory)
+        append_history(run_frame('2025-05-02 08:00:00', [110.0]), self.directory)
+        append_history(run_frame('2025-05-02 20:00:00', [120.0]), self.directory)
+        self.assertEqual(sorted(os.listdir(self.directory)), [INDEX_FILE, 'date=2025-05-01', 'date=2025-05-02'])
+        self.assertEqual(len(self.partition_files('2025-05-02')), 2)
+        self.assertEqual(load_index(self.directory), {'Product0': ['2025-05-01', '2025-05-02'], 'Product1': ['2025-05-01']})
+
+    def test_query_reads_only_indexed_partitions_in_window(self):
+        append_history(run_frame('2025-01-01 08:00:00', [90.0, 1.0]), self.directory)
+        append_history(run_frame('2025-05-01 08:00:00', [100.0, 2.0]), self.directory)
+        append_history(run_frame('2025-05-03 08:00:00', [5.0, 5.0, 5.0]).iloc[1:], self.directory)
+        append_history(run_frame('2025-05-02 08:00:00', [110.0]), self.directory)
+
+        with patch('utils.history.pd.read_parquet', wraps=pd.read_parquet) as mock_read:
+            history = query_history('Product0', days=90, directory=self.directory, now=datetime(2025, 5, 10))
+        self.assertEqual(history['Price'].tolist(), [100.0, 110.0])
+        self.assertEqual(mock_read.call_count, 2)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(history['timestamp']))
+        self.assertTrue(query_history('Missing', directory=self.directory).empty)
+
+    def test_compaction_merges_part_files(self):
+        for hour in range(4):
+            append_history(run_frame(f'2025-05-01 0{hour}:00:00', [100.0 + hour, 50.0]), self.directory)
+        append_history(run_frame('2025-05-02 08:00:00', [110.0]), self.directory)
+        before = query_history('Product0', directory=self.directory, now=datetime(2025, 5, 10))
+
+        self.assertEqual(compact_history(self.directory), 1)
+        self.assertEqual(len(self.partition_files('2025-05-01')), 1)
+        self.assertEqual(len(self.partition_files('2025-05-02')), 1)
+        pd.testing.assert_frame_equal(query_history('Product0', directory=self.directory, now=datetime(2025, 5, 10)), before)
+        self.assertEqual(compact_history(self.directory), 0)
+
+    def test_compact_command(self):
+        append_history(run_frame('2025-05-01 08:00:00', [100.0]), self.directory)
+        append_history(run_frame('2025-05-01 09:00:00', [101.0]), self.directory)
+        main(['--directory', self.directory, 'compact'])
+        self.assertEqual(len(self.partition_files('2025-05-01')), 1)
+
+    def test_history_sink_accepts_compact_schema(self):
+        self.assertIn('history', SINKS)
+        save_to_sinks(compact_dtypes(run_frame('2025-05-01 08:00:00', [100.0, 200.0])), [('history', self.directory)])
+        save_to_sinks(run_frame('2025-05-01 09:00:00', [100.0, 200.0]), [('history', self.directory)])
+        self.assertEqual(compact_history(self.directory), 1)
+        self.assertEqual(len(query_history('Product1', directory=self.directory, now=datetime(2025, 5, 10))), 2)
+
+    def test_append_failure_empty_df(self):
+        with self.assertRaises(ValueError):
+            append_history(pd.DataFrame(), self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
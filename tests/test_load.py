@@ -1,176 +1,486 @@
-import unittest
-import pandas as pd
-from utils.load import save_to_csv, save_to_google_sheets
-from unittest.mock import patch, MagicMock
-import logging
-import gspread
-
-class TestLoad(unittest.TestCase):
-    def setUp(self):
-        self.logger = logging.getLogger('utils.load')
-        self.logger.setLevel(logging.INFO)
-        self.handler = logging.StreamHandler()
-        self.logger.addHandler(self.handler)
-    
-    def tearDown(self):
-        self.logger.removeHandler(self.handler)
-
-    def test_save_to_csv_success(self):
-        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
-        with patch('pandas.DataFrame.to_csv') as mock_to_csv:
-            save_to_csv(df, 'test.csv')
-            mock_to_csv.assert_called_once_with('test.csv', index=False)
-
-    def test_save_to_csv_failure_empty_df(self):
-        df = pd.DataFrame()
-        with self.assertRaises(ValueError):
-            save_to_csv(df, 'test.csv')
-
-    def test_save_to_csv_failure_exception(self):
-        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
-        with patch('pandas.DataFrame.to_csv', side_effect=Exception("CSV write error")):
-            with self.assertRaises(Exception):
-                save_to_csv(df, 'test.csv')
-
-    @patch('gspread.authorize')
-    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
-    def test_save_to_google_sheets_success_existing(self, mock_creds, mock_authorize):
-        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
-        mock_client = MagicMock()
-        mock_spreadsheet = MagicMock()
-        mock_worksheet = MagicMock()
-        
-        mock_client.open.return_value = mock_spreadsheet
-        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
-        mock_worksheet.clear.return_value = None
-        mock_worksheet.update.return_value = None
-        mock_authorize.return_value = mock_client
-        
-        save_to_google_sheets(df, 'Test_Sheet')
-        mock_client.open.assert_called_once_with('Test_Sheet')
-        mock_spreadsheet.get_worksheet.assert_called_once_with(0)
-        mock_worksheet.clear.assert_called_once()
-        mock_worksheet.update.assert_called_once()
-
-    @patch('gspread.authorize')
-    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
-    def test_save_to_google_sheets_create_new(self, mock_creds, mock_authorize):
-        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
-        mock_client = MagicMock()
-        mock_spreadsheet = MagicMock()
-        mock_worksheet = MagicMock()
-        
-        mock_client.open.side_effect = gspread.SpreadsheetNotFound
-        mock_client.create.return_value = mock_spreadsheet
-        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
-        mock_worksheet.clear.return_value = None
-        mock_worksheet.update.return_value = None
-        mock_authorize.return_value = mock_client
-        
-        save_to_google_sheets(df, 'Test_Sheet')
-        mock_client.create.assert_called_once_with('Test_Sheet')
-        mock_spreadsheet.get_worksheet.assert_called_once_with(0)
-        mock_worksheet.update.assert_called_once()
-
-    @patch('gspread.authorize')
-    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
-    def test_save_to_google_sheets_failure_empty_df(self, mock_creds, mock_authorize):
-        df = pd.DataFrame()
-        with self.assertRaises(ValueError):
-            save_to_google_sheets(df, 'Test_Sheet')
-
-    @patch('gspread.authorize')
-    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
-    def test_save_to_google_sheets_share_failure(self, mock_creds, mock_authorize):
-        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
-        mock_client = MagicMock()
-        mock_spreadsheet = MagicMock()
-        
-        mock_response = MagicMock()
-        mock_response.json.return_value = {'error': {'code': 400, 'message': 'Share error'}}
-        
-        mock_client.open.side_effect = gspread.SpreadsheetNotFound
-        mock_client.create.return_value = mock_spreadsheet
-        mock_spreadsheet.share.side_effect = gspread.exceptions.APIError(mock_response)
-        mock_authorize.return_value = mock_client
-        
-        with self.assertRaises(gspread.exceptions.APIError):
-            save_to_google_sheets(df, 'Test_Sheet')
-
-    @patch('gspread.authorize')
-    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
-    def test_save_to_google_sheets_share_fallback(self, mock_creds, mock_authorize):
-        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
-        mock_client = MagicMock()
-        mock_spreadsheet = MagicMock()
-        mock_worksheet = MagicMock()
-        
-        mock_client.open.side_effect = gspread.SpreadsheetNotFound
-        mock_client.create.return_value = mock_spreadsheet
-        mock_spreadsheet.share.side_effect = AttributeError("Share attribute error")
-        mock_spreadsheet.client.insert_permission.return_value = None
-        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
-        mock_worksheet.clear.return_value = None
-        mock_worksheet.update.return_value = None
-        mock_authorize.return_value = mock_client
-        
-        save_to_google_sheets(df, 'Test_Sheet')
-        mock_spreadsheet.client.insert_permission.assert_called_once()
-
-    @patch('gspread.authorize')
-    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
-    def test_save_to_google_sheets_clear_failure(self, mock_creds, mock_authorize):
-        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
-        mock_client = MagicMock()
-        mock_spreadsheet = MagicMock()
-        mock_worksheet = MagicMock()
-        
-        mock_response = MagicMock()
-        mock_response.json.return_value = {'error': {'code': 400, 'message': 'Clear error'}}
-        
-        mock_client.open.return_value = mock_spreadsheet
-        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
-        mock_worksheet.clear.side_effect = gspread.exceptions.APIError(mock_response)
-        mock_authorize.return_value = mock_client
-        
-        with self.assertRaises(gspread.exceptions.APIError):
-            save_to_google_sheets(df, 'Test_Sheet')
-
-    @patch('gspread.authorize')
-    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
-    def test_save_to_google_sheets_update_failure(self, mock_creds, mock_authorize):
-        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
-        mock_client = MagicMock()
-        mock_spreadsheet = MagicMock()
-        mock_worksheet = MagicMock()
-        
-        mock_response = MagicMock()
-        mock_response.json.return_value = {'error': {'code': 400, 'message': 'Update error'}}
-        
-        mock_client.open.return_value = mock_spreadsheet
-        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
-        mock_worksheet.clear.return_value = None
-        mock_worksheet.update.side_effect = gspread.exceptions.APIError(mock_response)
-        mock_authorize.return_value = mock_client
-        
-        with self.assertRaises(gspread.exceptions.APIError):
-            save_to_google_sheets(df, 'Test_Sheet')
-
-    @patch('gspread.authorize')
-    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
-    def test_save_to_google_sheets_share_fallback_failure(self, mock_creds, mock_authorize):
-        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
-        mock_client = MagicMock()
-        mock_spreadsheet = MagicMock()
-        
-        mock_client.open.side_effect = gspread.SpreadsheetNotFound
-        mock_client.create.return_value = mock_spreadsheet
-        mock_spreadsheet.share.side_effect = AttributeError("Share attribute error")
-        mock_spreadsheet.client.insert_permission.side_effect = Exception("Insert permission failed")
-        mock_authorize.return_value = mock_client
-        
-        with self.assertRaises(Exception):
-            save_to_google_sheets(df, 'Test_Sheet')
-
-if __name__ == '__main__':
+import unittest
+import pandas as pd
+from utils.load import BATCH_SINKS, SINKS, load_concurrently, load_stream, save_batches_to_csv, save_to_csv, save_to_database, save_to_feather, save_to_google_sheets, save_to_parquet, save_to_sinks, to_sheet_rows
+from utils.transform import compact_dtypes
+from unittest.mock import patch, MagicMock
+import gc
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import weakref
+import gspread
+
+class TestLoad(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('utils.load')
+        self.logger.setLevel(logging.INFO)
+        self.handler = logging.StreamHandler()
+        self.logger.addHandler(self.handler)
+    
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def test_save_to_csv_success(self):
+        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
+        with patch('pandas.DataFrame.to_csv') as mock_to_csv:
+            save_to_csv(df, 'test.csv')
+            mock_to_csv.assert_called_once_with('test.csv', index=False)
+
+    def test_save_to_csv_failure_empty_df(self):
+        df = pd.DataFrame()
+        with self.assertRaises(ValueError):
+            save_to_csv(df, 'test.csv')
+
+    def test_save_to_csv_failure_exception(self):
+        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
+        with patch('pandas.DataFrame.to_csv', side_effect=Exception("CSV write error")):
+            with self.assertRaises(Exception):
+                save_to_csv(df, 'test.csv')
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_success_existing(self, mock_creds, mock_authorize):
+        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
+        mock_client = MagicMock()
+        mock_spreadsheet = MagicMock()
+        mock_worksheet = MagicMock()
+        
+        mock_client.open.return_value = mock_spreadsheet
+        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
+        mock_worksheet.clear.return_value = None
+        mock_worksheet.update.return_value = None
+        mock_authorize.return_value = mock_client
+        
+        save_to_google_sheets(df, 'Test_Sheet')
+        mock_client.open.assert_called_once_with('Test_Sheet')
+        mock_spreadsheet.get_worksheet.assert_called_once_with(0)
+        mock_worksheet.clear.assert_called_once()
+        mock_worksheet.update.assert_called_once()
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_create_new(self, mock_creds, mock_authorize):
+        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
+        mock_client = MagicMock()
+        mock_spreadsheet = MagicMock()
+        mock_worksheet = MagicMock()
+        
+        mock_client.open.side_effect = gspread.SpreadsheetNotFound
+        mock_client.create.return_value = mock_spreadsheet
+        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
+        mock_worksheet.clear.return_value = None
+        mock_worksheet.update.return_value = None
+        mock_authorize.return_value = mock_client
+        
+        save_to_google_sheets(df, 'Test_Sheet')
+        mock_client.create.assert_called_once_with('Test_Sheet')
+        mock_spreadsheet.get_worksheet.assert_called_once_with(0)
+        mock_worksheet.update.assert_called_once()
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_failure_empty_df(self, mock_creds, mock_authorize):
+        df = pd.DataFrame()
+        with self.assertRaises(ValueError):
+            save_to_google_sheets(df, 'Test_Sheet')
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_share_failure(self, mock_creds, mock_authorize):
+        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
+        mock_client = MagicMock()
+        mock_spreadsheet = MagicMock()
+        
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'error': {'code': 400, 'message': 'Share error'}}
+        
+        mock_client.open.side_effect = gspread.SpreadsheetNotFound
+        mock_client.create.return_value = mock_spreadsheet
+        mock_spreadsheet.share.side_effect = gspread.exceptions.APIError(mock_response)
+        mock_authorize.return_value = mock_client
+        
+        with self.assertRaises(gspread.exceptions.APIError):
+            save_to_google_sheets(df, 'Test_Sheet')
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_share_fallback(self, mock_creds, mock_authorize):
+        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
+        mock_client = MagicMock()
+        mock_spreadsheet = MagicMock()
+        mock_worksheet = MagicMock()
+        
+        mock_client.open.side_effect = gspread.SpreadsheetNotFound
+        mock_client.create.return_value = mock_spreadsheet
+        mock_spreadsheet.share.side_effect = AttributeError("Share attribute error")
+        mock_spreadsheet.client.insert_permission.return_value = None
+        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
+        mock_worksheet.clear.return_value = None
+        mock_worksheet.update.return_value = None
+        mock_authorize.return_value = mock_client
+        
+        save_to_google_sheets(df, 'Test_Sheet')
+        mock_spreadsheet.client.insert_permission.assert_called_once()
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_clear_failure(self, mock_creds, mock_authorize):
+        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
+        mock_client = MagicMock()
+        mock_spreadsheet = MagicMock()
+        mock_worksheet = MagicMock()
+        
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'error': {'code': 400, 'message': 'Clear error'}}
+        
+        mock_client.open.return_value = mock_spreadsheet
+        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
+        mock_worksheet.clear.side_effect = gspread.exceptions.APIError(mock_response)
+        mock_authorize.return_value = mock_client
+        
+        with self.assertRaises(gspread.exceptions.APIError):
+            save_to_google_sheets(df, 'Test_Sheet')
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_update_failure(self, mock_creds, mock_authorize):
+        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
+        mock_client = MagicMock()
+        mock_spreadsheet = MagicMock()
+        mock_worksheet = MagicMock()
+        
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'error': {'code': 400, 'message': 'Update error'}}
+        
+        mock_client.open.return_value = mock_spreadsheet
+        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
+        mock_worksheet.clear.return_value = None
+        mock_worksheet.update.side_effect = gspread.exceptions.APIError(mock_response)
+        mock_authorize.return_value = mock_client
+        
+        with self.assertRaises(gspread.exceptions.APIError):
+            save_to_google_sheets(df, 'Test_Sheet')
+
+    @patch('utils.sheets.time.sleep')
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_resumes_failed_upload(self, mock_creds, mock_authorize, mock_sleep):
+        df = pd.DataFrame({'Title': [f'Product{i}' for i in range(1300)], 'Price': [1600000.0] * 1300, 'Rating': [4.5] * 1300,
+                           'Colors': [3] * 1300, 'Size': ['M'] * 1300, 'Gender': ['Men'] * 1300,
+                           'timestamp': ['2025-05-05'] * 1300, 'page_number': [1] * 1300})
+        mock_client = MagicMock()
+        mock_spreadsheet = MagicMock()
+        mock_worksheet = MagicMock()
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'error': {'code': 503, 'message': 'Service unavailable'}}
+
+        mock_client.open.return_value = mock_spreadsheet
+        mock_spreadsheet.get_worksheet.return_value = mock_worksheet
+        # The second chunk fails through all of its retries once, then goes through.
+        mock_worksheet.update.side_effect = [None] + [gspread.exceptions.APIError(mock_response)] * 6 + [None]
+        mock_authorize.return_value = mock_client
+
+        save_to_google_sheets(df, 'Test_Sheet')
+        mock_worksheet.clear.assert_called_once()
+        ranges = [call.args[1] for call in mock_worksheet.update.call_args_list]
+        self.assertEqual((ranges[0], ranges[-1]), ('A1:H1250', 'A1251:H1301'))
+        self.assertEqual(len(ranges), 8)
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_share_fallback_failure(self, mock_creds, mock_authorize):
+        df = pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3], 'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05'], 'page_number': [1]})
+        mock_client = MagicMock()
+        mock_spreadsheet = MagicMock()
+        
+        mock_client.open.side_effect = gspread.SpreadsheetNotFound
+        mock_client.create.return_value = mock_spreadsheet
+        mock_spreadsheet.share.side_effect = AttributeError("Share attribute error")
+        mock_spreadsheet.client.insert_permission.side_effect = Exception("Insert permission failed")
+        mock_authorize.return_value = mock_client
+        
+        with self.assertRaises(Exception):
+            save_to_google_sheets(df, 'Test_Sheet')
+
+    def test_save_batches_to_csv_appends_incrementally(self):
+        batches = [
+            pd.DataFrame({'Title': ['Product1'], 'Price': [1600000.0], 'page_number': [1]}),
+            pd.DataFrame(),
+            pd.DataFrame({'Title': ['Product2', 'Product3'], 'Price': [800000.0, 160000.0], 'page_number': [2, 2]})
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'products.csv')
+
+            def stream():
+                for batch in batches:
+                    yield batch
+                    if not batch.empty:
+                        self.assertTrue(os.path.getsize(f"{path}.part") > 0, "Rows should reach disk before the stream ends")
+
+            rows = save_batches_to_csv(stream(), path)
+            self.assertEqual(rows, 3)
+            self.assertFalse(os.path.exists(f"{path}.part"))
+            result = pd.read_csv(path)
+            self.assertEqual(result['Title'].tolist(), ['Product1', 'Product2', 'Product3'])
+
+    def test_save_batches_to_csv_failure_keeps_previous_file(self):
+        def failing_stream():
+            yield pd.DataFrame({'Title': ['Product1']})
+            raise RuntimeError("Scrape interrupted")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'products.csv')
+            with open(path, 'w') as f:
+                f.write("previous")
+            with self.assertRaises(RuntimeError):
+                save_batches_to_csv(failing_stream(), path)
+            with open(path) as f:
+                self.assertEqual(f.read(), "previous")
+            self.assertFalse(os.path.exists(f"{path}.part"))
+
+    def test_save_batches_to_csv_failure_empty_stream(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                save_batches_to_csv(iter([]), os.path.join(directory, 'products.csv'))
+
+    def compact_frame(self):
+        return compact_dtypes(pd.DataFrame({
+            'Title': ['Product1', 'Product2'], 'Price': [1634400.0, 7950080.0], 'Rating': [3.9, 4.8],
+            'Colors': [3, 5], 'Size': ['M', 'L'], 'Gender': ['Women', 'Unisex'],
+            'timestamp': ['2025-05-12 02:19:26', '2025-05-12 02:19:26'], 'page_number': [1, 2]
+        }))
+
+    def test_save_to_csv_round_trips_compact_schema(self):
+        df = self.compact_frame()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'products.csv')
+            save_to_csv(df, path)
+            pd.testing.assert_frame_equal(compact_dtypes(pd.read_csv(path)), df)
+            save_batches_to_csv(iter([df.iloc[:1], df.iloc[1:]]), path)
+            pd.testing.assert_frame_equal(compact_dtypes(pd.read_csv(path)), df)
+
+    def test_to_sheet_rows_handles_compact_schema(self):
+        df = self.compact_frame()
+        rows = to_sheet_rows(df)
+        self.assertEqual(rows[0], df.columns.tolist())
+        self.assertEqual(rows[1], ['Product1', 1634400, 3.9, 3, 'M', 'Women', '2025-05-12 02:19:26', 1])
+        json.dumps(rows)
+        read_back = pd.DataFrame(rows[1:], columns=rows[0])
+        pd.testing.assert_frame_equal(compact_dtypes(read_back), df)
+
+    def test_to_sheet_rows_blanks_missing_values(self):
+        df = pd.DataFrame({'Title': ['Product1'], 'Rating': [float('nan')]})
+        self.assertEqual(to_sheet_rows(df)[1], ['Product1', ''])
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_compact_schema(self, mock_creds, mock_authorize):
+        mock_client = MagicMock()
+        mock_worksheet = mock_client.open.return_value.get_worksheet.return_value
+        mock_authorize.return_value = mock_client
+        df = self.compact_frame()
+        save_to_google_sheets(df, 'Test_Sheet')
+        payload = mock_worksheet.update.call_args[0][0]
+        json.dumps(payload)
+        pd.testing.assert_frame_equal(compact_dtypes(pd.DataFrame(payload[1:], columns=payload[0])), df)
+
+    def test_columnar_sinks_round_trip_dtypes(self):
+        df = self.compact_frame()
+        with tempfile.TemporaryDirectory() as directory:
+            parquet_path = os.path.join(directory, 'products.parquet')
+            save_to_parquet(df, parquet_path, compression='zstd')
+            pd.testing.assert_frame_equal(pd.read_parquet(parquet_path), df)
+            feather_path = os.path.join(directory, 'products.feather')
+            save_to_feather(df, feather_path, compression=None)
+            pd.testing.assert_frame_equal(pd.read_feather(feather_path), df)
+
+    def test_parquet_row_group_size(self):
+        import pyarrow.parquet as pq
+        df = pd.DataFrame({'Title': [f"Product{i}" for i in range(10)], 'Price': [1.0] * 10})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'products.parquet')
+            save_to_parquet(df, path, row_group_size=4)
+            self.assertEqual(pq.ParquetFile(path).num_row_groups, 3)
+
+    def test_columnar_sinks_failure_empty_df(self):
+        for sink in (save_to_parquet, save_to_feather):
+            with self.subTest(sink=sink.__name__):
+                with self.assertRaises(ValueError):
+                    sink(pd.DataFrame(), 'unused')
+
+    def test_save_to_sinks(self):
+        df = self.compact_frame()
+        with tempfile.TemporaryDirectory() as directory:
+            targets = [
+                ('csv', os.path.join(directory, 'products.csv')),
+                ('parquet', os.path.join(directory, 'products.parquet'), {'compression': 'snappy'}),
+                ('feather', os.path.join(directory, 'products.feather'))
+            ]
+            written = save_to_sinks(df, targets)
+            self.assertEqual(written, [target[1] for target in targets])
+            self.assertTrue(all(os.path.exists(path) for path in written))
+
+    def test_save_to_sinks_unknown_sink(self):
+        mock_csv = MagicMock()
+        with patch.dict(SINKS, {'csv': mock_csv}):
+            with self.assertRaises(ValueError):
+                save_to_sinks(self.compact_frame(), [('csv', 'products.csv'), ('excel', 'products.xlsx')])
+        mock_csv.assert_not_called()
+
+    def catalogue_frame(self, rows=1000):
+        return pd.DataFrame({
+            'Title': [f"Product{i}" for i in range(rows)], 'Price': [16000.0 * i for i in range(rows)],
+            'Rating': [4.5] * rows, 'Colors': [3] * rows, 'Size': ['M'] * rows, 'Gender': ['Men'] * rows,
+            'timestamp': ['2025-05-05 00:00:00'] * rows, 'page_number': [1 + i // 20 for i in range(rows)]
+        })
+
+    def test_save_to_database_upserts_changes_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'products.db')
+            df = self.catalogue_frame()
+            self.assertEqual(save_to_database(df, path), {'inserted': 1000, 'updated': 0, 'unchanged': 0})
+
+            reloaded = df.assign(timestamp='2025-05-06 00:00:00')
+            reloaded.loc[3, 'Price'] = 1.0
+            reloaded = pd.concat([reloaded.drop(index=[10]), self.catalogue_frame(1001).tail(1)])
+            connection = sqlite3.connect(path)
+            stats = save_to_database(reloaded, connection)
+            self.assertEqual(stats, {'inserted': 1, 'updated': 1, 'unchanged': 998})
+            self.assertEqual(connection.total_changes, 2)
+
+            rows = dict(connection.execute('SELECT "Title", "Price" FROM products').fetchall())
+            self.assertEqual(len(rows), 1001)
+            self.assertEqual(rows['Product3'], 1.0)
+            self.assertIn('Product10', rows)
+            indexes = connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'products'").fetchall()
+            self.assertEqual(indexes, [('idx_products_Title',)])
+            connection.close()
+
+    def test_save_to_database_compact_schema(self):
+        df = self.compact_frame()
+        connection = sqlite3.connect(':memory:')
+        save_to_database(df, connection)
+        self.assertEqual(save_to_database(df, connection), {'inserted': 0, 'updated': 0, 'unchanged': 2})
+        stored = pd.read_sql('SELECT * FROM products', connection)
+        pd.testing.assert_frame_equal(compact_dtypes(stored), df)
+
+    def test_save_to_database_generic_paramstyle(self):
+        connection = MagicMock()
+        connection.cursor.return_value.fetchall.return_value = [('Product1', 1.0, 4.5, 3, 'M', 'Men', '2025-05-05', 1)]
+        df = pd.DataFrame({'Title': ['Product1', 'Product2'], 'Price': [2.0, 3.0], 'Rating': [4.5, 4.0], 'Colors': [3, 1],
+                           'Size': ['M', 'S'], 'Gender': ['Men', 'Women'], 'timestamp': ['2025-05-05'] * 2, 'page_number': [1, 1]})
+        stats = save_to_database(df, connection, paramstyle='numeric')
+        self.assertEqual(stats, {'inserted': 1, 'updated': 1, 'unchanged': 0})
+        statements = [call.args[0] for call in connection.cursor.return_value.executemany.call_args_list]
+        self.assertIn('VALUES (:1, :2, :3, :4, :5, :6, :7, :8)', statements[0])
+        self.assertTrue(statements[1].endswith('WHERE "Title" = :8'))
+        connection.commit.assert_called_once()
+        connection.close.assert_not_called()
+
+    def test_save_to_database_rolls_back_on_failure(self):
+        connection = MagicMock()
+        connection.cursor.return_value.fetchall.return_value = []
+        connection.cursor.return_value.executemany.side_effect = Exception("Insert failed")
+        with self.assertRaises(Exception):
+            save_to_database(self.catalogue_frame(2), connection, paramstyle='format')
+        connection.rollback.assert_called_once()
+        connection.commit.assert_not_called()
+
+    def test_save_to_database_rejects_duplicate_keys(self):
+        df = pd.DataFrame({'Title': ['Product1', 'Product1'], 'Price': [1.0, 2.0]})
+        with self.assertRaises(ValueError):
+            save_to_database(df, ':memory:')
+
+    def test_load_concurrently_isolates_failures(self):
+        def slow_sink(df, target):
+            time.sleep(0.2)
+
+        def failing_sink(df, target):
+            raise ConnectionError("sheets unavailable")
+
+        with patch.dict(SINKS, {'csv': slow_sink, 'parquet': slow_sink, 'google_sheets': failing_sink}):
+            started = time.perf_counter()
+            results = load_concurrently(self.compact_frame(), [('csv', 'a.csv'), ('google_sheets', 'Sheet'), ('parquet', 'a.parquet')])
+            elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual([(r['sink'], r['status'], r['rows']) for r in results],
+                         [('csv', 'ok', 2), ('google_sheets', 'failed', 0), ('parquet', 'ok', 2)])
+        self.assertEqual(results[1]['error'], "ConnectionError: sheets unavailable")
+
+    def test_load_stream_consumes_batches_during_the_stream(self):
+        df = self.catalogue_frame(40)
+        received = []
+        first_batch_loaded = threading.Event()
+
+        def recording_csv(batches, target):
+            for batch in batches:
+                received.append(len(batch))
+                first_batch_loaded.set()
+            return save_batches_to_csv(iter([df]), target)
+
+        def batches():
+            yield df.iloc[:20]
+            # The batch sink has the first batch before the producer makes the second.
+            self.assertTrue(first_batch_loaded.wait(5))
+            yield df.iloc[20:]
+
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'products.csv')
+            parquet_path = os.path.join(directory, 'products.parquet')
+            with patch.dict(BATCH_SINKS, {'csv': recording_csv}):
+                results = load_stream(batches(), [('csv', csv_path), ('parquet', parquet_path)])
+            self.assertEqual(received, [20, 20])
+            self.assertEqual([(r['sink'], r['status'], r['rows']) for r in results], [('csv', 'ok', 40), ('parquet', 'ok', 40)])
+            pd.testing.assert_frame_equal(pd.read_parquet(parquet_path), df)
+
+    def test_load_stream_keeps_no_batches_for_batch_sinks_only(self):
+        written = []
+        second_batch_written = threading.Event()
+
+        def recording_csv(batches, target):
+            for batch in batches:
+                written.append(len(batch))
+                if len(written) == 2:
+                    second_batch_written.set()
+            return len(written)
+
+        def batches():
+            first = self.catalogue_frame(20)
+            first_ref = weakref.ref(first)
+            yield first
+            del first
+            yield self.catalogue_frame(20)
+            self.assertTrue(second_batch_written.wait(5))
+            gc.collect()
+            # The sink has written the first batch and nothing else holds on to it.
+            self.assertIsNone(first_ref())
+            yield self.catalogue_frame(20)
+
+        with patch.dict(BATCH_SINKS, {'csv': recording_csv}):
+            results = load_stream(batches(), [('csv', 'products.csv')])
+        self.assertEqual(written, [20, 20, 20])
+        self.assertEqual([r['status'] for r in results], ['ok'])
+
+    def test_load_stream_failure_aborts_batch_sinks(self):
+        mock_parquet = MagicMock()
+
+        def batches():
+            yield self.catalogue_frame(5)
+            raise ConnectionError("network dropped")
+
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'products.csv')
+            with patch.dict(SINKS, {'parquet': mock_parquet}):
+                with self.assertRaises(ConnectionError):
+                    load_stream(batches(), [('csv', csv_path), ('parquet', 'products.parquet')])
+            self.assertEqual(os.listdir(directory), [])
+        mock_parquet.assert_not_called()
+
+if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
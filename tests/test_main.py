@@ -0,0 +1,90 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+import pandas as pd
+from unittest.mock import patch
+from benchmarks.replay_server import ReplayServer, load_pages
+import main
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_python(code, cwd):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    return result.stdout.strip()
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_import_loads_no_stage_dependencies(self):
+        loaded = run_python("import sys, main; print(sorted(m for m in ('pandas', 'requests', 'bs4', 'gspread', 'google.oauth2') "
+                            "if m in sys.modules))", self.tmp.name)
+        self.assertEqual(loaded, '[]')
+
+    def test_parse_args(self):
+        args = main.parse_args([])
+        self.assertEqual((args.command, args.stream, args.workers, args.sinks, args.pages), ('run', False, 0, None, None))
+        # The append-only history grows on every run, so it is opt-in.
+        self.assertNotIn('history', main.LOAD_SINKS)
+        args = main.parse_args(['--stream', '--sinks', 'csv', 'parquet'])
+        self.assertEqual((args.command, args.stream, args.sinks), ('run', True, ['csv', 'parquet']))
+        args = main.parse_args(['extract', '--pages', '3-5', '--output', 'raw.csv'])
+        self.assertEqual((args.command, args.pages, args.output), ('extract', range(3, 6), 'raw.csv'))
+        self.assertEqual(main.parse_args(['transform', '--input', 'raw.csv']).input, 'raw.csv')
+        self.assertEqual(main.page_range('7'), range(7, 8))
+        with patch('sys.stderr'):
+            for argv in (['--pages', '5-2'], ['--pages', 'x'], ['--sinks', 'excel'], ['--workers', '2', '--pages', '1-3']):
+                with self.subTest(argv=argv), self.assertRaises(SystemExit):
+                    main.parse_args(argv)
+
+    def test_extract_then_transform_from_file(self):
+        raw_path = self.path('raw.parquet')
+        csv_path = self.path('products.csv')
+        options = {
+            'METRICS_PATH': None, 'HTTP_CACHE_DIR': self.path('http_cache'), 'FINGERPRINT_PATH': self.path('fingerprints.json'),
+            'DEDUP_PATH': self.path('dedup_index'), 'CHECKPOINT_DIR': self.path('checkpoints'), 'CSV_PATH': csv_path
+        }
+        with ReplayServer(pages=load_pages(recordings_dir=None, total_pages=6)) as server:
+            with patch.multiple(main, SCRAPE_BASE_URL=server.base_url, **options):
+                main.cli(['extract', '--pages', '2-4', '--output', raw_path])
+        raw = pd.read_parquet(raw_path)
+        self.assertEqual(sorted(raw['page_number'].unique()), [2, 3, 4])
+
+        # A CSV-only load runs in a fresh interpreter to show it never imports the Sheets client.
+        loaded = run_python(f"import sys, main; main.METRICS_PATH = None; main.cli(['transform', '--input', {raw_path!r}, "
+                            f"'--sinks', 'csv']); print('gspread' in sys.modules)", self.tmp.name)
+        self.assertEqual(loaded.splitlines()[-1], 'False')
+        self.assertEqual(len(pd.read_csv(csv_path)), len(main.transform(raw)))
+
+    def test_compact_schema_in_stream_and_sharded_modes(self):
+        parquet_path = self.path('products.parquet')
+        csv_path = self.path('products.csv')
+        options = {
+            'METRICS_PATH': None, 'HTTP_CACHE_DIR': self.path('http_cache'), 'FINGERPRINT_PATH': self.path('fingerprints.json'),
+            'DEDUP_PATH': self.path('dedup_index'), 'CHECKPOINT_DIR': self.path('checkpoints'), 'CSV_PATH': csv_path,
+            'PARQUET_PATH': parquet_path, 'WORKQUEUE_PATH': self.path('workqueue.db'), 'SHARD_DIR': self.path('shards'),
+            'SHARD_SIZE': 2, 'COMPACT_SCHEMA': True
+        }
+        with ReplayServer(pages=load_pages(recordings_dir=None, total_pages=6)) as server:
+            for argv in (['--stream'], ['--workers', '2']):
+                with self.subTest(argv=argv), patch.multiple(main, SCRAPE_BASE_URL=server.base_url, **options):
+                    main.cli(argv + ['--sinks', 'csv', 'parquet'])
+                    stored = pd.read_parquet(parquet_path)
+                    self.assertEqual(sorted(stored['page_number'].unique()), list(range(1, 7)))
+                    self.assertEqual((str(stored['Size'].dtype), str(stored['Price'].dtype), str(stored['timestamp'].dtype)),
+                                     ('category', 'int64', 'datetime64[ns]'))
+                    self.assertEqual(len(pd.read_csv(csv_path)), len(stored))
+
+if __name__ == '__main__':
+    unittest.main()
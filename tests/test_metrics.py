@@ -0,0 +1,72 @@
+import unittest
+import json
+import os
+import tempfile
+import pandas as pd
+from utils.metrics import MetricsRegistry, REGISTRY
+from utils.transform import transform_data
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_with_labels(self):
+        counter = self.registry.counter('skipped_total', "Skipped cards.", ['reason'])
+        counter.inc(reason='bad_price')
+        counter.inc(2, reason='bad_price')
+        self.assertEqual(counter.value(reason='bad_price'), 3)
+        self.assertEqual(counter.value(reason='missing_title'), 0)
+        self.assertIs(self.registry.counter('skipped_total', "Skipped cards.", ['reason']), counter)
+        with self.assertRaises(ValueError):
+            counter.inc(-1, reason='bad_price')
+        with self.assertRaises(ValueError):
+            counter.inc(page='1')
+        with self.assertRaises(ValueError):
+            self.registry.histogram('skipped_total', "Clash.")
+
+    def test_prometheus_export(self):
+        self.registry.counter('pages_total', "Pages.", ['status']).inc(5, status='ok')
+        histogram = self.registry.histogram('fetch_seconds', "Fetch time.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 3.0):
+            histogram.observe(value)
+        text = self.registry.to_prometheus()
+        self.assertIn('# TYPE pages_total counter\npages_total{status="ok"} 5\n', text)
+        self.assertIn('fetch_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('fetch_seconds_bucket{le="1"} 2\n', text)
+        self.assertIn('fetch_seconds_bucket{le="+Inf"} 3\n', text)
+        self.assertIn('fetch_seconds_sum 3.55\n', text)
+        self.assertIn('fetch_seconds_count 3\n', text)
+
+    def test_write_json_and_prometheus(self):
+        self.registry.counter('rows_total', "Rows.").inc(7)
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = os.path.join(directory, 'metrics.json')
+            self.registry.write(json_path)
+            with open(json_path) as f:
+                self.assertEqual(json.load(f)['rows_total']['samples'], [{'labels': {}, 'value': 7}])
+            prom_path = os.path.join(directory, 'metrics.prom')
+            self.registry.write(prom_path)
+            with open(prom_path) as f:
+                self.assertIn('rows_total 7', f.read())
+
+    def test_transform_records_rows_dropped_per_filter(self):
+        REGISTRY.reset()
+        df = pd.DataFrame({
+            'Title': ['Product1', 'Unknown Product', 'Product2', 'Product3', 'Product4', 'Product1'],
+            'Price': ['10', '10', 'Price Unavailable', '10', '10', '10'],
+            'Rating': ['4.5 / 5'] * 6,
+            'Colors': ['3 Colors', '3 Colors', '3 Colors', '0 Colors', '3 Colors', '3 Colors'],
+            'Size': ['M', 'M', 'M', 'M', '', 'M'],
+            'Gender': ['Men'] * 6,
+            'timestamp': ['2025-05-05 00:00:00'] * 6,
+            'page_number': [1] * 6
+        })
+        self.assertEqual(len(transform_data(df)), 1)
+        dropped = REGISTRY.get('transform_rows_dropped_total')
+        for name in ('invalid_title', 'invalid_price', 'invalid_colors', 'missing_size_gender', 'duplicate_title'):
+            self.assertEqual(dropped.value(filter=name), 1, name)
+        rows = REGISTRY.get('transform_rows_total')
+        self.assertEqual((rows.value(stage='input'), rows.value(stage='output')), (6, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+from utils.parsers import PARSER_BACKENDS, get_parser_backend, parse_cards_bs4, parse_cards_lxml, parse_pagination, \
+    parse_stated_pages
+from utils.extract import parse_page, parse_products, scrape_data
+from utils.metrics import REGISTRY
+from unittest.mock import patch, MagicMock
+
+CATALOGUE_HTML = """
+<html>
+<head><meta charset="utf-8"><title>Fashion Studio</title></head>
+<body>
+    <div class="collection-grid">
+        <div class="collection-card">
+            <div class="product-details">
+                <h3 class="product-title">T-shirt 2</h3>
+                <div class="price-container"><span class="price">$102.15</span></div>
+                <p style="font-size: 14px; color: #777;">Rating: ⭐ 3.9 / 5</p>
+                <p style="font-size: 14px; color: #777;">3 Colors</p>
+                <p style="font-size: 14px; color: #777;">Size: M</p>
+                <p style="font-size: 14px; color: #777;">Gender: Women</p>
+            </div>
+        </div>
+        <div class="collection-card featured">
+            <h4>Hoodie &amp; Cap</h4>
+            <span class="price">$496.88</span>
+            <p style="font-size: 14px; color: #777;">Rating: Not Rated</p>
+            <p style="font-size: 14px; color: #777;">5 Colors</p>
+            <p style="font-size: 14px; color: #777;">Size: <b>XL</b></p>
+            <p style="font-size: 14px; color: #777;">Gender: Unisex</p>
+            <p style="font-size: 12px;">Size: ignored</p>
+        </div>
+        <div class="collection-card">
+            <h3 class="product-title">Unknown Product</h3>
+            <p class="price">Price Unavailable</p>
+            <p style="font-size: 14px; color: #777;">Rating: ⭐ Invalid Rating / 5</p>
+            <p style="font-size: 14px; color: #777;">5 Colors</p>
+            <p style="font-size: 14px; color: #777;">Size: M</p>
+            <p style="font-size: 14px; color: #777;">Gender: Men</p>
+        </div>
+        <div class="collection-card">
+            <h2>No heading</h2>
+            <span class="price">  $10  </span>
+        </div>
+        <div class="collection-card">
+            <h4>Fallback</h4>
+            <h3>Preferred H3</h3>
+            <span class="price">1.2.3</span>
+        </div>
+        <div class="collection-card">
+            <h3 class="product-title">Pants 7</h3>
+            <!-- <span class="price">$999</span> -->
+            <span class="price">$44.50</span>
+            <p style="font-size: 14px; color: #777;">Rating: ⭐ 4.5 / 5</p>
+            <p style="font-size: 14px; color: #777;">1 Colors</p>
+            <p style="font-size: 14px; color: #777;">Size: S</p>
+            <p style="font-size: 14px; color: #777;">Gender: Men</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+class TestParsers(unittest.TestCase):
+    def test_backends_produce_identical_cards(self):
+        reference = parse_cards_bs4(CATALOGUE_HTML)
+        self.assertEqual(len(reference), 6)
+        for name, backend in PARSER_BACKENDS.items():
+            with self.subTest(backend=name):
+                self.assertEqual(backend(CATALOGUE_HTML), reference)
+
+    def test_title_fallback_order(self):
+        cards = parse_cards_lxml(CATALOGUE_HTML)
+        self.assertEqual(cards[1][0], "Hoodie & Cap")
+        self.assertIsNone(cards[3][0])
+        self.assertEqual(cards[4][0], "Preferred H3")
+
+    def test_backends_produce_identical_records(self):
+        with patch('utils.extract.datetime') as mock_datetime:
+            mock_datetime.now.return_value.strftime.return_value = '2025-05-05 00:00:00'
+            reference = parse_products(CATALOGUE_HTML, 3, parser='bs4')
+            for name in PARSER_BACKENDS:
+                with self.subTest(backend=name):
+                    self.assertEqual(parse_products(CATALOGUE_HTML, 3, parser=name), reference)
+        self.assertEqual([record['Title'] for record in reference], ["T-shirt 2", "Hoodie & Cap", "Pants 7"])
+        self.assertEqual(reference[1]['Rating'], "Rating: 0.0 / 5")
+        self.assertEqual(reference[1]['Size'], "XL")
+
+    def test_empty_documents(self):
+        for name, backend in PARSER_BACKENDS.items():
+            with self.subTest(backend=name):
+                self.assertEqual(backend(""), [])
+                self.assertEqual(backend("<html><body></body></html>"), [])
+                self.assertIsNone(parse_products("<!-- nothing -->", 1, parser=name))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_parser_backend('regex')
+        self.assertTrue(scrape_data(parser='regex').empty)
+
+    @patch('requests.Session.get')
+    def test_scrape_data_with_lxml_backend(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = CATALOGUE_HTML
+        mock_get.return_value = mock_response
+        df = scrape_data(parser='lxml')
+        self.assertEqual(len(df), 150)
+        self.assertEqual(df['Title'].iloc[0], "T-shirt 2")
+        self.assertEqual(df['Price'].iloc[0], 102.15)
+
+    def test_parse_page_counts_skip_reasons(self):
+        records, skipped = parse_page(CATALOGUE_HTML, 3, parser='lxml')
+        self.assertEqual(len(records), 3)
+        self.assertEqual(dict(skipped), {'missing_title': 2, 'bad_price': 1})
+
+    @patch('requests.Session.get')
+    def test_skip_reasons_survive_the_process_pool(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = CATALOGUE_HTML
+        mock_response.content = CATALOGUE_HTML.encode('utf-8')
+        mock_response.from_cache = False
+        mock_get.return_value = mock_response
+        for parse_workers in (0, 2):
+            with self.subTest(parse_workers=parse_workers):
+                REGISTRY.reset()
+                scrape_data(parser='lxml', parse_workers=parse_workers)
+                skipped = REGISTRY.get('scraper_products_skipped_total')
+                self.assertEqual(skipped.value(reason='missing_title'), 100)
+                self.assertEqual(skipped.value(reason='bad_price'), 50)
+                self.assertEqual(REGISTRY.get('scraper_products_parsed_total').value(), 150)
+                self.assertEqual(REGISTRY.get('scraper_pages_total').value(status='ok'), 50)
+                self.assertEqual(REGISTRY.get('scraper_page_fetch_seconds').count(), 50)
+                self.assertEqual(REGISTRY.get('scraper_bytes_downloaded_total').value(), 50 * len(mock_response.content))
+
+    def test_parse_pagination(self):
+        html = """
+        <ul class="pagination">
+            <li class="page-item"><a class="page-link" href="/">1</a></li>
+            <li class="page-item"><a class="page-link" href="/page2">2</a></li>
+            <li class="page-item next"><a class="page-link" href="/page2">Next <span>&raquo;</span></a></li>
+        </ul>
+        <p>Page 1 of 50</p>
+        """
+        self.assertEqual(parse_pagination(html), (2, 50))
+        self.assertEqual(parse_pagination('<a rel="next" href="https://example.com/page8/?sort=asc">&gt;</a>'), (8, 8))
+        self.assertEqual(parse_pagination('<a href="/about">Next</a>'), (None, None))
+        self.assertEqual(parse_pagination(CATALOGUE_HTML), (None, None))
+        self.assertEqual(parse_pagination(None), (None, None))
+        self.assertEqual(parse_stated_pages(html), 50)
+        self.assertIsNone(parse_stated_pages('<a rel="next" href="/page8">&gt;</a>'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.ratelimit import AdaptiveLimiter, HostController
+from utils.session import PooledSession
+
+class ThrottlingServer:
+    """
+    Serves every path after service_time seconds, but answers 429 with a Retry-After when more
+    than capacity requests are in flight at once.
+    """
+
+    def __init__(self, capacity=None, service_time=0.01, retry_after='0.05'):
+        self.capacity = capacity
+        self.service_time = service_time
+        self.retry_after = retry_after
+        self.active = 0
+        self.stats = {'ok': 0, 'throttled': 0}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.active += 1
+                    throttled = server.capacity is not None and server.active > server.capacity
+                    server.stats['throttled' if throttled else 'ok'] += 1
+                try:
+                    if not throttled:
+                        time.sleep(server.service_time)
+                    body = b"slow down" if throttled else b"ok"
+                    self.send_response(429 if throttled else 200)
+                    if throttled:
+                        self.send_header('Retry-After', server.retry_after)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+def fetch_all(server, limiter, requests_count, threads=32):
+    with PooledSession(max_retries=20, backoff_factor=0.01, backoff_max=0.05, pool_maxsize=threads,
+                       limiter=limiter) as session:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return [response.status_code for response in executor.map(session.get, [server.url] * requests_count)]
+
+class TestHostController(unittest.TestCase):
+    def test_flat_latency_grows_limits(self):
+        host = HostController(rate=10, concurrency=2)
+        for _ in range(4):
+            host.acquire()
+            host.release(0.05, 200)
+        self.assertEqual(host.concurrency, 6)
+        self.assertGreater(host.rate, 10)
+        self.assertTrue(host.slow_start)
+
+    def test_throttling_backs_off_once_per_round_trip(self):
+        host = HostController(rate=40, concurrency=16, max_concurrency=64)
+        for _ in range(3):
+            host.acquire()
+        host.release(0.1, 429, retry_after=0.2)
+        host.release(0.1, 503)
+        self.assertEqual((host.concurrency, host.rate, host.decreases), (8, 20.0, 1))
+        self.assertFalse(host.slow_start)
+        started = time.monotonic()
+        host.release(0.1, 200)
+        host.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+
+        # Past slow start, growth is additive: about one slot per round of limit responses.
+        for _ in range(8):
+            host.release(0.1, 200)
+            host.acquire()
+        self.assertEqual(host.concurrency, 9)
+
+    def test_rising_latency_holds_limits(self):
+        host = HostController(rate=10, concurrency=4)
+        host.acquire()
+        host.release(0.05, 200)
+        snapshot = host.snapshot()
+        for _ in range(3):
+            host.acquire()
+            host.release(0.5, 200)
+        self.assertEqual(host.concurrency, snapshot['concurrency'])
+        self.assertEqual(host.snapshot()['rate'], snapshot['rate'])
+        self.assertFalse(host.slow_start)
+
+    def test_connection_errors_count_as_throttling(self):
+        host = HostController(concurrency=4)
+        host.acquire()
+        host.release(1.0)
+        self.assertEqual(host.concurrency, 2)
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_limiter_keeps_one_controller_per_host(self):
+        limiter = AdaptiveLimiter(concurrency=3)
+        self.assertIs(limiter.host("http://a.example/page2"), limiter.host("http://a.example/"))
+        self.assertIsNot(limiter.host("http://a.example/"), limiter.host("http://b.example/"))
+        self.assertEqual(set(limiter.stats()), {'a.example', 'b.example'})
+        self.assertEqual(limiter.stats()['a.example']['concurrency'], 3)
+
+    def test_ramps_up_against_an_unthrottled_server(self):
+        limiter = AdaptiveLimiter(rate=20, concurrency=1, max_rate=2000)
+        with ThrottlingServer(service_time=0.05) as server:
+            statuses = fetch_all(server, limiter, 150)
+        self.assertEqual(statuses, [200] * 150)
+        host = next(iter(limiter.stats().values()))
+        self.assertGreaterEqual(host['concurrency'], 8)
+        self.assertEqual(host['decreases'], 0)
+
+    def test_settles_below_a_throttling_server(self):
+        limiter = AdaptiveLimiter(rate=20, concurrency=2, max_rate=2000)
+        with ThrottlingServer(capacity=4, service_time=0.05) as server:
+            statuses = fetch_all(server, limiter, 200)
+        self.assertEqual(statuses, [200] * 200)
+        host = next(iter(limiter.stats().values()))
+        self.assertGreaterEqual(host['decreases'], 1)
+        self.assertLessEqual(host['concurrency'], 8)
+        # Throttled attempts stay a small share of the traffic once the limit settles.
+        self.assertLess(server.stats['throttled'], server.stats['ok'] / 3)
+
+if __name__ == '__main__':
+    unittest.main()
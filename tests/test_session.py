@@ -0,0 +1,176 @@
+import unittest
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.session import PooledSession, ResponseTooLarge, backoff_delay, parse_retry_after
+from unittest.mock import patch, MagicMock
+import requests
+
+def make_response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class CompressingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body = b"<html>" + b"<div class='product-card'>T-shirt</div>" * 2000 + b"</html>"
+
+    def do_GET(self):
+        body = self.body
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        # /chunked sends no Content-Length, so only the decoded size can trip the limit.
+        if self.path == '/chunked':
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self.wfile.write(f"{len(body):x}\r\n".encode() + body + b"\r\n0\r\n\r\n")
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+class TestSession(unittest.TestCase):
+    def test_backoff_delay_bounds(self):
+        for attempt in range(10):
+            delay = backoff_delay(attempt, backoff_factor=0.5, backoff_max=4.0)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(4.0, 0.5 * 2 ** attempt))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('3'), 3.0)
+        self.assertIsNone(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'))
+        self.assertIsNone(parse_retry_after(None))
+
+    @patch('utils.session.time.sleep')
+    @patch('requests.Session.get')
+    def test_retries_on_retryable_status(self, mock_get, mock_sleep):
+        mock_get.side_effect = [make_response(503), make_response(429), make_response(200)]
+        session = PooledSession(max_retries=3)
+        response = session.get('http://example.test/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(session.stats['retries'], 2)
+        self.assertEqual(session.stats['give_ups'], 0)
+
+    @patch('utils.session.time.sleep')
+    @patch('requests.Session.get')
+    def test_honours_retry_after(self, mock_get, mock_sleep):
+        mock_get.side_effect = [make_response(429, {'Retry-After': '2'}), make_response(200)]
+        session = PooledSession(max_retries=1, backoff_factor=0.01)
+        session.get('http://example.test/')
+        self.assertGreaterEqual(mock_sleep.call_args[0][0], 2.0)
+
+    @patch('utils.session.time.sleep')
+    @patch('requests.Session.get')
+    def test_gives_up_after_max_retries(self, mock_get, mock_sleep):
+        mock_get.return_value = make_response(500)
+        session = PooledSession(max_retries=2)
+        response = session.get('http://example.test/')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(session.stats['give_ups'], 1)
+
+    @patch('utils.session.time.sleep')
+    @patch('requests.Session.get')
+    def test_retries_timeouts_then_raises(self, mock_get, mock_sleep):
+        mock_get.side_effect = requests.Timeout("Mocked timeout")
+        session = PooledSession(max_retries=2)
+        with self.assertRaises(requests.Timeout):
+            session.get('http://example.test/')
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(session.stats['retries'], 2)
+        self.assertEqual(session.stats['give_ups'], 1)
+
+    @patch('utils.session.time.sleep')
+    @patch('requests.Session.get')
+    def test_does_not_retry_client_errors(self, mock_get, mock_sleep):
+        mock_get.return_value = make_response(404)
+        session = PooledSession()
+        self.assertEqual(session.get('http://example.test/').status_code, 404)
+        self.assertEqual(mock_get.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch('requests.Session.get')
+    def test_applies_default_timeout(self, mock_get):
+        mock_get.return_value = make_response(200)
+        PooledSession(timeout=7).get('http://example.test/')
+        self.assertEqual(mock_get.call_args[1]['timeout'], 7)
+
+    def test_reuses_keep_alive_connections(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/"
+            with PooledSession() as session:
+                for _ in range(5):
+                    self.assertEqual(session.get(url).text, "ok")
+                stats = session.stats
+            self.assertEqual(stats['requests'], 5)
+            self.assertEqual(stats['connections_opened'], 1)
+            self.assertEqual(stats['connections_reused'], 4)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_negotiates_compression_and_counts_wire_bytes(self):
+        server, base_url = serve(CompressingHandler)
+        try:
+            with PooledSession() as session:
+                response = session.get(base_url + '/')
+                stats = session.stats
+            self.assertIn('gzip', response.request.headers['Accept-Encoding'])
+            self.assertEqual(response.content, CompressingHandler.body)
+            self.assertEqual(response.body_bytes, len(CompressingHandler.body))
+            self.assertEqual(response.wire_bytes, len(gzip.compress(CompressingHandler.body)))
+            self.assertLess(response.wire_bytes * 10, response.body_bytes)
+            self.assertEqual((stats['bytes_received'], stats['bytes_decoded']), (response.wire_bytes, response.body_bytes))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_rejects_bodies_over_max_body_bytes(self):
+        server, base_url = serve(CompressingHandler)
+        try:
+            size = len(CompressingHandler.body)
+            with PooledSession(max_body_bytes=size) as session:
+                self.assertEqual(len(session.get(base_url + '/chunked').content), size)
+            with PooledSession(max_body_bytes=size - 1, max_retries=0) as session:
+                # Both a small compressed body that decodes past the limit and an unsized one fail.
+                for path in ('/', '/chunked'):
+                    with self.subTest(path=path), self.assertRaises(ResponseTooLarge):
+                        session.get(base_url + path)
+            with PooledSession(headers={'Accept-Encoding': 'identity'}, max_body_bytes=size - 1) as session:
+                with self.assertRaises(ResponseTooLarge):
+                    session.get(base_url + '/')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
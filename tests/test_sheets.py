@@ -0,0 +1,340 @@
+import unittest
+import os
+import re
+import shutil
+import stat
+import tempfile
+from datetime import datetime, timedelta
+import pandas as pd
+from utils.sheets import ChunkedUploader, SheetsClientCache, call_with_retry, chunk_rows, diff_rows, normalize_cell, sync_worksheet
+from utils.load import save_to_google_sheets, to_sheet_rows
+from utils.ratelimit import RateLimiter
+from unittest.mock import patch, MagicMock
+import gspread
+
+HEADER = ['Title', 'Price', 'Rating', 'Colors', 'Size', 'Gender', 'timestamp', 'page_number']
+
+def make_rows(count, timestamp='2025-05-05 00:00:00'):
+    return [HEADER] + [[f"Product{i}", 160000.0 * i, 4.5, 3, 'M', 'Men', timestamp, 1 + i // 20] for i in range(count)]
+
+def api_error(code):
+    response = MagicMock()
+    response.json.return_value = {'error': {'code': code, 'message': 'Quota exceeded'}}
+    return gspread.exceptions.APIError(response)
+
+def normalize_row(row):
+    # Unchanged rows keep the timestamp of the run that last wrote them.
+    return [normalize_cell(cell) for name, cell in zip(HEADER, row) if name != 'timestamp']
+
+class FakeWorksheet:
+    """
+    Keeps the grid in memory and applies gspread calls to it, counting requests and cells written.
+    """
+
+    def __init__(self, rows):
+        self.grid = [list(row) for row in rows]
+        self.id = 0
+        self.calls = []
+        self.cells_written = 0
+        self.spreadsheet = MagicMock()
+        self.spreadsheet.batch_update.side_effect = self._spreadsheet_batch_update
+
+    def get_all_values(self, value_render_option=None):
+        self.calls.append('get_all_values')
+        # Sheets returns whole numbers without a decimal part.
+        return [[int(cell) if isinstance(cell, float) and cell.is_integer() else cell for cell in row] for row in self.grid]
+
+    def clear(self):
+        self.calls.append('clear')
+        self.grid = []
+
+    def update(self, values, range_name=None):
+        self.calls.append('update')
+        first = int(re.findall(r'\d+', range_name)[0]) if range_name else 1
+        self.grid.extend([] for _ in range(first - 1 + len(values) - len(self.grid)))
+        for number, row in enumerate(values, start=first):
+            self.grid[number - 1] = list(row)
+        self.cells_written += sum(len(row) for row in values)
+
+    def batch_update(self, data, value_input_option=None):
+        self.calls.append('batch_update')
+        for item in data:
+            first, last = (int(n) for n in re.findall(r'\d+', item['range']))
+            for number, row in zip(range(first, last + 1), item['values']):
+                self.grid[number - 1] = list(row)
+                self.cells_written += len(row)
+
+    def append_rows(self, values, value_input_option=None, table_range=None):
+        self.calls.append('append_rows')
+        self.grid.extend(list(row) for row in values)
+        self.cells_written += sum(len(row) for row in values)
+
+    def _spreadsheet_batch_update(self, body):
+        self.calls.append('delete_rows')
+        for request in body['requests']:
+            span = request['deleteDimension']['range']
+            del self.grid[span['startIndex']:span['endIndex']]
+
+class TestSheets(unittest.TestCase):
+    def setUp(self):
+        limiter = patch('utils.sheets.WRITE_LIMITER', RateLimiter(10 ** 6, period=1.0))
+        limiter.start()
+        self.addCleanup(limiter.stop)
+
+    def assertSameRows(self, grid, rows):
+        self.assertEqual(grid[0], rows[0])
+        key = lambda row: row[0]
+        self.assertEqual(sorted(map(normalize_row, grid[1:]), key=key), sorted(map(normalize_row, rows[1:]), key=key))
+
+    def test_normalize_cell(self):
+        self.assertEqual(normalize_cell(1600000), normalize_cell(1600000.0))
+        self.assertEqual(normalize_cell(None), '')
+        self.assertNotEqual(normalize_cell('3'), normalize_cell(3))
+
+    def test_diff_rows(self):
+        current = make_rows(5)
+        new = make_rows(6, timestamp='2025-05-06 00:00:00')
+        new[2][1] = 1.0
+        del new[4]
+        delta = diff_rows(current, new)
+        self.assertEqual(list(delta['changed']), [3])
+        self.assertEqual(delta['removed'], [5])
+        self.assertEqual([row[0] for row in delta['added']], ['Product5'])
+
+    def test_diff_rows_requires_matching_header_and_unique_keys(self):
+        self.assertIsNone(diff_rows([], make_rows(2)))
+        self.assertIsNone(diff_rows([HEADER[:-1]], make_rows(2)))
+        duplicated = make_rows(2)
+        duplicated.append(list(duplicated[1]))
+        self.assertIsNone(diff_rows(make_rows(2), duplicated))
+
+    def test_delta_sync_writes_only_changed_rows(self):
+        worksheet = FakeWorksheet(make_rows(1000))
+        new = make_rows(1001, timestamp='2025-05-06 00:00:00')
+        for number in (10, 11, 12, 500):
+            new[number][1] += 1.0
+        del new[700]
+
+        stats = sync_worksheet(worksheet, new)
+        self.assertEqual((stats['changed'], stats['added'], stats['removed']), (4, 1, 1))
+        self.assertEqual(stats['cells_written'], 5 * len(HEADER))
+        self.assertEqual(worksheet.cells_written, 5 * len(HEADER))
+        self.assertEqual(worksheet.calls, ['get_all_values', 'batch_update', 'delete_rows', 'append_rows'])
+        self.assertSameRows(worksheet.grid, new)
+
+    def test_delta_sync_without_changes_sends_nothing(self):
+        worksheet = FakeWorksheet(make_rows(50))
+        stats = sync_worksheet(worksheet, make_rows(50, timestamp='2025-05-06 00:00:00'))
+        self.assertEqual(stats['cells_written'], 0)
+        self.assertEqual(worksheet.calls, ['get_all_values'])
+
+    def test_delta_sync_rewrites_empty_sheet(self):
+        worksheet = FakeWorksheet([])
+        stats = sync_worksheet(worksheet, make_rows(3))
+        self.assertEqual(stats['mode'], 'rewrite')
+        self.assertEqual(worksheet.calls, ['get_all_values', 'clear', 'update'])
+        self.assertEqual(worksheet.grid, make_rows(3))
+
+    def test_snapshot_replaces_sheet_read(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sheet.json')
+            worksheet = FakeWorksheet([])
+            sync_worksheet(worksheet, make_rows(10), snapshot_path=path)
+
+            new = make_rows(10)
+            new[4][2] = 3.9
+            worksheet.calls = []
+            stats = sync_worksheet(worksheet, new, snapshot_path=path)
+            self.assertEqual(worksheet.calls, ['batch_update'])
+            self.assertEqual(stats['cells_written'], len(HEADER))
+
+            new.append(['Product99', 1.0, 4.0, 1, 'S', 'Women', '2025-05-06 00:00:00', 5])
+            del new[1]
+            worksheet.calls = []
+            sync_worksheet(worksheet, new, snapshot_path=path)
+            self.assertEqual(worksheet.calls, ['delete_rows', 'append_rows'])
+            self.assertSameRows(worksheet.grid, new)
+
+    def test_chunk_rows_respects_cell_budget(self):
+        rows = make_rows(1000)
+        chunks = chunk_rows(rows, cell_budget=1000)
+        self.assertEqual([len(chunk) for chunk in chunks], [125] * 8 + [1])
+        self.assertEqual(sum(chunks, []), rows)
+        self.assertEqual(len(chunk_rows([['x'] * 20], cell_budget=10)), 1)
+
+    def test_chunked_upload_writes_consecutive_ranges(self):
+        worksheet = FakeWorksheet([])
+        rows = make_rows(1000)
+        uploader = ChunkedUploader(worksheet, rows, cell_budget=1000)
+        self.assertEqual(uploader.run(), 1001 * len(HEADER))
+        self.assertEqual(worksheet.calls, ['update'] * 9)
+        self.assertEqual(worksheet.grid, rows)
+        self.assertTrue(uploader.done)
+
+    @patch('utils.sheets.time.sleep')
+    def test_chunked_upload_retries_quota_errors(self, mock_sleep):
+        worksheet = FakeWorksheet([])
+        worksheet.update = MagicMock(side_effect=[api_error(429), api_error(503), None, None])
+        uploader = ChunkedUploader(worksheet, make_rows(23), cell_budget=100)
+        uploader.run()
+        self.assertEqual(worksheet.update.call_count, 4)
+        self.assertEqual(mock_sleep.call_count, 2)
+        ranges = [call.args[1] for call in worksheet.update.call_args_list]
+        self.assertEqual(ranges, ['A1:H12', 'A1:H12', 'A1:H12', 'A13:H24'])
+
+    @patch('utils.sheets.time.sleep')
+    def test_chunked_upload_resumes_after_failure(self, mock_sleep):
+        worksheet = FakeWorksheet([])
+        rows = make_rows(35)
+        update = worksheet.update
+        failures = iter([None, api_error(429), api_error(429), api_error(429)])
+
+        def flaky_update(values, range_name=None):
+            error = next(failures, None)
+            if error:
+                raise error
+            update(values, range_name)
+
+        worksheet.update = flaky_update
+        uploader = ChunkedUploader(worksheet, rows, cell_budget=100, max_retries=2)
+        with self.assertRaises(gspread.exceptions.APIError):
+            uploader.run()
+        self.assertEqual(uploader.next_chunk, 1)
+        uploader.run()
+        self.assertEqual(worksheet.grid, rows)
+        self.assertEqual(worksheet.calls, ['update'] * 3)
+
+    @patch('utils.sheets.time.sleep')
+    def test_run_resuming_continues_from_failed_chunk(self, mock_sleep):
+        worksheet = FakeWorksheet([])
+        rows = make_rows(35)
+        update = worksheet.update
+        failures = iter([None, api_error(503), api_error(503), api_error(503), None, api_error(400)])
+
+        def flaky_update(values, range_name=None):
+            error = next(failures, None)
+            if error:
+                raise error
+            update(values, range_name)
+
+        worksheet.update = flaky_update
+        uploader = ChunkedUploader(worksheet, rows, cell_budget=100, max_retries=2)
+        with self.assertRaises(gspread.exceptions.APIError):
+            uploader.run_resuming()
+        # Chunk 2 used up its retries and was resumed in place; the 400 on chunk 3 is not retried.
+        self.assertEqual(worksheet.calls, ['update'] * 2)
+        self.assertEqual(uploader.next_chunk, 2)
+        self.assertEqual(uploader.run_resuming(), 36 * len(HEADER))
+        self.assertEqual(worksheet.grid, rows)
+
+    def test_non_retryable_errors_are_raised(self):
+        call = MagicMock(side_effect=api_error(400))
+        with self.assertRaises(gspread.exceptions.APIError):
+            call_with_retry(call)
+        self.assertEqual(call.call_count, 1)
+
+    @patch('utils.ratelimit.time.sleep')
+    @patch('utils.ratelimit.time.monotonic', return_value=100.0)
+    def test_rate_limiter_waits_for_tokens(self, mock_monotonic, mock_sleep):
+        limiter = RateLimiter(60, period=60.0, capacity=2)
+        mock_sleep.side_effect = lambda delay: setattr(mock_monotonic, 'return_value', mock_monotonic.return_value + delay)
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertAlmostEqual(limiter.acquire(), 1.0)
+        mock_sleep.assert_called_once()
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_save_to_google_sheets_delta_mode(self, mock_creds, mock_authorize):
+        df = pd.DataFrame(make_rows(3)[1:], columns=HEADER)
+        worksheet = FakeWorksheet(to_sheet_rows(df))
+        mock_authorize.return_value.open.return_value.get_worksheet.return_value = worksheet
+        df.loc[1, 'Price'] = 1.0
+        save_to_google_sheets(df, 'Test_Sheet', mode='delta')
+        self.assertNotIn('clear', worksheet.calls)
+        self.assertEqual(worksheet.cells_written, len(HEADER))
+        self.assertEqual(worksheet.grid, to_sheet_rows(df))
+
+    def test_save_to_google_sheets_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            save_to_google_sheets(pd.DataFrame({'Title': ['Product1']}), 'Test_Sheet', mode='merge')
+
+class TestSheetsClientCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.state_path = os.path.join(self.directory, 'state.json')
+        limiter = patch('utils.sheets.WRITE_LIMITER', RateLimiter(10 ** 6, period=1.0))
+        limiter.start()
+        self.addCleanup(limiter.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_client(self, mock_creds, mock_authorize):
+        creds = MagicMock(service_account_email='etl@example.iam.gserviceaccount.com', token=None, expiry=None)
+        mock_creds.return_value = creds
+        client = MagicMock()
+        mock_authorize.return_value = client
+        spreadsheet = client.open.return_value
+        spreadsheet.id = 'sheet-id'
+        spreadsheet.list_permissions.return_value = [{'type': 'user', 'role': 'owner'}]
+        client.open_by_key.return_value = spreadsheet
+
+        def authorize(credentials):
+            credentials.token = 'token-1'
+            credentials.expiry = datetime.utcnow() + timedelta(hours=1)
+            return client
+        mock_authorize.side_effect = authorize
+        return creds, client, spreadsheet
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_reuses_client_and_handle_within_a_run(self, mock_creds, mock_authorize):
+        creds, client, spreadsheet = self.make_client(mock_creds, mock_authorize)
+        df = pd.DataFrame(make_rows(2)[1:], columns=HEADER)
+        cache = SheetsClientCache(state_path=self.state_path)
+        save_to_google_sheets(df, 'Test_Sheet', cache=cache)
+        save_to_google_sheets(df, 'Test_Sheet', cache=cache)
+        self.assertEqual(mock_creds.call_count, 1)
+        self.assertEqual(mock_authorize.call_count, 1)
+        client.open.assert_called_once_with('Test_Sheet')
+        spreadsheet.share.assert_called_once()
+        spreadsheet.list_permissions.assert_called_once()
+        self.assertEqual(stat.S_IMODE(os.stat(self.state_path).st_mode), 0o600)
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_restores_token_and_spreadsheet_id_across_runs(self, mock_creds, mock_authorize):
+        creds, client, spreadsheet = self.make_client(mock_creds, mock_authorize)
+        df = pd.DataFrame(make_rows(2)[1:], columns=HEADER)
+        save_to_google_sheets(df, 'Test_Sheet', cache=SheetsClientCache(state_path=self.state_path))
+
+        creds, client, spreadsheet = self.make_client(mock_creds, mock_authorize)
+        mock_authorize.side_effect = None
+        save_to_google_sheets(df, 'Test_Sheet', cache=SheetsClientCache(state_path=self.state_path))
+        self.assertEqual(creds.token, 'token-1')
+        client.open.assert_not_called()
+        client.open_by_key.assert_called_once_with('sheet-id')
+        spreadsheet.share.assert_not_called()
+        spreadsheet.list_permissions.assert_not_called()
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_existing_permission_skips_share(self, mock_creds, mock_authorize):
+        creds, client, spreadsheet = self.make_client(mock_creds, mock_authorize)
+        spreadsheet.list_permissions.return_value = [{'type': 'anyone', 'role': 'writer'}]
+        save_to_google_sheets(pd.DataFrame(make_rows(1)[1:], columns=HEADER), 'Test_Sheet', cache=SheetsClientCache(state_path=self.state_path))
+        spreadsheet.share.assert_not_called()
+
+    @patch('gspread.authorize')
+    @patch('google.oauth2.service_account.Credentials.from_service_account_file')
+    def test_stale_spreadsheet_id_falls_back_to_name_lookup(self, mock_creds, mock_authorize):
+        creds, client, spreadsheet = self.make_client(mock_creds, mock_authorize)
+        SheetsClientCache(state_path=self.state_path).open('Test_Sheet')
+        creds, client, spreadsheet = self.make_client(mock_creds, mock_authorize)
+        client.open_by_key.side_effect = gspread.SpreadsheetNotFound
+        self.assertIs(SheetsClientCache(state_path=self.state_path).open('Test_Sheet'), spreadsheet)
+        client.open.assert_called_once_with('Test_Sheet')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,145 +1,250 @@
-import unittest
-import pandas as pd
-from utils.transform import transform_data
-
-class TestTransform(unittest.TestCase):
-    def test_transform_success(self):
-        df = pd.DataFrame({
-            'Title': ['Product1'],
-            'Price': ['100'],
-            'Rating': ['4.5 / 5'],
-            'Colors': ['3 Colors'],
-            'Size': ['Size: M'],
-            'Gender': ['Gender: Men'],
-            'timestamp': ['2025-05-05'],
-            'page_number': [1]
-        })
-        result = transform_data(df)
-        self.assertFalse(result.empty, "DataFrame should not be empty")
-        self.assertEqual(result['Price'].iloc[0], 1600000.0)  # 100 USD * 16000
-        self.assertEqual(result['Rating'].iloc[0], 4.5)
-        self.assertEqual(result['Colors'].iloc[0], 3)
-        self.assertEqual(result['Size'].iloc[0], 'M')
-        self.assertEqual(result['Gender'].iloc[0], 'Men')
-
-    def test_transform_empty_df(self):
-        df = pd.DataFrame()
-        result = transform_data(df)
-        self.assertTrue(result.empty, "Empty DataFrame should remain empty")
-
-    def test_transform_invalid_price(self):
-        df = pd.DataFrame({
-            'Title': ['Product1'],
-            'Price': ['invalid'],
-            'Rating': ['4.5 / 5'],
-            'Colors': ['3 Colors'],
-            'Size': ['Size: M'],
-            'Gender': ['Gender: Men'],
-            'timestamp': ['2025-05-05'],
-            'page_number': [1]
-        })
-        result = transform_data(df)
-        self.assertTrue(result.empty, "DataFrame with invalid price should be filtered out")
-
-    def test_transform_price_unavailable(self):
-        df = pd.DataFrame({
-            'Title': ['Product1'],
-            'Price': ['Price Unavailable'],
-            'Rating': ['4.5 / 5'],
-            'Colors': ['3 Colors'],
-            'Size': ['Size: M'],
-            'Gender': ['Gender: Men'],
-            'timestamp': ['2025-05-05'],
-            'page_number': [1]
-        })
-        result = transform_data(df)
-        self.assertTrue(result.empty, "DataFrame with 'Price Unavailable' should be filtered out")
-
-    def test_transform_invalid_colors(self):
-        df = pd.DataFrame({
-            'Title': ['Product1'],
-            'Price': ['100'],
-            'Rating': ['4.5 / 5'],
-            'Colors': ['Invalid Colors'],
-            'Size': ['Size: M'],
-            'Gender': ['Gender: Men'],
-            'timestamp': ['2025-05-05'],
-            'page_number': [1]
-        })
-        result = transform_data(df)
-        self.assertTrue(result.empty, "DataFrame with invalid colors should be filtered out")
-
-    def test_transform_invalid_rating(self):
-        df = pd.DataFrame({
-            'Title': ['Product1'],
-            'Price': ['100'],
-            'Rating': ['Invalid Rating'],
-            'Colors': ['3 Colors'],
-            'Size': ['Size: M'],
-            'Gender': ['Gender: Men'],
-            'timestamp': ['2025-05-05'],
-            'page_number': [1]
-        })
-        result = transform_data(df)
-        self.assertFalse(result.empty, "DataFrame with invalid rating should set rating to 0")
-        self.assertEqual(result['Rating'].iloc[0], 0.0)
-
-    def test_transform_duplicates(self):
-        df = pd.DataFrame({
-            'Title': ['Product1', 'Product1'],
-            'Price': ['100', '100'],
-            'Rating': ['4.5 / 5', '4.5 / 5'],
-            'Colors': ['3 Colors', '3 Colors'],
-            'Size': ['Size: M', 'Size: M'],
-            'Gender': ['Gender: Men', 'Gender: Men'],
-            'timestamp': ['2025-05-05', '2025-05-05'],
-            'page_number': [1, 1]
-        })
-        result = transform_data(df)
-        self.assertEqual(len(result), 1, "Duplicates should be removed")
-
-    def test_transform_null_values(self):
-        df = pd.DataFrame({
-            'Title': [None],
-            'Price': ['100'],
-            'Rating': ['4.5 / 5'],
-            'Colors': ['3 Colors'],
-            'Size': ['Size: M'],
-            'Gender': ['Gender: Men'],
-            'timestamp': ['2025-05-05'],
-            'page_number': [1]
-        })
-        result = transform_data(df)
-        self.assertTrue(result.empty, "DataFrame with null Title should be filtered out")
-
-    def test_transform_empty_size_gender(self):
-        df = pd.DataFrame({
-            'Title': ['Product1'],
-            'Price': ['100'],
-            'Rating': ['4.5 / 5'],
-            'Colors': ['3 Colors'],
-            'Size': [''],
-            'Gender': [''],
-            'timestamp': ['2025-05-05'],
-            'page_number': [1]
-        })
-        result = transform_data(df)
-        self.assertTrue(result.empty, "DataFrame with empty Size or Gender should be filtered out")
-
-    def test_transform_null_rating(self):
-        df = pd.DataFrame({
-            'Title': ['Product1'],
-            'Price': ['100'],
-            'Rating': [None],
-            'Colors': ['3 Colors'],
-            'Size': ['Size: M'],
-            'Gender': ['Gender: Men'],
-            'timestamp': ['2025-05-05'],
-            'page_number': [1]
-        })
-        result = transform_data(df)
-        self.assertFalse(result.empty, "DataFrame with null Rating should set rating to 0")
-        self.assertEqual(result['Rating'].iloc[0], 0.0)
-
-if __name__ == '__main__':
+import unittest
+import warnings
+import pandas as pd
+from benchmarks.bench_transform import make_synthetic_frame, transform_data_rowwise
+from utils.transform import compact_dtypes, memory_report, transform_batches, transform_data
+
+class TestTransform(unittest.TestCase):
+    def test_transform_success(self):
+        df = pd.DataFrame({
+            'Title': ['Product1'],
+            'Price': ['100'],
+            'Rating': ['4.5 / 5'],
+            'Colors': ['3 Colors'],
+            'Size': ['Size: M'],
+            'Gender': ['Gender: Men'],
+            'timestamp': ['2025-05-05'],
+            'page_number': [1]
+        })
+        result = transform_data(df)
+        self.assertFalse(result.empty, "DataFrame should not be empty")
+        self.assertEqual(result['Price'].iloc[0], 1600000.0)  # 100 USD * 16000
+        self.assertEqual(result['Rating'].iloc[0], 4.5)
+        self.assertEqual(result['Colors'].iloc[0], 3)
+        self.assertEqual(result['Size'].iloc[0], 'M')
+        self.assertEqual(result['Gender'].iloc[0], 'Men')
+
+    def test_transform_empty_df(self):
+        df = pd.DataFrame()
+        result = transform_data(df)
+        self.assertTrue(result.empty, "Empty DataFrame should remain empty")
+
+    def test_transform_invalid_price(self):
+        df = pd.DataFrame({
+            'Title': ['Product1'],
+            'Price': ['invalid'],
+            'Rating': ['4.5 / 5'],
+            'Colors': ['3 Colors'],
+            'Size': ['Size: M'],
+            'Gender': ['Gender: Men'],
+            'timestamp': ['2025-05-05'],
+            'page_number': [1]
+        })
+        result = transform_data(df)
+        self.assertTrue(result.empty, "DataFrame with invalid price should be filtered out")
+
+    def test_transform_price_unavailable(self):
+        df = pd.DataFrame({
+            'Title': ['Product1'],
+            'Price': ['Price Unavailable'],
+            'Rating': ['4.5 / 5'],
+            'Colors': ['3 Colors'],
+            'Size': ['Size: M'],
+            'Gender': ['Gender: Men'],
+            'timestamp': ['2025-05-05'],
+            'page_number': [1]
+        })
+        result = transform_data(df)
+        self.assertTrue(result.empty, "DataFrame with 'Price Unavailable' should be filtered out")
+
+    def test_transform_invalid_colors(self):
+        df = pd.DataFrame({
+            'Title': ['Product1'],
+            'Price': ['100'],
+            'Rating': ['4.5 / 5'],
+            'Colors': ['Invalid Colors'],
+            'Size': ['Size: M'],
+            'Gender': ['Gender: Men'],
+            'timestamp': ['2025-05-05'],
+            'page_number': [1]
+        })
+        result = transform_data(df)
+        self.assertTrue(result.empty, "DataFrame with invalid colors should be filtered out")
+
+    def test_transform_invalid_rating(self):
+        df = pd.DataFrame({
+            'Title': ['Product1'],
+            'Price': ['100'],
+            'Rating': ['Invalid Rating'],
+            'Colors': ['3 Colors'],
+            'Size': ['Size: M'],
+            'Gender': ['Gender: Men'],
+            'timestamp': ['2025-05-05'],
+            'page_number': [1]
+        })
+        result = transform_data(df)
+        self.assertFalse(result.empty, "DataFrame with invalid rating should set rating to 0")
+        self.assertEqual(result['Rating'].iloc[0], 0.0)
+
+    def test_transform_duplicates(self):
+        df = pd.DataFrame({
+            'Title': ['Product1', 'Product1'],
+            'Price': ['100', '100'],
+            'Rating': ['4.5 / 5', '4.5 / 5'],
+            'Colors': ['3 Colors', '3 Colors'],
+            'Size': ['Size: M', 'Size: M'],
+            'Gender': ['Gender: Men', 'Gender: Men'],
+            'timestamp': ['2025-05-05', '2025-05-05'],
+            'page_number': [1, 1]
+        })
+        result = transform_data(df)
+        self.assertEqual(len(result), 1, "Duplicates should be removed")
+
+    def test_transform_null_values(self):
+        df = pd.DataFrame({
+            'Title': [None],
+            'Price': ['100'],
+            'Rating': ['4.5 / 5'],
+            'Colors': ['3 Colors'],
+            'Size': ['Size: M'],
+            'Gender': ['Gender: Men'],
+            'timestamp': ['2025-05-05'],
+            'page_number': [1]
+        })
+        result = transform_data(df)
+        self.assertTrue(result.empty, "DataFrame with null Title should be filtered out")
+
+    def test_transform_empty_size_gender(self):
+        df = pd.DataFrame({
+            'Title': ['Product1'],
+            'Price': ['100'],
+            'Rating': ['4.5 / 5'],
+            'Colors': ['3 Colors'],
+            'Size': [''],
+            'Gender': [''],
+            'timestamp': ['2025-05-05'],
+            'page_number': [1]
+        })
+        result = transform_data(df)
+        self.assertTrue(result.empty, "DataFrame with empty Size or Gender should be filtered out")
+
+    def test_transform_null_rating(self):
+        df = pd.DataFrame({
+            'Title': ['Product1'],
+            'Price': ['100'],
+            'Rating': [None],
+            'Colors': ['3 Colors'],
+            'Size': ['Size: M'],
+            'Gender': ['Gender: Men'],
+            'timestamp': ['2025-05-05'],
+            'page_number': [1]
+        })
+        result = transform_data(df)
+        self.assertFalse(result.empty, "DataFrame with null Rating should set rating to 0")
+        self.assertEqual(result['Rating'].iloc[0], 0.0)
+
+    def test_transform_batches_dedups_across_batches(self):
+        batches = [
+            pd.DataFrame({
+                'Title': ['Product1', 'Product2'],
+                'Price': ['100', 'invalid'],
+                'Rating': ['4.5 / 5', '4.0 / 5'],
+                'Colors': ['3 Colors', '3 Colors'],
+                'Size': ['Size: M', 'Size: L'],
+                'Gender': ['Gender: Men', 'Gender: Women'],
+                'timestamp': ['2025-05-05', '2025-05-05'],
+                'page_number': [1, 1]
+            }),
+            pd.DataFrame({
+                'Title': ['Product1', 'Product2', 'Product3'],
+                'Price': ['200', '50', '10'],
+                'Rating': ['3.0 / 5', '4.0 / 5', None],
+                'Colors': ['3 Colors', '2 Colors', '1 Colors'],
+                'Size': ['Size: S', 'Size: L', 'Size: XL'],
+                'Gender': ['Gender: Men', 'Gender: Women', 'Gender: Unisex'],
+                'timestamp': ['2025-05-05', '2025-05-05', '2025-05-05'],
+                'page_number': [2, 2, 2]
+            })
+        ]
+        streamed = pd.concat(list(transform_batches(iter(batches))), ignore_index=True)
+        expected = transform_data(pd.concat(batches, ignore_index=True)).reset_index(drop=True)
+        pd.testing.assert_frame_equal(streamed, expected)
+        self.assertEqual(streamed['Title'].tolist(), ['Product1', 'Product2', 'Product3'])
+        self.assertEqual(streamed['Price'].iloc[0], 1600000.0)
+
+    def test_transform_batches_skips_empty_batches(self):
+        self.assertEqual(list(transform_batches([pd.DataFrame()])), [])
+
+    def test_transform_matches_rowwise_baseline(self):
+        df = make_synthetic_frame(5000, seed=42)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            result = transform_data(df.copy())
+        pd.testing.assert_frame_equal(result, transform_data_rowwise(df.copy()))
+        self.assertFalse(result.empty)
+
+    def test_transform_keeps_index_and_input_untouched(self):
+        df = pd.DataFrame({
+            'Title': ['Product1', 'Unknown Product', 'Product2'],
+            'Price': ['100', '100', '50'],
+            'Rating': ['4.5 / 5', '4.5 / 5', 'Rating: 0.0 / 5'],
+            'Colors': ['3 Colors', '3 Colors', '1 Color'],
+            'Size': ['Size: M', 'Size: M', 'Size: L'],
+            'Gender': ['Gender: Men', 'Gender: Men', 'Gender: Women'],
+            'timestamp': ['2025-05-05', '2025-05-05', '2025-05-05'],
+            'page_number': [1, 1, 2]
+        }, index=[10, 11, 12])
+        original = df.copy()
+        result = transform_data(df)
+        self.assertEqual(result.index.tolist(), [10, 12])
+        self.assertEqual(result['Colors'].tolist(), [3, 1])
+        pd.testing.assert_frame_equal(df, original)
+
+    def test_compact_dtypes(self):
+        df = pd.DataFrame({
+            'Title': ['Product1', 'Product2'],
+            'Price': [1634400.0000000002, 7950079.999999999],
+            'Rating': [3.9, 4.8],
+            'Colors': [3, 5],
+            'Size': ['M', 'L'],
+            'Gender': ['Women', 'Unisex'],
+            'timestamp': ['2025-05-12 02:19:26', '2025-05-12 02:19:27'],
+            'page_number': [1, 50]
+        })
+        result = compact_dtypes(df)
+        self.assertEqual(result['Price'].tolist(), [1634400, 7950080])
+        self.assertEqual(str(result['Price'].dtype), 'int64')
+        self.assertEqual(str(result['Colors'].dtype), 'uint8')
+        self.assertEqual(str(result['page_number'].dtype), 'uint16')
+        self.assertEqual(str(result['Rating'].dtype), 'float32')
+        self.assertIsInstance(result['Size'].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(result['Gender'].dtype, pd.CategoricalDtype)
+        self.assertEqual(result['timestamp'].iloc[1], pd.Timestamp('2025-05-12 02:19:27'))
+        self.assertEqual(df['Price'].dtype, float, "Input frame should be left untouched")
+
+    def test_compact_dtypes_is_idempotent(self):
+        df = pd.DataFrame({
+            'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [3],
+            'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05 00:00:00'], 'page_number': [1]
+        })
+        compact = compact_dtypes(df)
+        pd.testing.assert_frame_equal(compact_dtypes(compact), compact)
+
+    def test_compact_dtypes_rejects_out_of_range_values(self):
+        df = pd.DataFrame({
+            'Title': ['Product1'], 'Price': [1600000.0], 'Rating': [4.5], 'Colors': [300],
+            'Size': ['M'], 'Gender': ['Men'], 'timestamp': ['2025-05-05 00:00:00'], 'page_number': [1]
+        })
+        with self.assertRaises(ValueError):
+            compact_dtypes(df)
+
+    def test_memory_report(self):
+        df = make_synthetic_frame(2000)
+        transformed = transform_data(df)
+        report = memory_report(transformed, compact_dtypes(transformed))
+        self.assertIn('total', report.index)
+        self.assertLess(report.loc['total', 'after_bytes'], report.loc['total', 'before_bytes'])
+        self.assertLess(report.loc['Size', 'after_bytes'], report.loc['Size', 'before_bytes'])
+
+if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
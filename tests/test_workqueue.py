@@ -0,0 +1,110 @@
+import unittest
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+from benchmarks.replay_server import ReplayServer, load_pages
+from utils.extract import scrape_data
+from utils.session import PooledSession
+from utils.transform import transform_data
+from utils.workqueue import (DONE, FAILED, LEASED, PENDING, WorkQueue, discover_last_page, merge_shards, reset_run,
+                             run_worker, run_workers)
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue_path = os.path.join(self.tmp.name, 'queue.db')
+        self.shard_dir = os.path.join(self.tmp.name, 'shards')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_seed_splits_pages_and_only_adds_new_ones(self):
+        queue = WorkQueue(self.queue_path)
+        self.assertEqual(queue.seed(25, shard_size=10), 3)
+        self.assertEqual([(s['first_page'], s['last_page']) for s in queue.shards()], [(1, 10), (11, 20), (21, 25)])
+        self.assertEqual(queue.seed(25, shard_size=10), 0)
+        self.assertEqual(queue.seed(32, shard_size=10), 1)
+        self.assertEqual(queue.shards()[-1]['first_page'], 26)
+
+    def test_lease_lifecycle(self):
+        queue = WorkQueue(self.queue_path, lease_seconds=60, max_attempts=2)
+        queue.seed(20, shard_size=10)
+        first = queue.lease('a')
+        second = queue.lease('b')
+        self.assertEqual((first['shard_id'], second['shard_id']), (1, 2))
+        self.assertIsNone(queue.lease('c'))
+        self.assertTrue(queue.renew(1, 'a'))
+        self.assertFalse(queue.renew(1, 'b'))
+        self.assertTrue(queue.complete(1, 'a', rows=200))
+        self.assertTrue(queue.release(2, 'b', "network down"))
+        self.assertEqual(queue.progress(), {PENDING: 1, LEASED: 0, DONE: 1, FAILED: 0})
+
+        retry = queue.lease('c')
+        self.assertEqual((retry['shard_id'], retry['attempts']), (2, 2))
+        queue.release(2, 'c', "network down")
+        self.assertEqual(queue.progress()[FAILED], 1)
+        self.assertEqual(queue.shards()[1]['error'], "network down")
+
+    def test_expired_lease_goes_to_the_next_worker(self):
+        queue = WorkQueue(self.queue_path, lease_seconds=60)
+        queue.seed(10, shard_size=10)
+        with patch('utils.workqueue.time.time', return_value=1000.0):
+            self.assertEqual(queue.lease('dead')['shard_id'], 1)
+        with patch('utils.workqueue.time.time', return_value=1100.0):
+            self.assertEqual(queue.lease('alive')['attempts'], 2)
+            self.assertFalse(queue.complete(1, 'dead', rows=10))
+            self.assertTrue(queue.complete(1, 'alive', rows=10))
+
+    def test_workers_and_merge_match_a_single_scrape(self):
+        pages = load_pages(recordings_dir=None, total_pages=23)
+        with ReplayServer(pages=pages) as server:
+            with PooledSession() as session:
+                last_page = discover_last_page(session, server.base_url)
+            self.assertEqual(last_page, 23)
+            WorkQueue(self.queue_path).seed(last_page, shard_size=5)
+            threads = [threading.Thread(target=run_worker, args=(self.queue_path, self.shard_dir, f"worker-{i}"),
+                                        kwargs={'max_workers': 2, 'parser': 'lxml', 'base_url': server.base_url})
+                       for i in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            expected = transform_data(scrape_data(max_workers=4, parser='lxml', base_url=server.base_url))
+
+        self.assertEqual(WorkQueue(self.queue_path).progress()[DONE], 5)
+        merged = merge_shards(self.shard_dir, self.queue_path)
+        self.assertEqual(merged['Title'].tolist(), expected['Title'].tolist())
+        self.assertTrue(merged['Title'].is_unique)
+        self.assertEqual(merged['Price'].tolist(), expected['Price'].tolist())
+
+        reset_run(self.queue_path, self.shard_dir)
+        self.assertFalse(os.path.exists(self.queue_path))
+        self.assertEqual(os.listdir(self.shard_dir), [])
+
+    @patch('utils.session.time.sleep')
+    def test_failing_shard_is_released_then_marked_failed(self, mock_sleep):
+        pages = load_pages(recordings_dir=None, total_pages=10)
+        del pages[7]
+        with ReplayServer(pages=pages) as server:
+            WorkQueue(self.queue_path, max_attempts=2).seed(10, shard_size=5)
+            completed = run_worker(self.queue_path, self.shard_dir, 'worker', max_attempts=2, parser='lxml',
+                                   base_url=server.base_url)
+        self.assertEqual(completed, 1)
+        shards = WorkQueue(self.queue_path).shards()
+        self.assertEqual([shard['status'] for shard in shards], [DONE, FAILED])
+        self.assertEqual(shards[1]['attempts'], 2)
+        self.assertIn("1 pages failed", shards[1]['error'])
+        with self.assertLogs('utils.workqueue', level='WARNING'):
+            merged = merge_shards(self.shard_dir, self.queue_path)
+        self.assertEqual(merged['page_number'].max(), 5)
+
+    def test_run_workers_in_processes(self):
+        with ReplayServer(pages=load_pages(recordings_dir=None, total_pages=8)) as server:
+            WorkQueue(self.queue_path).seed(8, shard_size=2)
+            progress = run_workers(2, self.queue_path, self.shard_dir, parser='lxml', base_url=server.base_url)
+        self.assertEqual(progress[DONE], 4)
+        self.assertEqual(len(os.listdir(self.shard_dir)), 4)
+
+if __name__ == '__main__':
+    unittest.main()
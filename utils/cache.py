@@ -0,0 +1,206 @@
+import requests
+from requests.structures import CaseInsensitiveDict
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+def atomic_write(path, data):
+    """
+    Writes bytes to path via a temporary file in the same directory and os.replace,
+    so readers never see a partially written file.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class ResponseCache:
+    """
+    A persistent on-disk cache of response bodies and their validators (ETag/Last-Modified).
+    Entries older than ttl seconds are dropped; once the stored bodies exceed max_bytes
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory='.http_cache', ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.body'
+
+    def _load_index(self):
+        index = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            meta_path, body_path = self._paths(key)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                if not os.path.exists(body_path):
+                    raise ValueError("missing body file")
+                index[key] = meta
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable cache entry {key}: {str(e)}")
+                self._remove_files(key)
+        return index
+
+    def _remove_files(self, key):
+        for path in self._paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _is_expired(self, meta, now):
+        return self.ttl is not None and now - meta['stored_at'] > self.ttl
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(meta['size'] for meta in self._index.values())
+
+    def get(self, url):
+        """
+        Returns the cached metadata dict for url, or None when missing or expired.
+        """
+        key = self._key(url)
+        now = time.time()
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+            if self._is_expired(meta, now):
+                del self._index[key]
+                self._remove_files(key)
+                return None
+            meta['accessed_at'] = now
+            return dict(meta)
+
+    def conditional_headers(self, url):
+        """
+        Returns If-None-Match/If-Modified-Since headers for a cached url, or an empty dict.
+        """
+        meta = self.get(url)
+        if meta is None:
+            return {}
+        headers = {}
+        if meta['headers'].get('ETag'):
+            headers['If-None-Match'] = meta['headers']['ETag']
+        if meta['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+        return headers
+
+    def put(self, url, response):
+        """
+        Stores a successful response body with its validators. Responses without
+        an ETag or Last-Modified header cannot be revalidated and are not cached.
+        """
+        if not (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            return False
+        body = response.content
+        if self.max_bytes is not None and len(body) > self.max_bytes:
+            return False
+
+        key = self._key(url)
+        now = time.time()
+        meta = {
+            'url': url,
+            'headers': {name: response.headers[name] for name in CACHED_HEADERS if response.headers.get(name)},
+            'encoding': response.encoding,
+            'size': len(body),
+            'stored_at': now,
+            'accessed_at': now
+        }
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            atomic_write(body_path, body)
+            atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+            self._index[key] = meta
+            self._evict()
+        return True
+
+    def revalidated(self, url, response):
+        """
+        Marks a cached entry as fresh again after a 304 Not Modified and returns
+        a response rebuilt from the stored body, or None when the entry is gone.
+        """
+        key = self._key(url)
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+            try:
+                with open(body_path, 'rb') as f:
+                    body = f.read()
+            except OSError as e:
+                logger.warning(f"Cached body for {url} is unreadable: {str(e)}")
+                del self._index[key]
+                self._remove_files(key)
+                return None
+
+            for name in ('ETag', 'Last-Modified'):
+                if response.headers.get(name):
+                    meta['headers'][name] = response.headers[name]
+            meta['stored_at'] = meta['accessed_at'] = time.time()
+            atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+
+        cached = requests.Response()
+        cached.status_code = 200
+        cached.url = url
+        cached.headers = CaseInsensitiveDict(meta['headers'])
+        cached.encoding = meta['encoding']
+        cached._content = body
+        cached.from_cache = True
+        return cached
+
+    def _evict(self):
+        now = time.time()
+        for key in [key for key, meta in self._index.items() if self._is_expired(meta, now)]:
+            del self._index[key]
+            self._remove_files(key)
+
+        if self.max_bytes is None:
+            return
+        total = sum(meta['size'] for meta in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]['accessed_at']):
+            if total <= self.max_bytes:
+                break
+            total -= self._index[key]['size']
+            del self._index[key]
+            self._remove_files(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._remove_files(key)
+            self._index.clear()
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+import logging
+from utils.cache import atomic_write
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = '.checkpoints'
+STATUS_OK = 'ok'
+STATUS_EMPTY = 'empty'
+STATUS_FAILED = 'failed'
+STATUSES = (STATUS_OK, STATUS_EMPTY, STATUS_FAILED)
+# Pages with these statuses are not fetched again on resume; failed and missing pages are.
+COMPLETED_STATUSES = (STATUS_OK, STATUS_EMPTY)
+
+class CheckpointStore:
+    """
+    Per-page checkpoints of an extraction: directory/page<N>.json holds the page's status
+    ('ok', 'empty' or 'failed'), the error of a failed page, its parsed records and the last
+    page the catalogue was known to have. Each file is replaced atomically, so a crash leaves
+    either the previous checkpoint or the new one; files that still fail to load are treated
+    as missing and their pages are scraped again.
+    """
+
+    def __init__(self, directory=CHECKPOINT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, page):
+        return os.path.join(self.directory, f"page{page}.json")
+
+    def save(self, page, status, records=None, error=None, last_page=None):
+        if status not in STATUSES:
+            raise ValueError(f"Unknown checkpoint status '{status}'. Available: {', '.join(STATUSES)}")
+        checkpoint = {
+            'page': page,
+            'status': status,
+            'error': error,
+            'records': records or [],
+            'last_page': last_page,
+            'saved_at': time.time()
+        }
+        atomic_write(self._path(page), json.dumps(checkpoint).encode('utf-8'))
+
+    def load(self, page):
+        """
+        Returns the checkpoint dict of page, or None when it is missing or unreadable.
+        """
+        path = self._path(page)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('page') != page or checkpoint.get('status') not in STATUSES:
+                raise ValueError("unexpected checkpoint contents")
+            return checkpoint
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint for page {page}: {str(e)}")
+            return None
+
+    def pages(self):
+        """
+        Returns the page numbers that have a checkpoint file, in order.
+        """
+        pages = []
+        for name in os.listdir(self.directory):
+            number = name[len('page'):-len('.json')]
+            if name.startswith('page') and name.endswith('.json') and number.isdigit():
+                pages.append(int(number))
+        return sorted(pages)
+
+    def completed(self):
+        """
+        Returns {page: checkpoint} for the pages a resumed run can skip.
+        """
+        checkpoints = {}
+        for page in self.pages():
+            checkpoint = self.load(page)
+            if checkpoint is not None and checkpoint['status'] in COMPLETED_STATUSES:
+                checkpoints[page] = checkpoint
+        return checkpoints
+
+    def clear(self):
+        for page in self.pages():
+            os.remove(self._path(page))
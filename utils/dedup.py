@@ -0,0 +1,225 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import logging
+from utils.cache import atomic_write
+from utils.metrics import DEDUP_PRODUCTS
+from utils.transform import is_valid_record
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEDUP_PATH = '.dedup_index'
+DEDUP_BACKENDS = ('set', 'bloom')
+DEFAULT_CAPACITY = 100000
+DEFAULT_ERROR_RATE = 0.01
+
+class MemoryIndex:
+    """
+    Exact index of keys in a Python set; memory grows with every key added.
+    """
+    backend = 'set'
+
+    def __init__(self):
+        self._keys = set()
+
+    def add(self, key):
+        """
+        Adds key and returns True when it was not in the index yet.
+        """
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        return True
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def header(self):
+        return {'backend': self.backend}
+
+    def payload(self):
+        return json.dumps(sorted(self._keys)).encode('utf-8')
+
+    @classmethod
+    def load(cls, header, payload):
+        index = cls()
+        index._keys.update(json.loads(payload.decode('utf-8')))
+        return index
+
+class BloomFilter:
+    """
+    Probabilistic index in a fixed bit array sized for capacity keys at error_rate false
+    positives (about 9.6 bits per key at 1%). It never misses a key that was added, but answers
+    "seen" for a new key with probability error_rate; past capacity that rate climbs.
+    """
+    backend = 'bloom'
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1.")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        """
+        Adds key and returns True when it was (probably) not in the filter yet.
+        """
+        new = False
+        for position in self._positions(key):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self._array[byte] & mask:
+                self._array[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+            if self.count == self.capacity + 1:
+                logger.warning(f"Bloom filter holds more than its capacity of {self.capacity} keys; "
+                               f"false positives will exceed {self.error_rate:.2%}")
+        return new
+
+    def __contains__(self, key):
+        return all(self._array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def size_bytes(self):
+        return len(self._array)
+
+    def header(self):
+        return {'backend': self.backend, 'capacity': self.capacity, 'error_rate': self.error_rate, 'count': self.count}
+
+    def payload(self):
+        return bytes(self._array)
+
+    @classmethod
+    def load(cls, header, payload):
+        index = cls(header['capacity'], header['error_rate'])
+        if len(payload) != len(index._array):
+            raise ValueError("bit array does not match the filter size")
+        index._array[:] = payload
+        index.count = header['count']
+        return index
+
+INDEX_TYPES = {
+    'set': MemoryIndex,
+    'bloom': BloomFilter
+}
+
+def new_index(backend='set', capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+    """
+    Returns an empty MemoryIndex ('set') or BloomFilter ('bloom').
+    """
+    if backend not in INDEX_TYPES:
+        raise ValueError(f"Unknown dedup backend '{backend}'. Available: {', '.join(DEDUP_BACKENDS)}")
+    if backend == 'bloom':
+        return BloomFilter(capacity, error_rate)
+    return MemoryIndex()
+
+def write_index(index, path):
+    """
+    Writes index to path as one JSON header line followed by its payload, atomically.
+    """
+    atomic_write(path, json.dumps(index.header()).encode('utf-8') + b'\n' + index.payload())
+
+def read_index(path):
+    """
+    Returns the index stored at path, or None when it is missing or unreadable.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            header_line, payload = f.read().split(b'\n', 1)
+        header = json.loads(header_line.decode('utf-8'))
+        return INDEX_TYPES[header['backend']].load(header, payload)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable dedup index {path}: {str(e)}")
+        return None
+
+class DedupIndex:
+    """
+    Drops records whose key (the Title by default, as transform_data does) was already seen in
+    this run, checked page by page while extracting, before the records reach a DataFrame.
+    With path, the keys of the last complete run are loaded from disk, and flag_new=True adds an
+    'is_new' column that is True for keys that run did not have; save() replaces them with this
+    run's keys. backend 'set' is exact; 'bloom' keeps memory bounded at capacity keys for the
+    given error_rate, at the cost of dropping (or marking as seen) about error_rate of the new keys.
+    Only records that validate (by default utils.transform.is_valid_record) add their key; the
+    others pass through for transform_data to drop, so a rejected card cannot shadow a later
+    valid card with the same Title.
+    """
+
+    def __init__(self, path=None, backend='set', capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE,
+                 key='Title', flag_new=False, validate=is_valid_record):
+        self.path = path
+        self.key = key
+        self.flag_new = flag_new
+        self.validate = validate
+        self.seen = new_index(backend, capacity, error_rate)
+        self.previous = read_index(path) if path else None
+        self._lock = threading.Lock()
+        self._counters = {'kept': 0, 'duplicate': 0, 'new': 0}
+
+    @property
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def filter(self, records):
+        """
+        Returns the records whose key was not seen before in this run, in order.
+        """
+        kept = []
+        with self._lock:
+            for record in records:
+                key = str(record[self.key])
+                if self.validate is not None and not self.validate(record):
+                    if self.flag_new:
+                        record = {**record, 'is_new': self.previous is None or key not in self.previous}
+                    kept.append(record)
+                    continue
+                if not self.seen.add(key):
+                    self._counters['duplicate'] += 1
+                    continue
+                self._counters['kept'] += 1
+                if self.flag_new:
+                    is_new = self.previous is None or key not in self.previous
+                    self._counters['new'] += is_new
+                    record = {**record, 'is_new': is_new}
+                kept.append(record)
+        DEDUP_PRODUCTS.inc(len(kept), result='kept')
+        DEDUP_PRODUCTS.inc(len(records) - len(kept), result='duplicate')
+        return kept
+
+    def save(self):
+        """
+        Stores this run's keys as the ones the next run compares against.
+        """
+        if self.path:
+            with self._lock:
+                write_index(self.seen, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.previous = None
@@ -1,114 +1,667 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from datetime import datetime
-import logging
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-def scrape_data():
-    """
-    Scrapes data from fashion-studio.dicoding.dev across all pages.
-    Returns a DataFrame with Title, Price, Rating, Colors, Size, Gender, timestamp, and page_number.
-    """
-    try:
-        all_data = []
-        pages_scraped = 0
-        products_scraped = 0
-        
-        for page in range(1, 51):
-            if page == 1:
-                url = "https://fashion-studio.dicoding.dev/"
-            else:
-                url = f"https://fashion-studio.dicoding.dev/page{page}"
-            logger.info(f"Scraping page {page}: {url}")
-            
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36'
-                }
-                response = requests.get(url, headers=headers, timeout=15)
-                response.raise_for_status()
-                logger.info(f"Response status code: {response.status_code}")
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                products = soup.select('.collection-card')
-                if not products:
-                    logger.warning(f"No products found on page {page}. Selector '.collection-card' may be incorrect.")
-                    continue
-                
-                logger.info(f"Found {len(products)} products on page {page}")
-                
-                for idx, product in enumerate(products):
-                    try:
-                        title_elem = product.select_one('.product-title') or product.find('h3') or product.find('h4')
-                        title = title_elem.text.strip() if title_elem else None
-                        if not title or title.lower() == "unknown product":
-                            logger.warning(f"Skipping product {idx + 1} on page {page}: Invalid or missing title.")
-                            continue
-                        
-                        price_elem = product.select_one('.price')
-                        price_text = price_elem.text.strip().replace('$', '') if price_elem else "0"
-                        try:
-                            price = float(price_text) if price_text.replace('.', '').isdigit() else 0
-                        except ValueError:
-                            logger.warning(f"Invalid price format for product {idx + 1} on page {page}: {price_text}")
-                            continue
-                        
-                        p_tags = product.find_all('p', style="font-size: 14px; color: #777;")
-                        rating = "0.0 / 5"
-                        colors = "0 Colors"
-                        size = None
-                        gender = None
-                        
-                        for p in p_tags:
-                            text = p.text.strip()
-                            if text.startswith("Rating:"):
-                                rating = text.replace("Rating: ⭐ ", "").replace("Not Rated", "0.0 / 5")
-                            elif text.endswith("Colors"):
-                                colors = text
-                            elif text.startswith("Size:"):
-                                size = text.replace("Size: ", "")
-                            elif text.startswith("Gender:"):
-                                gender = text.replace("Gender: ", "")
-                        
-                        if not size or not gender or price <= 0:
-                            logger.warning(f"Skipping product {idx + 1} on page {page}: Missing critical fields or invalid price.")
-                            continue
-                        
-                        all_data.append({
-                            'Title': title,
-                            'Price': price,
-                            'Rating': rating,
-                            'Colors': colors,
-                            'Size': size,
-                            'Gender': gender,
-                            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                            'page_number': page
-                        })
-                        products_scraped += 1
-                        logger.debug(f"Scraped product {idx + 1} on page {page}: {title} (Price: {price})")
-                        
-                    except AttributeError as e:
-                        logger.warning(f"Failed to parse product {idx + 1} on page {page}: {str(e)}")
-                        continue
-                
-                pages_scraped += 1
-                logger.info(f"Page {page} scraped successfully. Total products collected so far: {products_scraped}")
-                
-            except requests.RequestException as e:
-                logger.error(f"Failed to fetch page {page}: {str(e)}")
-                continue
-        
-        if not all_data:
-            logger.error("No data scraped from any page. Check CSS selectors or website accessibility.")
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(all_data)
-        logger.info(f"Extraction completed. Total pages scraped: {pages_scraped}, Total products: {len(df)}")
-        return df
-    
-    except Exception as e:
-        logger.error(f"Extraction failed: {str(e)}")
-        return pd.DataFrame()
\ No newline at end of file
+import requests
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from collections import Counter, deque
+import heapq
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from utils.session import PooledSession
+from utils.parsers import get_parser_backend, parse_pagination, parse_stated_pages
+from utils.fingerprint import fingerprint
+from utils.checkpoint import STATUS_EMPTY, STATUS_FAILED, STATUS_OK
+from utils.metrics import BYTES_DOWNLOADED, BYTES_RECEIVED, PAGE_BYTES, PAGE_FETCH_SECONDS, PAGES, PRODUCTS_PARSED, PRODUCTS_SKIPPED
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://fashion-studio.dicoding.dev/"
+# Pages assumed unless the catalogue states its page count; pagination links can only add to it.
+TOTAL_PAGES = 50
+DEFAULT_MAX_EMPTY_PAGES = 3
+# Statuses that say a page does not exist, so it counts as empty rather than failed.
+MISSING_PAGE_STATUSES = frozenset({404, 410})
+MAX_PAGES = 1000
+DEFAULT_PARSER = 'bs4'
+_DONE = object()
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36'
+}
+
+def build_page_url(page, base_url=BASE_URL):
+    """
+    Returns the catalogue URL for the given page number under base_url.
+    """
+    if not base_url.endswith('/'):
+        base_url += '/'
+    if page == 1:
+        return base_url
+    return f"{base_url}page{page}"
+
+class PageFrontier:
+    """
+    Thread-safe, growing set of catalogue pages to scrape.
+    Iterating yields page number 1, then, once page 1 is in, every page up to last_page, blocking
+    at last_page until the pages fetched so far show whether there are more. The catalogue is
+    taken to have the page count it states ("Page X of Y"), or else at least expected_pages
+    pages; discover() extends that with the pagination links of each page, and report() records
+    whether a page had product cards. Nothing past a run of max_empty_pages consecutive empty
+    pages, or past max_pages, is handed out; failed pages do not count as empty, and no run stops
+    the scrape before the stated page count.
+    """
+
+    def __init__(self, expected_pages=TOTAL_PAGES, max_empty_pages=DEFAULT_MAX_EMPTY_PAGES, max_pages=MAX_PAGES):
+        if max_empty_pages < 1:
+            raise ValueError("max_empty_pages must be at least 1.")
+        self.expected_pages = expected_pages
+        self.max_empty_pages = max_empty_pages
+        self.max_pages = max_pages
+        self.linked_pages = 1
+        self.stated_pages = None
+        self.stop_after = max_pages
+        self.issued = 0
+        self._started = False
+        self._outcomes = {}
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def last_page(self):
+        """
+        The last page the catalogue is taken to have; 1 until the first page is in.
+        """
+        if not self._started:
+            return 1
+        assumed = self.expected_pages if self.stated_pages is None else self.stated_pages
+        return max(self.linked_pages, assumed)
+
+    @property
+    def known_pages(self):
+        """
+        The last page the fetched pages link to or state, without the expected_pages assumption.
+        """
+        return max(self.linked_pages, self.stated_pages or 0)
+
+    def discover(self, page, html):
+        """
+        Extends the frontier with the next and last page numbers linked from a fetched page and
+        the page count it states.
+        """
+        next_page, last_page = parse_pagination(html)
+        stated = parse_stated_pages(html)
+        with self._condition:
+            self._started = True
+            if stated is not None and stated > (self.stated_pages or 0):
+                self.stated_pages = stated
+                if self.stop_after < min(stated, self.max_pages):
+                    logger.info(f"Page {page} states {stated} pages; scraping past page {self.stop_after} again")
+                    self.stop_after = min(stated, self.max_pages)
+            self.linked_pages = max(self.linked_pages, next_page or 0, last_page or 0)
+            self._condition.notify_all()
+
+    def extend(self, last_page):
+        """
+        Records that the catalogue has at least last_page pages.
+        """
+        with self._condition:
+            self._started = True
+            self.linked_pages = max(self.linked_pages, last_page)
+            self._condition.notify_all()
+
+    def report(self, page, has_products, failed=False):
+        """
+        Records the outcome of a handed-out page. A failed page (say, a connection error) says
+        nothing about whether the page is empty, so it ends a run of empty pages instead of
+        counting towards one.
+        """
+        with self._condition:
+            self._started = True
+            self._outcomes[page] = None if failed else has_products
+            if not has_products and not failed:
+                first = last = page
+                while self._outcomes.get(first - 1) is False:
+                    first -= 1
+                while self._outcomes.get(last + 1) is False:
+                    last += 1
+                if (last - first + 1 >= self.max_empty_pages and last < self.stop_after
+                        and last >= (self.stated_pages or 0)):
+                    self.stop_after = last
+                    logger.info(f"Pages {first}-{last} had no products; not scraping past page {last}")
+            self._condition.notify_all()
+
+    def close(self):
+        """
+        Stops handing out pages and wakes a blocked iterator.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __iter__(self):
+        page = 1
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed or page > min(self.stop_after, self.max_pages):
+                        return
+                    if page <= self.last_page:
+                        break
+                    if all(earlier in self._outcomes for earlier in range(1, page)):
+                        # Every handed-out page is in and none linked further.
+                        return
+                    self._condition.wait()
+                self.issued = page
+            yield page
+            page += 1
+
+SKIP_MISSING_TITLE = 'missing_title'
+SKIP_BAD_PRICE = 'bad_price'
+SKIP_MISSING_SIZE_GENDER = 'missing_size_gender'
+
+def build_record(card, page, skipped=None):
+    """
+    Validates one parsed product card and turns it into a record dict.
+    Returns None when the card is missing a title, size or gender, or has an invalid price;
+    the reason (SKIP_* constants) is counted in the skipped Counter when one is given.
+    """
+    title, price_text, detail_texts = card
+    if not title or title.lower() == "unknown product":
+        if skipped is not None:
+            skipped[SKIP_MISSING_TITLE] += 1
+        return None
+
+    price_text = price_text.replace('$', '') if price_text is not None else "0"
+    try:
+        price = float(price_text) if price_text.replace('.', '').isdigit() else 0
+    except ValueError:
+        price = 0
+
+    rating = "0.0 / 5"
+    colors = "0 Colors"
+    size = None
+    gender = None
+
+    for text in detail_texts:
+        if text.startswith("Rating:"):
+            rating = text.replace("Rating: ⭐ ", "").replace("Not Rated", "0.0 / 5")
+        elif text.endswith("Colors"):
+            colors = text
+        elif text.startswith("Size:"):
+            size = text.replace("Size: ", "")
+        elif text.startswith("Gender:"):
+            gender = text.replace("Gender: ", "")
+
+    if price <= 0 or not size or not gender:
+        if skipped is not None:
+            skipped[SKIP_BAD_PRICE if price <= 0 else SKIP_MISSING_SIZE_GENDER] += 1
+        return None
+
+    return {
+        'Title': title,
+        'Price': price,
+        'Rating': rating,
+        'Colors': colors,
+        'Size': size,
+        'Gender': gender,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'page_number': page
+    }
+
+def parse_page(html, page, parser=DEFAULT_PARSER):
+    """
+    Parses the product cards of a single catalogue page with the named parser backend.
+    Returns (records, skipped): a list of record dicts, or None when the page has no product
+    cards, and a Counter of skipped cards by reason. Records no metrics itself, so it can run
+    in a worker process and let the caller count the result.
+    """
+    skipped = Counter()
+    cards = get_parser_backend(parser)(html)
+    if not cards:
+        return None, skipped
+
+    records = []
+    for card in cards:
+        record = build_record(card, page, skipped)
+        if record is not None:
+            records.append(record)
+    return records, skipped
+
+def record_parse_result(page, records, skipped):
+    """
+    Counts one parsed page in the metrics registry and logs its summary.
+    """
+    if records is None:
+        PAGES.inc(status='empty')
+        logger.warning(f"No products found on page {page}. Selector '.collection-card' may be incorrect.")
+        return
+    PAGES.inc(status='ok')
+    PRODUCTS_PARSED.inc(len(records))
+    for reason, count in skipped.items():
+        PRODUCTS_SKIPPED.inc(count, reason=reason)
+    if skipped:
+        logger.info(f"Found {len(records) + sum(skipped.values())} products on page {page}, skipped {dict(skipped)}")
+    else:
+        logger.info(f"Found {len(records)} products on page {page}")
+
+def parse_products(html, page, parser=DEFAULT_PARSER):
+    """
+    Parses the product cards of a single catalogue page with the named parser backend and
+    records the outcome in the metrics registry.
+    Returns a list of record dicts, or None when the page has no product cards.
+    """
+    records, skipped = parse_page(html, page, parser)
+    record_parse_result(page, records, skipped)
+    return records
+
+def parse_or_reuse(html, page, parser, fingerprints):
+    """
+    Like parse_products, but reuses the records fingerprints (a FingerprintStore) holds for page
+    when html is byte-identical to the body they were parsed from.
+    """
+    digest = fingerprint(html)
+    stored = fingerprints.lookup(page, digest)
+    if stored is None:
+        records, skipped = parse_page(html, page, parser)
+        fingerprints.store(page, digest, records, skipped)
+    else:
+        records, skipped = stored
+    record_parse_result(page, records, skipped)
+    return records
+
+def page_missing(error):
+    """
+    Returns True when a fetch error says the page does not exist (MISSING_PAGE_STATUSES), as
+    opposed to a failure that might not happen again, like a timeout or a 503.
+    """
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.HTTPError) and getattr(response, 'status_code', None) in MISSING_PAGE_STATUSES
+
+def fetch_page(page, session, base_url=BASE_URL):
+    """
+    Fetches the raw HTML of a single catalogue page through the given PooledSession.
+    Records the body's size as received (compressed) and decoded.
+    Raises requests.RequestException when the page cannot be fetched or its body is over the
+    session's max_body_bytes.
+    """
+    url = build_page_url(page, base_url)
+    logger.info(f"Scraping page {page}: {url}")
+
+    started = time.perf_counter()
+    response = session.get(url)
+    response.raise_for_status()
+    PAGE_FETCH_SECONDS.observe(time.perf_counter() - started)
+    # A 304 answered from the ResponseCache downloads no body.
+    if getattr(response, 'from_cache', False):
+        logger.info(f"Response status code: {response.status_code} (served from cache)")
+        return response.text
+    decoded = len(response.content)
+    received = getattr(response, 'wire_bytes', decoded)
+    BYTES_DOWNLOADED.inc(decoded)
+    BYTES_RECEIVED.inc(received, encoding=response.headers.get('Content-Encoding') or 'identity')
+    PAGE_BYTES.observe(received, kind='wire')
+    PAGE_BYTES.observe(decoded, kind='decoded')
+    logger.info(f"Response status code: {response.status_code} ({received} bytes received, {decoded} decoded)")
+    return response.text
+
+def scrape_page(page, session, parser=DEFAULT_PARSER, base_url=BASE_URL, frontier=None, page_errors=None,
+                fingerprints=None):
+    """
+    Fetches and parses a single catalogue page through the given PooledSession.
+    Returns a list of record dicts, or None when the page failed or had no product cards.
+    The page's pagination links and outcome are passed on to frontier (a PageFrontier) when given,
+    and a fetch failure is recorded in the page_errors dict when one is given. With fingerprints,
+    an unchanged page reuses its stored records instead of being parsed.
+    """
+    try:
+        html = fetch_page(page, session, base_url)
+    except requests.RequestException as e:
+        PAGES.inc(status='fetch_failed')
+        logger.error(f"Failed to fetch page {page}: {str(e)}")
+        if page_errors is not None:
+            page_errors[page] = f"fetch failed: {str(e)}"
+        if frontier is not None:
+            frontier.report(page, False, failed=not page_missing(e))
+        return None
+    except BaseException:
+        # Any other error fails the run, but the frontier must not wait for this page's outcome.
+        if frontier is not None:
+            frontier.report(page, False, failed=True)
+        raise
+
+    def parse():
+        if fingerprints is None:
+            return parse_products(html, page, parser)
+        return parse_or_reuse(html, page, parser, fingerprints)
+
+    if frontier is None:
+        return parse()
+    try:
+        frontier.discover(page, html)
+        records = parse()
+    except BaseException:
+        frontier.report(page, False, failed=True)
+        raise
+    frontier.report(page, records is not None)
+    return records
+
+def _scrape_threaded(pages, session, parser, max_workers, base_url=BASE_URL, frontier=None, page_errors=None,
+                     fingerprints=None):
+    """
+    Fetches and parses pages in a thread pool, keeping at most 2 * max_workers pages in flight.
+    Yields (page, records) in page order.
+    """
+    window = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for page in pages:
+            window.append((page, executor.submit(scrape_page, page, session, parser, base_url, frontier, page_errors,
+                                                  fingerprints)))
+            if len(window) >= 2 * max_workers:
+                page, future = window.popleft()
+                yield page, future.result()
+        while window:
+            page, future = window.popleft()
+            yield page, future.result()
+
+def _fetch_stage(pages, session, max_workers, html_queue, stop, base_url=BASE_URL, frontier=None):
+    """
+    Fetch stage of the pipelined extractor: puts (page, html, error) on html_queue as pages
+    arrive, blocking while the queue is full, then puts the _DONE sentinel.
+    Gives up on remaining pages once the stop event is set.
+    """
+    def put(item):
+        while not stop.is_set():
+            try:
+                html_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def fetch(page):
+        if stop.is_set():
+            return
+        try:
+            html = fetch_page(page, session, base_url)
+            item = page, html, None
+        except requests.RequestException as e:
+            PAGES.inc(status='fetch_failed')
+            logger.error(f"Failed to fetch page {page}: {str(e)}")
+            item = page, None, f"fetch failed: {str(e)}"
+            if frontier is not None:
+                frontier.report(page, False, failed=not page_missing(e))
+        except BaseException:
+            # Any other error fails the run: stop handing out pages so the submit loop ends.
+            if frontier is not None:
+                frontier.report(page, False, failed=True)
+                frontier.close()
+            raise
+        else:
+            if frontier is not None:
+                frontier.discover(page, html)
+        put(item)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(fetch, page) for page in pages]:
+                future.result()
+    except Exception as e:
+        logger.error(f"Fetch stage failed: {str(e)}")
+        if frontier is not None:
+            frontier.close()
+        put(e)
+    finally:
+        put(_DONE)
+
+def _scrape_pipelined(pages, session, parser, max_workers, parse_workers, queue_size, page_errors, base_url=BASE_URL,
+                      frontier=None, fingerprints=None):
+    """
+    Fetches pages in a thread pool and parses them in a process pool, connected by a bounded
+    queue so parsing of one page overlaps fetching of the next. Yields (page, records) in page
+    order; parse failures are recorded in page_errors and yield None for that page.
+    pages must be ascending; a PageFrontier may keep growing while pages are parsed.
+    With fingerprints, unchanged pages reuse their stored records and skip the process pool.
+    """
+    order = []
+
+    def issue():
+        # Remembers the order the fetch stage takes pages in, so results are released in that order.
+        for page in pages:
+            order.append(page)
+            yield page
+
+    html_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    fetcher = threading.Thread(target=_fetch_stage,
+                               args=(issue(), session, max_workers, html_queue, stop, base_url, frontier), daemon=True)
+    fetcher.start()
+
+    pending = {}
+    digests = {}
+    next_index = 0
+
+    def report_parsed(page, future):
+        # Runs in the pool's result thread, so the frontier grows without waiting for in-order delivery.
+        try:
+            records = future.result()[0]
+        except Exception:
+            frontier.report(page, False, failed=True)
+            return
+        frontier.report(page, records is not None)
+
+    def result_of(page):
+        future = pending.pop(page)
+        if future is None:
+            return None
+        try:
+            records, skipped = future.result()
+        except Exception as e:
+            PAGES.inc(status='parse_failed')
+            logger.error(f"Failed to parse page {page}: {str(e)}")
+            page_errors[page] = f"parse failed: {str(e)}"
+            return None
+        if page in digests:
+            fingerprints.store(page, digests.pop(page), records, skipped)
+        # Metrics recorded in the worker processes would be lost, so count the result here.
+        record_parse_result(page, records, skipped)
+        return records
+
+    try:
+        # spawn (the Windows default) avoids forking while fetch threads hold locks.
+        with ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            for item in iter(html_queue.get, _DONE):
+                if isinstance(item, Exception):
+                    raise item
+                page, html, error = item
+                if error is not None:
+                    page_errors[page] = error
+                    pending[page] = None
+                else:
+                    in_flight = [future for future in pending.values() if future is not None and not future.done()]
+                    if len(in_flight) >= queue_size:
+                        wait(in_flight, return_when=FIRST_COMPLETED)
+                    stored = None
+                    if fingerprints is not None:
+                        digests[page] = fingerprint(html)
+                        stored = fingerprints.lookup(page, digests[page])
+                    if stored is None:
+                        pending[page] = pool.submit(parse_page, html, page, parser)
+                    else:
+                        del digests[page]
+                        pending[page] = Future()
+                        pending[page].set_result(stored)
+                    if frontier is not None:
+                        pending[page].add_done_callback(lambda future, page=page: report_parsed(page, future))
+
+                while next_index < len(order) and order[next_index] in pending and (
+                        pending[order[next_index]] is None or pending[order[next_index]].done()):
+                    page = order[next_index]
+                    next_index += 1
+                    yield page, result_of(page)
+
+            for page in order[next_index:]:
+                yield page, result_of(page)
+    finally:
+        stop.set()
+        if frontier is not None:
+            frontier.close()
+        fetcher.join()
+
+def _restore_checkpoints(checkpoint, frontier):
+    """
+    Loads the completed pages of an interrupted run into frontier.
+    Returns their (page, records) pairs in page order, with None for pages without products.
+    """
+    restored = checkpoint.completed()
+    if not restored:
+        return []
+    last_page = max(saved['last_page'] or 0 for saved in restored.values())
+    if last_page:
+        frontier.extend(last_page)
+    results = []
+    for page, saved in sorted(restored.items()):
+        has_products = saved['status'] == STATUS_OK
+        frontier.report(page, has_products)
+        results.append((page, saved['records'] if has_products else None))
+    logger.info(f"Resuming: {len(results)} pages restored from {checkpoint.directory}")
+    return results
+
+def iter_pages(max_workers=1, session=None, cache=None, parser=DEFAULT_PARSER, parse_workers=0, queue_size=None,
+               page_errors=None, base_url=BASE_URL, max_empty_pages=DEFAULT_MAX_EMPTY_PAGES, max_pages=MAX_PAGES,
+               checkpoint=None, resume=False, pages=None, fingerprints=None, limiter=None, dedup=None):
+    """
+    Scrapes the catalogue page by page and yields (page, records) in page order as soon as each
+    page is ready, skipping pages that failed or had no product cards. Options match scrape_data;
+    per-page failures are recorded in the page_errors dict when one is given.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    if parse_workers < 0:
+        raise ValueError("parse_workers must not be negative.")
+    get_parser_backend(parser)
+    if page_errors is None:
+        page_errors = {}
+    frontier = PageFrontier(max_empty_pages=max_empty_pages, max_pages=max_pages)
+    restored = []
+    if checkpoint is not None:
+        if resume:
+            restored = _restore_checkpoints(checkpoint, frontier)
+        else:
+            checkpoint.clear()
+    restored_pages = {page for page, records in restored}
+    pages = (page for page in (frontier if pages is None else sorted(pages)) if page not in restored_pages)
+
+    owns_session = session is None
+    if owns_session:
+        session = PooledSession(headers=HEADERS, pool_maxsize=max(max_workers, 10), cache=cache, limiter=limiter)
+    try:
+        if parse_workers:
+            results = _scrape_pipelined(pages, session, parser, max_workers, parse_workers,
+                                        queue_size or 2 * parse_workers, page_errors, base_url, frontier, fingerprints)
+        else:
+            results = _scrape_threaded(pages, session, parser, max_workers, base_url, frontier, page_errors,
+                                       fingerprints)
+
+        products_scraped = 0
+        for page, records in heapq.merge(restored, results, key=lambda result: result[0]):
+            if checkpoint is not None and page not in restored_pages:
+                status = STATUS_FAILED if page in page_errors else STATUS_EMPTY if records is None else STATUS_OK
+                checkpoint.save(page, status, records, page_errors.get(page), frontier.known_pages)
+            if records is None:
+                continue
+            if dedup is not None:
+                records = dedup.filter(records)
+
+            products_scraped += len(records)
+            logger.info(f"Page {page} scraped successfully. Total products collected so far: {products_scraped}")
+            yield page, records
+
+        if frontier.issued:
+            logger.info(f"Scraped up to page {frontier.issued}; the catalogue links up to page {frontier.known_pages}")
+        if page_errors:
+            logger.warning(f"{len(page_errors)} pages failed: {page_errors}")
+        logger.info(f"HTTP session stats: {session.stats}")
+        if fingerprints is not None:
+            logger.info(f"Fingerprints: {fingerprints.stats['reused']} unchanged pages reused, "
+                        f"{fingerprints.stats['parsed']} pages parsed")
+        if dedup is not None:
+            logger.info(f"Dedup index: {dedup.stats['kept']} products kept, {dedup.stats['duplicate']} duplicates dropped"
+                        + (f", {dedup.stats['new']} new since the last run" if dedup.flag_new else ""))
+            # A run with failed pages would make the next run flag the missing products as new.
+            if page_errors:
+                logger.warning("Not saving the dedup index of an incomplete run.")
+            else:
+                dedup.save()
+
+    finally:
+        frontier.close()
+        if fingerprints is not None:
+            fingerprints.save()
+        if owns_session:
+            session.close()
+
+def scrape_batches(**options):
+    """
+    Streaming counterpart of scrape_data: yields one DataFrame per scraped page, in page order,
+    so callers can transform and store records while later pages are still being fetched.
+    Accepts the same options as scrape_data.
+    """
+    for page, records in iter_pages(**options):
+        if records:
+            yield pd.DataFrame(records)
+
+def scrape_data(max_workers=1, session=None, cache=None, parser=DEFAULT_PARSER, parse_workers=0, queue_size=None,
+                base_url=BASE_URL, max_empty_pages=DEFAULT_MAX_EMPTY_PAGES, max_pages=MAX_PAGES, checkpoint=None,
+                resume=False, pages=None, fingerprints=None, limiter=None, dedup=None):
+    """
+    Scrapes data from fashion-studio.dicoding.dev (or a mirror of it at base_url) across all pages.
+    The pages are discovered while scraping: page 1 is fetched first, then the page count it states
+    ("Page X of Y"), or else TOTAL_PAGES, is fetched concurrently while the pagination links of each
+    page ("Next", page numbers) add any pages that follow, up to max_pages. Scraping stops early after
+    max_empty_pages consecutive pages without products (or missing with a 404), but never before the
+    stated page count; pages that failed otherwise do not count. pages, an iterable of page numbers, scrapes exactly those
+    pages instead (e.g. one shard of a utils.workqueue run).
+    With checkpoint (a utils.checkpoint.CheckpointStore) every page's status and records are saved
+    as it completes. resume=True reuses the pages an interrupted run completed and scrapes only
+    failed or missing ones; otherwise the old checkpoints are cleared first.
+    With fingerprints (a utils.fingerprint.FingerprintStore), a page whose body is byte-identical to
+    the last run reuses its stored records instead of being parsed.
+    With dedup (a utils.dedup.DedupIndex), products whose Title an earlier page already had are
+    dropped as pages arrive, and with its flag_new option each record gets an 'is_new' flag.
+    Pages are fetched by up to max_workers threads at once; records are still returned in page order.
+    Requests go through session (a PooledSession); pass one in to tune retries or read its stats afterwards.
+    When no session is given, cache (a ResponseCache) makes re-scrapes of unchanged pages conditional,
+    and limiter (a utils.ratelimit.AdaptiveLimiter) lets max_workers act as a ceiling while the
+    request rate and concurrency adapt to what the site tolerates.
+    parser selects the card parser backend from utils.parsers.PARSER_BACKENDS ('bs4' or 'lxml').
+    With parse_workers > 0, parsing runs in that many worker processes fed through a queue of
+    queue_size pages (default 2 * parse_workers); per-page failures end up in df.attrs['page_errors'].
+    Returns a DataFrame with Title, Price, Rating, Colors, Size, Gender, timestamp, and page_number.
+    """
+    try:
+        all_data = []
+        pages_scraped = 0
+        page_errors = {}
+
+        for page, records in iter_pages(max_workers=max_workers, session=session, cache=cache, parser=parser,
+                                        parse_workers=parse_workers, queue_size=queue_size,
+                                        page_errors=page_errors, base_url=base_url,
+                                        max_empty_pages=max_empty_pages, max_pages=max_pages,
+                                        checkpoint=checkpoint, resume=resume, pages=pages,
+                                        fingerprints=fingerprints, limiter=limiter, dedup=dedup):
+            all_data.extend(records)
+            pages_scraped += 1
+
+        if not all_data:
+            logger.error("No data scraped from any page. Check CSS selectors or website accessibility.")
+            return pd.DataFrame()
+
+        df = pd.DataFrame(all_data)
+        df.attrs['page_errors'] = page_errors
+        logger.info(f"Extraction completed. Total pages scraped: {pages_scraped}, Total products: {len(df)}")
+        return df
+
+    except Exception as e:
+        logger.error(f"Extraction failed: {str(e)}")
+        return pd.DataFrame()
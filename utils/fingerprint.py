@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import threading
+import logging
+from collections import Counter
+from datetime import datetime
+from utils.cache import atomic_write
+from utils.metrics import FINGERPRINT_PAGES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_PATH = '.fingerprints.json'
+# Bump when build_record changes, so records parsed by older code are not reused.
+FORMAT_VERSION = 1
+
+def fingerprint(html):
+    """
+    Returns the SHA-256 hex digest of a page body.
+    """
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+class FingerprintStore:
+    """
+    Keeps the content hash of every catalogue page body together with the records and skip
+    counts parsed from it, in a JSON file at path. A page whose body hashes the same as last
+    time reuses the stored records (with a fresh timestamp) instead of being parsed again.
+    stats counts the pages reused and parsed since the store was opened.
+    """
+
+    def __init__(self, path=FINGERPRINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._counters = {'reused': 0, 'parsed': 0}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != FORMAT_VERSION:
+                logger.info(f"Discarding fingerprints of format version {data.get('version')}")
+                return {}
+            return data['pages']
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable fingerprint store {self.path}: {str(e)}")
+            return {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def lookup(self, page, digest):
+        """
+        Returns (records, skipped) stored for page when digest matches its last body, or None.
+        records is None for a page that had no product cards; reused records get a new timestamp.
+        """
+        with self._lock:
+            entry = self._entries.get(str(page))
+            if entry is None or entry['hash'] != digest:
+                return None
+            self._counters['reused'] += 1
+        FINGERPRINT_PAGES.inc(result='reused')
+        records = entry['records']
+        if records is not None:
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            records = [{**record, 'timestamp': timestamp} for record in records]
+        return records, Counter(entry['skipped'])
+
+    def store(self, page, digest, records, skipped):
+        """
+        Remembers the records and skip counts parsed from the body with the given digest.
+        """
+        with self._lock:
+            self._entries[str(page)] = {'hash': digest, 'records': records, 'skipped': dict(skipped)}
+            self._counters['parsed'] += 1
+        FINGERPRINT_PAGES.inc(result='parsed')
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({'version': FORMAT_VERSION, 'pages': self._entries})
+        atomic_write(self.path, data.encode('utf-8'))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
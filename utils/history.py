@@ -0,0 +1,160 @@
+import pandas as pd
+import argparse
+import glob
+import json
+import os
+import tempfile
+import uuid
+import logging
+from datetime import datetime, timedelta
+from utils.cache import atomic_write
+from utils.transform import TIMESTAMP_FORMAT
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HISTORY_DIR = 'history'
+INDEX_FILE = '_index.json'
+PARTITION_PREFIX = 'date='
+DATE_FORMAT = '%Y-%m-%d'
+
+def _partition_dir(directory, date):
+    return os.path.join(directory, f"{PARTITION_PREFIX}{date}")
+
+def _partition_files(directory, date):
+    return sorted(glob.glob(os.path.join(_partition_dir(directory, date), '*.parquet')))
+
+def _partitions(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[len(PARTITION_PREFIX):] for name in os.listdir(directory) if name.startswith(PARTITION_PREFIX))
+
+def load_index(directory=HISTORY_DIR):
+    """
+    Returns the {title: [partition dates]} index of the history store, or an empty dict.
+    """
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_parquet(df, path):
+    # Write next to the target and rename, so readers never see a partial part file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.parquet')
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, engine='pyarrow', index=False, compression='zstd')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _normalize(df):
+    """
+    Gives every run the same column types: datetime timestamps and plain (non-categorical) values.
+    """
+    columns = {}
+    for name, column in df.items():
+        if name == 'timestamp' and not pd.api.types.is_datetime64_any_dtype(column):
+            column = pd.to_datetime(column, format=TIMESTAMP_FORMAT)
+        elif isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype(object)
+        columns[name] = column
+    return pd.DataFrame(columns).reset_index(drop=True)
+
+def append_history(df, directory=HISTORY_DIR):
+    """
+    Appends a run to the history store: rows are partitioned by the date of their timestamp into
+    directory/date=YYYY-MM-DD/part-*.parquet, existing files are never rewritten, and the
+    title-to-partitions index is updated. Returns the partition dates written.
+    """
+    try:
+        if df.empty:
+            raise ValueError("Input DataFrame is empty.")
+        if 'timestamp' not in df.columns or 'Title' not in df.columns:
+            raise ValueError("History rows need 'Title' and 'timestamp' columns.")
+
+        df = _normalize(df)
+        dates = df['timestamp'].dt.strftime(DATE_FORMAT)
+        run_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        index = load_index(directory)
+
+        written = []
+        for date, partition in df.groupby(dates, sort=True):
+            os.makedirs(_partition_dir(directory, date), exist_ok=True)
+            _write_parquet(partition, os.path.join(_partition_dir(directory, date), f"part-{run_id}.parquet"))
+            for title in partition['Title'].unique():
+                partitions = index.setdefault(title, [])
+                if date not in partitions:
+                    partitions.append(date)
+                    partitions.sort()
+            written.append(date)
+
+        atomic_write(os.path.join(directory, INDEX_FILE), json.dumps(index, sort_keys=True).encode('utf-8'))
+        logger.info(f"Appended {len(df)} rows to history {directory} in partitions {', '.join(written)}")
+        return written
+
+    except Exception as e:
+        logger.error(f"Failed to append history: {str(e)}")
+        raise
+
+def query_history(title, days=90, directory=HISTORY_DIR, now=None):
+    """
+    Returns every stored row for title from the last days days, oldest first. Only the
+    partitions the index lists for title are read.
+    """
+    now = now or datetime.now()
+    since = (now - timedelta(days=days)).strftime(DATE_FORMAT)
+    dates = [date for date in load_index(directory).get(title, []) if date >= since]
+
+    frames = []
+    for date in dates:
+        for path in _partition_files(directory, date):
+            frames.append(pd.read_parquet(path, filters=[('Title', '==', title)]))
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+def compact_history(directory=HISTORY_DIR, min_files=2):
+    """
+    Merges the part files of every partition holding at least min_files of them into one file.
+    The merged file is in place before the small ones are removed, so a crash leaves duplicate
+    rows at worst, never missing ones. Returns the number of partitions compacted.
+    """
+    compacted = 0
+    for date in _partitions(directory):
+        paths = _partition_files(directory, date)
+        if len(paths) < min_files:
+            continue
+        merged = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+        merged = merged.sort_values('timestamp', kind='stable').reset_index(drop=True)
+        target = os.path.join(_partition_dir(directory, date), f"part-compacted-{uuid.uuid4().hex[:8]}.parquet")
+        _write_parquet(merged, target)
+        for path in paths:
+            os.remove(path)
+        compacted += 1
+        logger.info(f"Compacted {len(paths)} files ({len(merged)} rows) in partition {date}")
+    return compacted
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain and query the product price history store.")
+    parser.add_argument('--directory', default=HISTORY_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    compact = commands.add_parser('compact', help="merge the small part files of each partition")
+    compact.add_argument('--min-files', type=int, default=2)
+    query = commands.add_parser('query', help="print the history of one product")
+    query.add_argument('title')
+    query.add_argument('--days', type=int, default=90)
+    args = parser.parse_args(argv)
+
+    if args.command == 'compact':
+        count = compact_history(args.directory, min_files=args.min_files)
+        print(f"Compacted {count} partitions.")
+    else:
+        print(query_history(args.title, days=args.days, directory=args.directory).to_string(index=False))
+
+if __name__ == '__main__':
+    main()
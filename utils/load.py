@@ -1,86 +1,511 @@
-import pandas as pd
-import logging
-import gspread
-from google.oauth2.service_account import Credentials
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-def save_to_csv(df, file_path):
-    """
-    Saves the DataFrame to a CSV file.
-    """
-    try:
-        if df.empty:
-            raise ValueError("Input DataFrame is empty.")
-        
-        df.to_csv(file_path, index=False)
-        logger.info(f"Data saved to CSV: {file_path}")
-    
-    except Exception as e:
-        logger.error(f"Failed to save CSV: {str(e)}")
-        raise
-
-def save_to_google_sheets(df, spreadsheet_name):
-    """
-    Saves the DataFrame to a Google Sheet using google-auth.
-    """
-    try:
-        if df.empty:
-            raise ValueError("Input DataFrame is empty.")
-        
-        scopes = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive',
-            'https://www.googleapis.com/auth/drive.file'
-        ]
-        creds = Credentials.from_service_account_file('google-sheets-api.json', scopes=scopes)
-        client = gspread.authorize(creds)
-        
-        try:
-            spreadsheet = client.open(spreadsheet_name)
-            logger.info(f"Found existing spreadsheet: {spreadsheet_name}")
-        except gspread.SpreadsheetNotFound:
-            spreadsheet = client.create(spreadsheet_name)
-            logger.info(f"Created new spreadsheet: {spreadsheet_name}")
-        
-        try:
-            spreadsheet.share(None, perm_type='anyone', role='writer', notify=False)
-            logger.info(f"Shared spreadsheet with 'Anyone with the link' as editor. URL: {spreadsheet.url}")
-        except gspread.exceptions.APIError as e:
-            logger.error(f"API error while sharing spreadsheet: {str(e)}")
-            raise
-        except AttributeError as e:
-            logger.error(f"Attribute error while sharing spreadsheet: {str(e)}")
-            try:
-                permissions = {
-                    'type': 'anyone',
-                    'role': 'writer'
-                }
-                spreadsheet.client.insert_permission(spreadsheet.id, permissions)
-                logger.info(f"Shared spreadsheet using legacy method. URL: {spreadsheet.url}")
-            except Exception as e:
-                logger.error(f"Failed to share using legacy method: {str(e)}")
-                raise
-        
-        worksheet = spreadsheet.get_worksheet(0)
-        
-        try:
-            worksheet.clear()
-        except gspread.exceptions.APIError as e:
-            logger.error(f"Failed to clear worksheet: {str(e)}")
-            raise
-        
-        try:
-            worksheet.update([df.columns.values.tolist()] + df.values.tolist())
-            logger.info(f"Data saved to Google Sheet: {spreadsheet_name}. URL: {spreadsheet.url}")
-        except gspread.exceptions.APIError as e:
-            logger.error(f"Failed to update worksheet: {str(e)}")
-            raise
-    
-    except gspread.exceptions.APIError as e:
-        logger.error(f"Google Sheets API error: {str(e)}")
-        raise
-    except Exception as e:
-        logger.error(f"Failed to save to Google Sheets: {str(e)}")
-        raise
\ No newline at end of file
+import pandas as pd
+import numpy as np
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.transform import TIMESTAMP_FORMAT
+from utils.history import append_history
+from utils.metrics import SINK_FAILURES, SINK_ROWS, SINK_SECONDS
+from utils.sheets import CREDENTIALS_FILE, SCOPES, ChunkedUploader, call_with_retry, normalize_cell, sync_worksheet, write_snapshot
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def save_to_csv(df, file_path):
+    """
+    Saves the DataFrame to a CSV file.
+    """
+    try:
+        if df.empty:
+            raise ValueError("Input DataFrame is empty.")
+        
+        df.to_csv(file_path, index=False)
+        logger.info(f"Data saved to CSV: {file_path}")
+    
+    except Exception as e:
+        logger.error(f"Failed to save CSV: {str(e)}")
+        raise
+
+def save_to_parquet(df, file_path, compression='snappy', row_group_size=None):
+    """
+    Saves the DataFrame to a Parquet file with pyarrow, keeping column dtypes.
+    compression is any codec pyarrow supports ('snappy', 'zstd', 'gzip', 'lz4', None);
+    row_group_size caps the rows per row group (pyarrow's default when None).
+    """
+    try:
+        if df.empty:
+            raise ValueError("Input DataFrame is empty.")
+        
+        df.to_parquet(file_path, engine='pyarrow', index=False, compression=compression, row_group_size=row_group_size)
+        logger.info(f"Data saved to Parquet: {file_path}")
+    
+    except Exception as e:
+        logger.error(f"Failed to save Parquet: {str(e)}")
+        raise
+
+def save_to_feather(df, file_path, compression='lz4', row_group_size=None):
+    """
+    Saves the DataFrame to a Feather (Arrow IPC) file, keeping column dtypes.
+    compression is 'lz4', 'zstd' or None; row_group_size caps the rows per record batch.
+    """
+    try:
+        if df.empty:
+            raise ValueError("Input DataFrame is empty.")
+        
+        df.reset_index(drop=True).to_feather(file_path, compression=compression or 'uncompressed', chunksize=row_group_size)
+        logger.info(f"Data saved to Feather: {file_path}")
+    
+    except Exception as e:
+        logger.error(f"Failed to save Feather: {str(e)}")
+        raise
+
+def save_batches_to_csv(batches, file_path):
+    """
+    Streams DataFrame batches into a CSV file, writing the header once and appending each batch
+    as it arrives. Rows go to file_path + '.part', which is renamed to file_path once the stream
+    is exhausted, so a failed run never leaves a truncated file behind.
+    Returns the number of rows written.
+    """
+    part_path = f"{file_path}.part"
+    rows = 0
+    try:
+        with open(part_path, 'w', newline='', encoding='utf-8') as f:
+            for batch in batches:
+                if batch.empty:
+                    continue
+                batch.to_csv(f, index=False, header=rows == 0)
+                f.flush()
+                rows += len(batch)
+
+        if rows == 0:
+            raise ValueError("No batches to save.")
+
+        os.replace(part_path, file_path)
+        logger.info(f"Streamed {rows} rows to CSV: {file_path}")
+        return rows
+
+    except Exception as e:
+        logger.error(f"Failed to stream CSV: {str(e)}")
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+def to_python_rows(df, missing=''):
+    """
+    Converts a DataFrame into a header row plus data rows of plain Python values.
+    Handles the compact schema: datetimes become TIMESTAMP_FORMAT strings, categoricals their
+    plain values, float32 its shortest decimal form, and missing values become missing.
+    """
+    columns = {}
+    for name, column in df.items():
+        if pd.api.types.is_datetime64_any_dtype(column):
+            column = column.dt.strftime(TIMESTAMP_FORMAT)
+        elif isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype(object)
+        elif column.dtype == np.float32:
+            column = column.astype(str).astype(float)
+        columns[name] = column.astype(object).where(column.notna(), missing)
+    return [df.columns.values.tolist()] + pd.DataFrame(columns, index=df.index).values.tolist()
+
+def to_sheet_rows(df):
+    """
+    Converts a DataFrame into a header row plus data rows of JSON-serializable cell values,
+    with missing values as empty cells.
+    """
+    return to_python_rows(df, missing='')
+
+SHEETS_MODES = ('replace', 'delta')
+
+def save_to_google_sheets(df, spreadsheet_name, mode='replace', snapshot_path=None, cache=None):
+    """
+    Saves the DataFrame to a Google Sheet using google-auth.
+    mode='replace' clears the worksheet and writes every cell; mode='delta' diffs the worksheet
+    (or the local snapshot at snapshot_path) against the frame by Title and writes only the
+    changed, added and removed rows (see utils.sheets.sync_worksheet).
+    With a SheetsClientCache, the client, token and spreadsheet handle are reused across calls
+    and runs, and the share call is skipped once the spreadsheet is shared.
+    """
+    # Imported here so loads without this sink never pay for gspread and google-auth.
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    try:
+        if df.empty:
+            raise ValueError("Input DataFrame is empty.")
+        if mode not in SHEETS_MODES:
+            raise ValueError(f"Unknown Google Sheets mode '{mode}'. Available: {', '.join(SHEETS_MODES)}")
+        
+        if cache is not None:
+            spreadsheet = cache.open(spreadsheet_name)
+        else:
+            creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+            client = gspread.authorize(creds)
+            
+            try:
+                spreadsheet = client.open(spreadsheet_name)
+                logger.info(f"Found existing spreadsheet: {spreadsheet_name}")
+            except gspread.SpreadsheetNotFound:
+                spreadsheet = client.create(spreadsheet_name)
+                logger.info(f"Created new spreadsheet: {spreadsheet_name}")
+        
+        if cache is not None and cache.is_shared(spreadsheet_name, spreadsheet):
+            logger.info(f"Spreadsheet already shared with 'Anyone with the link'. URL: {spreadsheet.url}")
+        else:
+            try:
+                spreadsheet.share(None, perm_type='anyone', role='writer', notify=False)
+                logger.info(f"Shared spreadsheet with 'Anyone with the link' as editor. URL: {spreadsheet.url}")
+            except gspread.exceptions.APIError as e:
+                logger.error(f"API error while sharing spreadsheet: {str(e)}")
+                raise
+            except AttributeError as e:
+                logger.error(f"Attribute error while sharing spreadsheet: {str(e)}")
+                try:
+                    permissions = {
+                        'type': 'anyone',
+                        'role': 'writer'
+                    }
+                    spreadsheet.client.insert_permission(spreadsheet.id, permissions)
+                    logger.info(f"Shared spreadsheet using legacy method. URL: {spreadsheet.url}")
+                except Exception as e:
+                    logger.error(f"Failed to share using legacy method: {str(e)}")
+                    raise
+            if cache is not None:
+                cache.mark_shared(spreadsheet_name)
+        
+        worksheet = spreadsheet.get_worksheet(0)
+        rows = to_sheet_rows(df)
+        
+        if mode == 'delta':
+            try:
+                sync_worksheet(worksheet, rows, snapshot_path=snapshot_path)
+                logger.info(f"Data synced to Google Sheet: {spreadsheet_name}. URL: {spreadsheet.url}")
+            except gspread.exceptions.APIError as e:
+                logger.error(f"Failed to sync worksheet: {str(e)}")
+                raise
+            return
+        
+        try:
+            call_with_retry(worksheet.clear)
+        except gspread.exceptions.APIError as e:
+            logger.error(f"Failed to clear worksheet: {str(e)}")
+            raise
+        
+        # The sheet is cleared once; a failed upload resumes from its first unwritten chunk.
+        uploader = ChunkedUploader(worksheet, rows)
+        try:
+            uploader.run_resuming()
+            if snapshot_path:
+                write_snapshot(snapshot_path, rows)
+            logger.info(f"Data saved to Google Sheet: {spreadsheet_name}. URL: {spreadsheet.url}")
+        except gspread.exceptions.APIError as e:
+            logger.error(f"Failed to update worksheet after {uploader.next_chunk}/{len(uploader.chunks)} chunks: {str(e)}")
+            raise
+    
+    except gspread.exceptions.APIError as e:
+        logger.error(f"Google Sheets API error: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Failed to save to Google Sheets: {str(e)}")
+        raise
+
+# Columns that change on every scrape and do not make a stored row count as updated.
+DATABASE_IGNORED_COLUMNS = ('timestamp',)
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+def _quote(identifier):
+    if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', identifier):
+        raise ValueError(f"Invalid SQL identifier: {identifier!r}")
+    return f'"{identifier}"'
+
+def _placeholders(paramstyle, count, offset=0):
+    """
+    Returns count positional DB-API placeholders for paramstyle, numbered from offset + 1 where needed.
+    """
+    if paramstyle == 'qmark':
+        return ['?'] * count
+    if paramstyle in ('format', 'pyformat'):
+        return ['%s'] * count
+    if paramstyle == 'numeric':
+        return [f":{offset + i + 1}" for i in range(count)]
+    raise ValueError(f"Unsupported DB-API paramstyle '{paramstyle}'. Use qmark, numeric, format or pyformat.")
+
+def save_to_database(df, target, table='products', key='Title', paramstyle=None, ignore=DATABASE_IGNORED_COLUMNS):
+    """
+    Upserts the DataFrame into a database table keyed on the key column, creating the table
+    and a unique index on the key when they do not exist. target is a SQLite file path, or an
+    open DB-API connection together with its module's paramstyle (qmark for sqlite3).
+    Stored rows are read once and compared in Python, so only new rows are inserted and only
+    rows whose values changed (columns in ignore aside) are updated, with one executemany
+    each inside a single transaction.
+    Returns a dict with the inserted, updated and unchanged row counts.
+    """
+    try:
+        if df.empty:
+            raise ValueError("Input DataFrame is empty.")
+        if key not in df.columns:
+            raise ValueError(f"Key column '{key}' is missing.")
+        if df[key].duplicated().any():
+            raise ValueError(f"Key column '{key}' has duplicate values.")
+
+        owns_connection = not hasattr(target, 'cursor')
+        connection = sqlite3.connect(target) if owns_connection else target
+        paramstyle = paramstyle or ('qmark' if owns_connection or isinstance(connection, sqlite3.Connection) else None)
+        if paramstyle is None:
+            raise ValueError("paramstyle is required for non-SQLite connections.")
+
+        rows = to_python_rows(df, missing=None)
+        columns = rows[0]
+        quoted = [_quote(name) for name in columns]
+        table_name = _quote(table)
+        key_index = columns.index(key)
+        compared = [i for i, name in enumerate(columns) if name not in ignore]
+
+        try:
+            cursor = connection.cursor()
+            definitions = ', '.join(f"{name} {_sql_type(df[column].dtype)}" for name, column in zip(quoted, columns))
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({definitions})")
+            cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(f'idx_{table}_{key}')} ON {table_name} ({_quote(key)})")
+
+            cursor.execute(f"SELECT {', '.join(quoted)} FROM {table_name}")
+            stored = {normalize_cell(row[key_index]): [normalize_cell(row[i]) for i in compared] for row in cursor.fetchall()}
+
+            inserts, updates, unchanged = [], [], 0
+            for row in rows[1:]:
+                current = stored.get(normalize_cell(row[key_index]))
+                if current is None:
+                    inserts.append(row)
+                elif current != [normalize_cell(row[i]) for i in compared]:
+                    updates.append([value for i, value in enumerate(row) if i != key_index] + [row[key_index]])
+                else:
+                    unchanged += 1
+
+            if inserts:
+                cursor.executemany(
+                    f"INSERT INTO {table_name} ({', '.join(quoted)}) VALUES ({', '.join(_placeholders(paramstyle, len(columns)))})",
+                    inserts
+                )
+            if updates:
+                set_names = [name for i, name in enumerate(quoted) if i != key_index]
+                set_placeholders = _placeholders(paramstyle, len(set_names))
+                key_placeholder = _placeholders(paramstyle, 1, offset=len(set_names))[0]
+                assignments = ', '.join(f"{name} = {placeholder}" for name, placeholder in zip(set_names, set_placeholders))
+                cursor.executemany(f"UPDATE {table_name} SET {assignments} WHERE {_quote(key)} = {key_placeholder}", updates)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            if owns_connection:
+                connection.close()
+
+        stats = {'inserted': len(inserts), 'updated': len(updates), 'unchanged': unchanged}
+        logger.info(f"Data upserted to database table {table}: {stats['inserted']} inserted, "
+                    f"{stats['updated']} updated, {stats['unchanged']} unchanged.")
+        return stats
+
+    except Exception as e:
+        logger.error(f"Failed to save to database: {str(e)}")
+        raise
+
+SINKS = {
+    'csv': save_to_csv,
+    'parquet': save_to_parquet,
+    'feather': save_to_feather,
+    'database': save_to_database,
+    'history': append_history,
+    'google_sheets': save_to_google_sheets
+}
+
+def get_sink(name):
+    """
+    Returns the save function registered under name. Every sink takes (df, target, **options).
+    """
+    try:
+        return SINKS[name]
+    except KeyError:
+        raise ValueError(f"Unknown sink '{name}'. Available: {', '.join(sorted(SINKS))}")
+
+# Sinks that can consume DataFrame batches as they arrive, with the signature (batches, target, **options).
+BATCH_SINKS = {
+    'csv': save_batches_to_csv
+}
+
+_END_OF_STREAM = object()
+
+def _resolve_targets(targets):
+    sinks = []
+    for entry in targets:
+        name, target, options = (tuple(entry) + ({},))[:3]
+        sinks.append((get_sink(name), name, target, options))
+    return sinks
+
+def save_to_sinks(df, targets):
+    """
+    Saves the DataFrame to every (sink name, target[, options]) entry in targets, in order,
+    e.g. [('csv', 'products.csv'), ('parquet', 'products.parquet', {'compression': 'zstd'})].
+    Returns the list of targets written.
+    """
+    sinks = _resolve_targets(targets)
+
+    written = []
+    for sink, name, target, options in sinks:
+        logger.info(f"Loading into {name}: {target}")
+        started = time.perf_counter()
+        try:
+            sink(df, target, **options)
+        except Exception:
+            SINK_FAILURES.inc(sink=name)
+            raise
+        finally:
+            SINK_SECONDS.observe(time.perf_counter() - started, sink=name)
+        SINK_ROWS.inc(len(df), sink=name)
+        written.append(target)
+    return written
+
+def _save_frame(sink, df, target, options):
+    sink(df, target, **options)
+    return len(df)
+
+def _run_sink(name, target, load, *args, **kwargs):
+    """
+    Runs load(*args, **kwargs) for one sink, which returns the number of rows written, and
+    returns the sink's result dict instead of raising.
+    """
+    logger.info(f"Loading into {name}: {target}")
+    started = time.perf_counter()
+    result = {'sink': name, 'target': target, 'status': 'ok', 'rows': 0, 'seconds': 0.0, 'error': None}
+    try:
+        result['rows'] = load(*args, **kwargs)
+        SINK_ROWS.inc(result['rows'], sink=name)
+    except Exception as e:
+        SINK_FAILURES.inc(sink=name)
+        result.update(status='failed', error=f"{type(e).__name__}: {str(e)}")
+    finally:
+        result['seconds'] = time.perf_counter() - started
+        SINK_SECONDS.observe(result['seconds'], sink=name)
+    return result
+
+def log_sink_results(results):
+    """
+    Logs one summary line per sink result and returns the names of the sinks that failed.
+    """
+    failed = []
+    for result in results:
+        if result['status'] == 'ok':
+            logger.info(f"Sink {result['sink']} ({result['target']}): {result['rows']} rows in {result['seconds']:.2f}s")
+        else:
+            logger.error(f"Sink {result['sink']} ({result['target']}) failed after {result['seconds']:.2f}s: {result['error']}")
+            failed.append(result['sink'])
+    return failed
+
+def load_concurrently(df, targets, max_workers=None):
+    """
+    Saves the DataFrame to every (sink name, target[, options]) entry in targets at once, one
+    thread per sink (at most max_workers), so a slow network sink such as Google Sheets does not
+    hold up the local files. A failing sink does not stop the others: every sink gets a result
+    dict with its status ('ok' or 'failed'), rows, seconds and error, returned in target order.
+    """
+    sinks = _resolve_targets(targets)
+    if not sinks:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(sinks), thread_name_prefix='sink') as executor:
+        futures = [executor.submit(_run_sink, name, target, _save_frame, sink, df, target, options)
+                   for sink, name, target, options in sinks]
+        results = [future.result() for future in futures]
+    log_sink_results(results)
+    return results
+
+def _drain(batch_queue):
+    while True:
+        batch = batch_queue.get()
+        if batch is _END_OF_STREAM:
+            return
+        if isinstance(batch, BaseException):
+            raise batch
+        yield batch
+
+def concat_batches(batches):
+    """
+    Concatenates DataFrame batches into one frame. Categorical columns (the compact schema) stay
+    categorical; pd.concat turns them into object columns when the batches saw different categories.
+    """
+    df = pd.concat(batches, ignore_index=True)
+    for column, dtype in batches[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+def load_stream(batches, targets, max_workers=None):
+    """
+    Loads a stream of DataFrame batches into targets while it is still being produced (e.g. by
+    scrape_batches during extraction). Sinks in BATCH_SINKS consume every batch as it arrives,
+    each in its own thread; the other sinks get the concatenated batches once the stream ends
+    and run concurrently. Failures are isolated as in load_concurrently. If the stream itself
+    fails, the batch sinks are aborted (so they do not publish a partial file), the other sinks
+    are skipped and the error is raised.
+    Returns the per-sink result dicts in target order.
+    """
+    sinks = _resolve_targets(targets)
+    streaming = [(name, target, options) for _, name, target, options in sinks if name in BATCH_SINKS]
+    whole = [(name, target, options) for _, name, target, options in sinks if name not in BATCH_SINKS]
+
+    # Unbounded queues: a failed batch sink must never block the producer. A batch is dropped
+    # once the batch sinks have taken it, unless a whole-table sink needs it at the end.
+    queues = [queue.Queue() for _ in streaming]
+    results = {}
+
+    def consume(index, name, target, options):
+        results[index] = _run_sink(name, target, BATCH_SINKS[name], _drain(queues[index]), target, **options)
+
+    threads = [threading.Thread(target=consume, args=(i, name, target, options), name=f"sink-{name}", daemon=True)
+               for i, (name, target, options) in enumerate(streaming)]
+    for thread in threads:
+        thread.start()
+
+    collected = []
+    try:
+        for batch in batches:
+            if batch.empty:
+                continue
+            if whole:
+                collected.append(batch)
+            for batch_queue in queues:
+                batch_queue.put(batch)
+    except BaseException as e:
+        for batch_queue in queues:
+            batch_queue.put(e)
+        for thread in threads:
+            thread.join()
+        logger.error(f"Stream failed; aborted the batch sinks: {str(e)}")
+        raise
+    for batch_queue in queues:
+        batch_queue.put(_END_OF_STREAM)
+
+    whole_results = []
+    if whole:
+        if collected:
+            df = concat_batches(collected)
+            whole_results = load_concurrently(df, whole, max_workers=max_workers)
+        else:
+            whole_results = [{'sink': name, 'target': target, 'status': 'failed', 'rows': 0, 'seconds': 0.0,
+                              'error': "ValueError: No batches to save."} for name, target, _ in whole]
+            log_sink_results(whole_results)
+    for thread in threads:
+        thread.join()
+    streamed_results = [results[i] for i in range(len(streaming))]
+    log_sink_results(streamed_results)
+
+    streamed_results, whole_results = iter(streamed_results), iter(whole_results)
+    return [next(streamed_results) if name in BATCH_SINKS else next(whole_results) for _, name, _, _ in sinks]
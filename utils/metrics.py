@@ -0,0 +1,200 @@
+import json
+import math
+import os
+import threading
+import logging
+from utils.cache import atomic_write
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {sorted(labelnames)}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Counter:
+    """
+    A monotonically increasing count, optionally split by labels.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def to_dict(self):
+        with self._lock:
+            return [{'labels': dict(zip(self.labelnames, key)), 'value': value} for key, value in sorted(self._values.items())]
+
+class Histogram:
+    """
+    Counts observations into cumulative upper-bound buckets and tracks their sum, optionally split by labels.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.setdefault(key, {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(_label_key(self.labelnames, labels))
+            return state['count'] if state else 0
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, (('le', _format_value(bound)),), cumulative))
+                samples.append((f"{self.name}_sum", key, (), state['sum']))
+                samples.append((f"{self.name}_count", key, (), state['count']))
+        return samples
+
+    def to_dict(self):
+        with self._lock:
+            return [{
+                'labels': dict(zip(self.labelnames, key)),
+                'count': state['count'],
+                'sum': state['sum'],
+                'buckets': {_format_value(bound): count for bound, count in zip(self.buckets, state['counts'])}
+            } for key, state in sorted(self._values.items())]
+
+class MetricsRegistry:
+    """
+    Holds the pipeline's counters and histograms and exports them in the Prometheus text
+    format or as JSON. Registering an existing name returns the existing metric.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help, labelnames, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **options)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels.")
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics[name]
+
+    def reset(self):
+        """
+        Clears every recorded value, keeping the registered metrics.
+        """
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def to_prometheus(self):
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample_name, key, extra, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(metric.labelnames, key, extra)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        return {name: {'type': metric.kind, 'help': metric.help, 'samples': metric.to_dict()}
+                for name, metric in sorted(self._metrics.items())}
+
+    def write(self, path):
+        """
+        Writes the metrics to path: JSON when it ends in .json, the Prometheus text format otherwise
+        (e.g. a .prom file for node_exporter's textfile collector).
+        """
+        if os.path.splitext(path)[1].lower() == '.json':
+            data = json.dumps(self.to_dict(), indent=2)
+        else:
+            data = self.to_prometheus()
+        atomic_write(path, data.encode('utf-8'))
+        logger.info(f"Metrics written to {path}")
+
+REGISTRY = MetricsRegistry()
+
+PAGE_FETCH_SECONDS = REGISTRY.histogram('scraper_page_fetch_seconds', "Time to fetch one catalogue page.")
+BYTES_DOWNLOADED = REGISTRY.counter('scraper_bytes_downloaded_total', "Decoded bytes of catalogue pages received.")
+BYTES_RECEIVED = REGISTRY.counter('scraper_bytes_received_total', "Bytes of catalogue pages as received, before decompression.", ['encoding'])
+PAGE_BYTES = REGISTRY.histogram('scraper_page_bytes', "Size of one catalogue page body, as received (wire) and decoded.", ['kind'], buckets=SIZE_BUCKETS)
+PAGES = REGISTRY.counter('scraper_pages_total', "Catalogue pages by outcome.", ['status'])
+PRODUCTS_PARSED = REGISTRY.counter('scraper_products_parsed_total', "Product cards turned into records.")
+DEDUP_PRODUCTS = REGISTRY.counter('scraper_dedup_products_total', "Parsed products kept or dropped as duplicates by the dedup index.", ['result'])
+FINGERPRINT_PAGES = REGISTRY.counter('scraper_fingerprint_pages_total', "Pages whose records were reused from an identical body, or parsed.", ['result'])
+PRODUCTS_SKIPPED = REGISTRY.counter('scraper_products_skipped_total', "Product cards skipped by reason.", ['reason'])
+TRANSFORM_ROWS = REGISTRY.counter('transform_rows_total', "Rows entering and leaving transform_data.", ['stage'])
+TRANSFORM_ROWS_DROPPED = REGISTRY.counter('transform_rows_dropped_total', "Rows removed by each transform_data filter.", ['filter'])
+SINK_SECONDS = REGISTRY.histogram('load_sink_seconds', "Time to load the frame into one sink.", ['sink'])
+SINK_ROWS = REGISTRY.counter('load_rows_total', "Rows handed to each sink.", ['sink'])
+SINK_FAILURES = REGISTRY.counter('load_sink_failures_total', "Failed sink loads.", ['sink'])
+STAGE_SECONDS = REGISTRY.histogram('pipeline_stage_seconds', "Wall time of each pipeline stage.", ['stage'])
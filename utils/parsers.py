@@ -0,0 +1,139 @@
+import logging
+import re
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DETAIL_STYLE = "font-size: 14px; color: #777;"
+
+# Pagination is read with regular expressions on the raw markup, so discovering the next pages
+# costs no second DOM parse of the page.
+_ANCHOR = re.compile(r'<a\b([^>]*)>(.*?)</a\s*>', re.IGNORECASE | re.DOTALL)
+_HREF = re.compile(r'''\bhref\s*=\s*["']([^"']*)["']''', re.IGNORECASE)
+_REL_NEXT = re.compile(r'''\brel\s*=\s*["'][^"']*\bnext\b''', re.IGNORECASE)
+_PAGE_HREF = re.compile(r'/page(\d+)/?(?:[?#].*)?$')
+_TAG = re.compile(r'<[^>]+>')
+_NEXT_TEXT = re.compile(r'^(?:next\b|›|»|→)', re.IGNORECASE)
+_PAGE_OF = re.compile(r'\bpage\s+\d+\s+of\s+(\d+)\b', re.IGNORECASE)
+
+def _class_xpath(class_name):
+    return f".//*[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+def parse_cards_bs4(html):
+    """
+    Reference backend built on BeautifulSoup's html.parser.
+    Returns one (title, price_text, detail_texts) tuple per '.collection-card' element.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    cards = []
+    for product in soup.select('.collection-card'):
+        title_elem = product.select_one('.product-title') or product.find('h3') or product.find('h4')
+        price_elem = product.select_one('.price')
+        cards.append((
+            title_elem.text.strip() if title_elem else None,
+            price_elem.text.strip() if price_elem else None,
+            [p.text.strip() for p in product.find_all('p', style=DETAIL_STYLE)]
+        ))
+    return cards
+
+_lxml_xpaths = None
+
+def _get_lxml_xpaths():
+    global _lxml_xpaths
+    if _lxml_xpaths is None:
+        from lxml import etree
+        _lxml_xpaths = {
+            'cards': etree.XPath(_class_xpath('collection-card').replace('.//', '//', 1)),
+            'titles': [etree.XPath(f"({_class_xpath('product-title')})[1]"), etree.XPath("(.//h3)[1]"), etree.XPath("(.//h4)[1]")],
+            'price': etree.XPath(f"({_class_xpath('price')})[1]"),
+            'details': etree.XPath(".//p[@style=$style]")
+        }
+    return _lxml_xpaths
+
+def _first_match(product, xpaths):
+    # lxml elements without children are falsy, so the bs4 `a or b` chain cannot be reused here.
+    for xpath in xpaths:
+        matches = xpath(product)
+        if matches:
+            return matches[0]
+    return None
+
+def parse_cards_lxml(html):
+    """
+    Faster backend built on lxml's HTML parser and precompiled XPath expressions.
+    Returns the same tuples as parse_cards_bs4.
+    """
+    from lxml import etree, html as lxml_html
+
+    if not html or not html.strip():
+        return []
+    try:
+        try:
+            root = lxml_html.document_fromstring(html)
+        except ValueError:
+            # lxml refuses str input that carries an XML encoding declaration.
+            root = lxml_html.document_fromstring(html.encode('utf-8'))
+    except etree.ParserError:
+        return []
+
+    xpaths = _get_lxml_xpaths()
+    cards = []
+    for product in xpaths['cards'](root):
+        title_elem = _first_match(product, xpaths['titles'])
+        price_elem = _first_match(product, [xpaths['price']])
+        cards.append((
+            title_elem.text_content().strip() if title_elem is not None else None,
+            price_elem.text_content().strip() if price_elem is not None else None,
+            [p.text_content().strip() for p in xpaths['details'](product, style=DETAIL_STYLE)]
+        ))
+    return cards
+
+def parse_pagination(html):
+    """
+    Reads the pagination controls of a catalogue page.
+    Returns (next_page, last_page): the page number of the "Next" link (an anchor with
+    rel="next" or text starting with Next, › or ») and the highest page number linked or
+    stated as "Page X of Y". Either is None when the page does not show it.
+    """
+    if not isinstance(html, str):
+        return None, None
+
+    next_page = None
+    linked = []
+    for attributes, text in _ANCHOR.findall(html):
+        href = _HREF.search(attributes)
+        match = _PAGE_HREF.search(href.group(1)) if href else None
+        if not match:
+            continue
+        page = int(match.group(1))
+        linked.append(page)
+        if _REL_NEXT.search(attributes) or _NEXT_TEXT.match(_TAG.sub('', text).strip()):
+            next_page = page
+
+    linked.extend(int(total) for total in _PAGE_OF.findall(html))
+    return next_page, max(linked) if linked else None
+
+def parse_stated_pages(html):
+    """
+    Returns the page count a catalogue page states as "Page X of Y", or None when it states none.
+    """
+    if not isinstance(html, str):
+        return None
+    stated = [int(total) for total in _PAGE_OF.findall(html)]
+    return max(stated) if stated else None
+
+PARSER_BACKENDS = {
+    'bs4': parse_cards_bs4,
+    'lxml': parse_cards_lxml
+}
+
+def get_parser_backend(name):
+    """
+    Returns the card parser registered under name.
+    """
+    try:
+        return PARSER_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend '{name}'. Available: {', '.join(sorted(PARSER_BACKENDS))}")
@@ -0,0 +1,189 @@
+import threading
+import time
+import logging
+from urllib.parse import urlsplit
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """
+    A thread-safe token bucket that allows rate calls per period seconds, with bursts of up to
+    capacity calls (rate by default). acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, period=60.0, capacity=None):
+        if rate <= 0 or period <= 0:
+            raise ValueError("rate and period must be positive.")
+        self.rate = rate
+        self.period = period
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate / self.period)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Takes one token, sleeping until one is available. Returns the seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) * self.period / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class HostController:
+    """
+    Adaptive limits for one host: a token bucket for the request rate plus an AIMD concurrency
+    limit, with the rate scaled along with the concurrency. In slow start every response at a
+    flat latency (a smoothed latency within latency_tolerance times the lowest one seen) adds
+    one to the concurrency, doubling it per round trip; once latency rises or the host pushes
+    back, growth turns additive (about +1 per round of limit responses). A 429, 5xx or
+    connection error multiplies both limits by decrease_factor, at most once per round trip,
+    and a Retry-After pauses the host. Rising latency holds both.
+    """
+
+    def __init__(self, rate=10.0, concurrency=2, min_rate=0.5, max_rate=200.0, min_concurrency=1,
+                 max_concurrency=64, decrease_factor=0.5, latency_tolerance=2.0):
+        self.rate = float(rate)
+        self.limit = float(concurrency)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.latency = None
+        self.baseline = None
+        self.decreases = 0
+        self.slow_start = True
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._decrease_after = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def concurrency(self):
+        return max(self.min_concurrency, int(self.limit))
+
+    def _refill(self, now):
+        self._tokens = min(max(1.0, self.limit), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Blocks until the host has a free concurrency slot and a token, then takes both.
+        Returns the seconds spent waiting.
+        """
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                elif self.in_flight >= self.concurrency:
+                    delay = None
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    self.in_flight += 1
+                    return time.monotonic() - started
+                else:
+                    delay = (1 - self._tokens) / self.rate
+                self._condition.wait(delay)
+
+    def release(self, latency, status=None, retry_after=None):
+        """
+        Frees the slot taken by acquire() and adapts the limits to the outcome: status is the
+        HTTP status code, or None for a timeout or connection error.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if status is None or status == 429 or status >= 500:
+                self._decrease(now, latency)
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+            else:
+                self._observe(latency)
+                if self.latency <= self.baseline * self.latency_tolerance:
+                    self._increase()
+                else:
+                    self.slow_start = False
+            self._condition.notify_all()
+
+    def _observe(self, latency):
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        # The baseline follows the fastest responses and drifts up slowly, so a lasting change in
+        # the server's speed does not read as congestion forever.
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * 0.01
+
+    def _increase(self):
+        limit = min(self.max_concurrency, self.limit + (1 if self.slow_start else 1 / self.limit))
+        self.rate = min(self.max_rate, self.rate * limit / self.limit)
+        self.limit = limit
+
+    def _decrease(self, now, latency):
+        self.slow_start = False
+        # Responses to requests sent before the last decrease say nothing about the new limits.
+        if now < self._decrease_after:
+            return
+        self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._tokens = min(self._tokens, 1.0)
+        self._decrease_after = now + max(latency, self.latency or 0.0)
+        self.decreases += 1
+        logger.info(f"Backing off: concurrency {self.limit:.1f}, rate {self.rate:.1f}/s")
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                'rate': round(self.rate, 3),
+                'concurrency': self.concurrency,
+                'in_flight': self.in_flight,
+                'latency': self.latency,
+                'baseline_latency': self.baseline,
+                'decreases': self.decreases,
+                'slow_start': self.slow_start
+            }
+
+class AdaptiveLimiter:
+    """
+    Keeps one HostController per host, created with the given options on first use.
+    Pass it to PooledSession(limiter=...) to pace and size the requests to every host.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url):
+        name = urlsplit(url).netloc
+        with self._lock:
+            if name not in self._hosts:
+                self._hosts[name] = HostController(**self.options)
+            return self._hosts[name]
+
+    def stats(self):
+        """
+        Returns the current rate, concurrency and latency of every host.
+        """
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {name: controller.snapshot() for name, controller in hosts.items()}
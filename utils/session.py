@@ -0,0 +1,225 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING as DECODABLE_ENCODINGS
+import random
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Only the content codings urllib3 can decode here: gzip and deflate, plus br when brotli is
+# installed (and zstd with zstandard).
+ACCEPT_ENCODING = ', '.join(DECODABLE_ENCODINGS.split(','))
+# Decoded bytes a single response body may have; larger bodies fail the request.
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+# Compressed bytes read (and decoded) per step, which bounds the memory one step of a
+# highly compressed body can take.
+BODY_CHUNK_SIZE = 16 * 1024
+
+class ResponseTooLarge(requests.RequestException):
+    """
+    Raised when a response body exceeds the session's max_body_bytes.
+    """
+
+def backoff_delay(attempt, backoff_factor=0.5, backoff_max=30.0):
+    """
+    Returns a jittered exponential backoff delay in seconds for the given retry attempt (0-based).
+    Uses "full jitter": a uniform draw between 0 and min(backoff_max, backoff_factor * 2 ** attempt).
+    """
+    return random.uniform(0, min(backoff_max, backoff_factor * (2 ** attempt)))
+
+def parse_retry_after(value):
+    """
+    Parses a numeric Retry-After header value. Returns seconds as a float, or None.
+    """
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+class PooledSession:
+    """
+    A requests.Session wrapper that keeps per-host connection pools alive across requests
+    and retries timeouts, connection errors and retryable status codes with jittered backoff.
+    With a ResponseCache, requests are made conditional and 304 responses are served from disk.
+    With a utils.ratelimit.AdaptiveLimiter, every attempt waits for a slot of its host's adaptive
+    rate and concurrency limits and reports its latency and status back.
+    Bodies are requested compressed (ACCEPT_ENCODING), streamed and decoded in BODY_CHUNK_SIZE
+    steps, and fail with ResponseTooLarge past max_body_bytes decoded bytes (None for no limit).
+    Each response carries wire_bytes (as received) and body_bytes (decoded), also totalled in stats.
+    """
+
+    def __init__(self, headers=None, timeout=15, max_retries=3, backoff_factor=0.5, backoff_max=30.0,
+                 retry_statuses=RETRY_STATUSES, pool_connections=10, pool_maxsize=10, cache=None, limiter=None,
+                 max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.cache = cache
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._adapter = adapter
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        if headers:
+            self.session.headers.update(headers)
+
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'retries': 0, 'give_ups': 0, 'cache_hits': 0, 'cache_misses': 0,
+                          'bytes_received': 0, 'bytes_decoded': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _wait(self, url, attempt, reason, retry_after=None):
+        delay = backoff_delay(attempt, self.backoff_factor, self.backoff_max)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        self._count('retries')
+        logger.warning(f"Retrying {url} in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries}): {reason}")
+        time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        """
+        Sends a GET request through the pooled session.
+        Retries on timeouts, connection errors and retryable status codes up to max_retries times.
+        Returns the final response; raises the last exception when every attempt failed to connect.
+        """
+        if self.cache is None:
+            return self._send(url, **kwargs)
+
+        headers = kwargs.pop('headers', None) or {}
+        conditional = self.cache.conditional_headers(url)
+        response = self._send(url, headers={**headers, **conditional}, **kwargs)
+
+        if response.status_code == 304 and conditional:
+            cached = self.cache.revalidated(url, response)
+            if cached is not None:
+                self._count('cache_hits')
+                return cached
+            response = self._send(url, headers=headers, **kwargs)
+
+        self._count('cache_misses')
+        if response.status_code == 200:
+            self.cache.put(url, response)
+        return response
+
+    def _send(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            self._count('requests')
+            try:
+                response = self._get(url, **kwargs)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                if attempt >= self.max_retries:
+                    self._count('give_ups')
+                    raise
+                self._wait(url, attempt, str(e))
+                attempt += 1
+                continue
+
+            if response.status_code not in self.retry_statuses:
+                return response
+            if attempt >= self.max_retries:
+                self._count('give_ups')
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            response.close()
+            self._wait(url, attempt, f"HTTP {response.status_code}", retry_after)
+            attempt += 1
+
+    def _read_body(self, response):
+        """
+        Reads and decodes a streamed response body within max_body_bytes and records its size
+        as received (wire_bytes) and decoded (body_bytes).
+        """
+        limit = self.max_body_bytes
+        try:
+            declared = int(response.headers.get('Content-Length'))
+        except (TypeError, ValueError):
+            declared = None
+        chunks = []
+        decoded = 0
+        try:
+            if limit is not None and declared is not None and declared > limit:
+                raise ResponseTooLarge(f"{response.url} declares {declared} bytes, over the {limit} byte limit",
+                                       response=response)
+            for chunk in response.iter_content(BODY_CHUNK_SIZE):
+                decoded += len(chunk)
+                if limit is not None and decoded > limit:
+                    raise ResponseTooLarge(f"{response.url} body exceeds the {limit} byte limit", response=response)
+                chunks.append(chunk)
+        except BaseException:
+            response.close()
+            raise
+
+        response._content = b''.join(chunks)
+        response._content_consumed = True
+        # urllib3 counts the bytes taken off the connection, before decompression.
+        received = response.raw.tell() if hasattr(response.raw, 'tell') else None
+        response.wire_bytes = received if isinstance(received, int) else decoded
+        response.body_bytes = decoded
+        self._count('bytes_received', response.wire_bytes)
+        self._count('bytes_decoded', decoded)
+        return response
+
+    def _get(self, url, **kwargs):
+        kwargs['stream'] = True
+        if self.limiter is None:
+            return self._read_body(self.session.get(url, **kwargs))
+        host = self.limiter.host(url)
+        host.acquire()
+        started = time.monotonic()
+        try:
+            response = self._read_body(self.session.get(url, **kwargs))
+        except BaseException:
+            host.release(time.monotonic() - started)
+            raise
+        host.release(time.monotonic() - started, response.status_code,
+                     parse_retry_after(response.headers.get('Retry-After')))
+        return response
+
+    def _connection_stats(self):
+        opened = 0
+        requests_sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requests_sent += pool.num_requests
+        return opened, max(0, requests_sent - opened)
+
+    @property
+    def stats(self):
+        """
+        Returns a snapshot of request, retry, give-up, cache, byte and connection reuse counters.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats['connections_opened'], stats['connections_reused'] = self._connection_stats()
+        if self.limiter is not None:
+            stats['hosts'] = self.limiter.stats()
+        return stats
@@ -0,0 +1,437 @@
+from datetime import datetime
+import json
+import os
+import time
+import logging
+from utils.cache import atomic_write
+from utils.ratelimit import RateLimiter
+from utils.session import backoff_delay
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# gspread and google-auth are imported where they are used, so pipeline runs without the
+# Google Sheets sink never load them.
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive',
+    'https://www.googleapis.com/auth/drive.file'
+]
+CREDENTIALS_FILE = 'google-sheets-api.json'
+
+SYNC_KEY = 'Title'
+# Columns that change on every scrape; a row whose other cells are unchanged is left as it is.
+VOLATILE_COLUMNS = ('timestamp',)
+
+# Sheets API write quota per user per minute, shared by every write this process makes.
+WRITE_REQUESTS_PER_MINUTE = 60
+WRITE_LIMITER = RateLimiter(WRITE_REQUESTS_PER_MINUTE, period=60.0)
+# Cells per write request; keeps each payload well under the API request size limit.
+CHUNK_CELL_BUDGET = 10000
+RETRY_CODES = frozenset({429, 500, 503})
+# Times an upload resumes from its first unwritten chunk once a chunk has used up its retries.
+UPLOAD_RESUMES = 3
+
+def normalize_cell(value):
+    """
+    Returns a comparable form of a cell value. Sheets returns whole numbers as int and blank
+    cells as '', while the frame may hold floats and None for the same values.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return str(value)
+
+def _pad(row, width):
+    row = list(row)[:width]
+    return row + [''] * (width - len(row))
+
+def _contiguous_ranges(row_numbers):
+    """
+    Groups sorted sheet row numbers into (first, last) runs of consecutive rows.
+    """
+    ranges = []
+    for number in row_numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return [tuple(r) for r in ranges]
+
+def chunk_rows(rows, cell_budget=CHUNK_CELL_BUDGET):
+    """
+    Splits rows into consecutive lists holding at most cell_budget cells each.
+    A single row wider than the budget still gets a chunk of its own.
+    """
+    chunks, chunk, cells = [], [], 0
+    for row in rows:
+        if chunk and cells + len(row) > cell_budget:
+            chunks.append(chunk)
+            chunk, cells = [], 0
+        chunk.append(row)
+        cells += len(row)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def call_with_retry(call, limiter=None, max_retries=5, backoff_factor=1.0, backoff_max=64.0):
+    """
+    Runs a Sheets API call after taking a token from limiter (WRITE_LIMITER by default).
+    Quota (429) and unavailable (500/503) errors are retried with jittered exponential backoff;
+    other API errors, and the last retryable one, are raised.
+    """
+    import gspread
+
+    limiter = limiter or WRITE_LIMITER
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            return call()
+        except gspread.exceptions.APIError as e:
+            if e.code not in RETRY_CODES or attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt, backoff_factor, backoff_max)
+            logger.warning(f"Sheets API error {e.code}, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
+class ChunkedUploader:
+    """
+    Writes rows to a worksheet starting at start_row in chunks of at most cell_budget cells,
+    one rate-limited and retried update per chunk. Progress is kept on the instance, so after
+    a failure run() can be called again and resumes from the first chunk not yet written.
+    """
+
+    def __init__(self, worksheet, rows, start_row=1, cell_budget=CHUNK_CELL_BUDGET, limiter=None, **retry_options):
+        self.worksheet = worksheet
+        self.limiter = limiter
+        self.retry_options = retry_options
+        self.chunks = []
+        row_number = start_row
+        for chunk in chunk_rows(rows, cell_budget):
+            self.chunks.append((row_number, chunk))
+            row_number += len(chunk)
+        self.next_chunk = 0
+        self.cells_written = 0
+
+    @property
+    def done(self):
+        return self.next_chunk == len(self.chunks)
+
+    def run(self):
+        """
+        Uploads the remaining chunks. Returns the total number of cells written.
+        """
+        from gspread.utils import rowcol_to_a1
+
+        total = len(self.chunks)
+        for index in range(self.next_chunk, total):
+            first, chunk = self.chunks[index]
+            last = first + len(chunk) - 1
+            width = max(len(row) for row in chunk)
+            range_name = f"{rowcol_to_a1(first, 1)}:{rowcol_to_a1(last, width)}"
+            cells = sum(len(row) for row in chunk)
+
+            started = time.monotonic()
+            call_with_retry(lambda: self.worksheet.update(chunk, range_name), self.limiter, **self.retry_options)
+            elapsed = time.monotonic() - started
+
+            self.next_chunk = index + 1
+            self.cells_written += cells
+            logger.info(f"Uploaded chunk {index + 1}/{total} ({range_name}, {cells} cells) in {elapsed:.2f}s "
+                        f"({cells / max(elapsed, 1e-6):.0f} cells/s)")
+        return self.cells_written
+
+    def run_resuming(self, max_resumes=UPLOAD_RESUMES, backoff_factor=5.0, backoff_max=120.0):
+        """
+        Like run(), but when a chunk still fails with a quota or unavailable error (RETRY_CODES)
+        or a connection error after its retries, waits and resumes from that chunk, up to
+        max_resumes times, instead of leaving a half-written worksheet. Other errors are raised.
+        """
+        import gspread
+        import requests
+
+        for resume in range(max_resumes + 1):
+            try:
+                return self.run()
+            except (gspread.exceptions.APIError, requests.ConnectionError, requests.Timeout) as e:
+                if isinstance(e, gspread.exceptions.APIError) and e.code not in RETRY_CODES or resume == max_resumes:
+                    raise
+                delay = backoff_delay(resume, backoff_factor, backoff_max)
+                logger.warning(f"Upload stopped at chunk {self.next_chunk + 1}/{len(self.chunks)}: {str(e)}; "
+                               f"resuming in {delay:.1f}s (resume {resume + 1}/{max_resumes})")
+                time.sleep(delay)
+
+def diff_rows(current, new, key=SYNC_KEY, ignore=VOLATILE_COLUMNS):
+    """
+    Compares the current sheet contents with new rows, both given as a header row followed by
+    data rows, matching rows on the key column. Columns in ignore do not count as changes.
+    Returns a dict with 'changed' ({sheet row number: new row}), 'added' (new rows to append)
+    and 'removed' (sheet row numbers to delete), or None when the sheets cannot be diffed
+    (empty sheet, different header, missing or duplicate keys) and a full rewrite is needed.
+    """
+    if not current or not new:
+        return None
+    header = list(new[0])
+    if [str(cell) for cell in _pad(current[0], len(header))] != header or key not in header:
+        return None
+
+    width = len(header)
+    key_index = header.index(key)
+    compared = [i for i, name in enumerate(header) if name not in ignore]
+
+    existing = {}
+    for number, row in enumerate(current[1:], start=2):
+        row = _pad(row, width)
+        if all(cell == '' for cell in row):
+            continue
+        row_key = normalize_cell(row[key_index])
+        if row_key in existing:
+            return None
+        existing[row_key] = (number, [normalize_cell(row[i]) for i in compared])
+
+    changed, added, seen = {}, [], set()
+    for row in new[1:]:
+        row_key = normalize_cell(row[key_index])
+        if row_key in seen:
+            return None
+        seen.add(row_key)
+        if row_key not in existing:
+            added.append(list(row))
+            continue
+        number, old_values = existing[row_key]
+        if [normalize_cell(row[i]) for i in compared] != old_values:
+            changed[number] = list(row)
+
+    removed = sorted(number for row_key, (number, _) in existing.items() if row_key not in seen)
+    return {'changed': changed, 'added': added, 'removed': removed}
+
+def read_snapshot(path):
+    """
+    Returns the rows stored by write_snapshot, or None when there is no readable snapshot.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable sheet snapshot {path}: {str(e)}")
+        return None
+
+def write_snapshot(path, rows):
+    """
+    Stores the rows last written to the sheet, so the next delta sync can skip reading it back.
+    """
+    atomic_write(path, json.dumps(rows).encode('utf-8'))
+
+def apply_delta(worksheet, delta, width, cell_budget=CHUNK_CELL_BUDGET, limiter=None):
+    """
+    Sends a diff to the worksheet: changed rows as batched values updates over contiguous
+    ranges, removed rows as one batched deleteDimension request (bottom-up, so earlier row
+    numbers stay valid) and added rows as appends. Updates and appends are split by
+    cell_budget and go through call_with_retry. Returns the number of cells written.
+    """
+    from gspread.utils import rowcol_to_a1
+
+    cells = 0
+    batches, batch_cells = [[]], 0
+    for first, last in _contiguous_ranges(sorted(delta['changed'])):
+        start = first
+        for chunk in chunk_rows([delta['changed'][number] for number in range(first, last + 1)], cell_budget):
+            chunk_cells = len(chunk) * width
+            if batches[-1] and batch_cells + chunk_cells > cell_budget:
+                batches.append([])
+                batch_cells = 0
+            batches[-1].append({
+                'range': f"{rowcol_to_a1(start, 1)}:{rowcol_to_a1(start + len(chunk) - 1, width)}",
+                'values': chunk
+            })
+            start += len(chunk)
+            batch_cells += chunk_cells
+            cells += chunk_cells
+    for batch in batches:
+        if batch:
+            call_with_retry(lambda: worksheet.batch_update(batch, value_input_option='RAW'), limiter)
+
+    if delta['removed']:
+        requests = [{
+            'deleteDimension': {
+                'range': {'sheetId': worksheet.id, 'dimension': 'ROWS', 'startIndex': first - 1, 'endIndex': last}
+            }
+        } for first, last in reversed(_contiguous_ranges(delta['removed']))]
+        call_with_retry(lambda: worksheet.spreadsheet.batch_update({'requests': requests}), limiter)
+
+    for chunk in chunk_rows(delta['added'], cell_budget):
+        call_with_retry(lambda: worksheet.append_rows(chunk, value_input_option='RAW', table_range='A1'), limiter)
+        cells += len(chunk) * width
+    return cells
+
+def rewrite_worksheet(worksheet, rows, limiter=None):
+    """
+    Replaces the whole worksheet with rows through a ChunkedUploader. Returns the number of cells written.
+    """
+    call_with_retry(worksheet.clear, limiter)
+    return ChunkedUploader(worksheet, rows, limiter=limiter).run_resuming()
+
+def sync_worksheet(worksheet, rows, snapshot_path=None, key=SYNC_KEY, limiter=None):
+    """
+    Brings the worksheet in line with rows (header first) by writing only the rows that changed,
+    were added or were removed since the last sync. The current contents come from the snapshot
+    at snapshot_path when one exists, otherwise from the sheet itself. Falls back to a full
+    rewrite when the contents cannot be diffed.
+    Unchanged rows keep their position; new rows are appended at the end.
+    Returns a stats dict with the changed, added and removed row counts and the cells written.
+    """
+    current = read_snapshot(snapshot_path)
+    if current is None:
+        from gspread.utils import ValueRenderOption
+        current = worksheet.get_all_values(value_render_option=ValueRenderOption.unformatted)
+
+    delta = diff_rows(current, rows, key=key)
+    if delta is None:
+        logger.info("Worksheet cannot be diffed against the new rows; rewriting it completely.")
+        stats = {'mode': 'rewrite', 'changed': 0, 'added': len(rows) - 1, 'removed': 0,
+                 'cells_written': rewrite_worksheet(worksheet, rows, limiter)}
+    else:
+        stats = {'mode': 'delta', 'changed': len(delta['changed']), 'added': len(delta['added']),
+                 'removed': len(delta['removed']), 'cells_written': apply_delta(worksheet, delta, len(rows[0]), limiter=limiter)}
+
+    if snapshot_path:
+        # The sheet keeps existing rows in place and appends new ones, so store that order.
+        write_snapshot(snapshot_path, rows if delta is None else _synced_rows(current, rows, delta))
+    logger.info(f"Worksheet sync ({stats['mode']}): {stats['changed']} changed, {stats['added']} added, "
+                f"{stats['removed']} removed, {stats['cells_written']} cells written.")
+    return stats
+
+def _synced_rows(current, rows, delta):
+    width = len(rows[0])
+    removed = set(delta['removed'])
+    synced = [list(rows[0])]
+    for number, row in enumerate(current[1:], start=2):
+        if number not in removed:
+            synced.append(delta['changed'].get(number, _pad(row, width)))
+    return synced + delta['added']
+
+class SheetsClientCache:
+    """
+    Reuses Google Sheets credentials, the authorized client and spreadsheet handles across loads.
+    The access token and its expiry, each spreadsheet's ID and whether it is already shared are
+    kept in state_path (readable by the owner only), so later runs skip the token exchange until
+    the token expires, open the spreadsheet by ID instead of a Drive search by name, and skip
+    the share call.
+    """
+
+    def __init__(self, credentials_file=CREDENTIALS_FILE, state_path='.sheets_state.json', scopes=SCOPES):
+        self.credentials_file = credentials_file
+        self.state_path = state_path
+        self.scopes = scopes
+        self._creds = None
+        self._client = None
+        self._spreadsheets = {}
+        self._state = read_snapshot(state_path) or {}
+
+    def save(self):
+        """
+        Writes the current token, spreadsheet IDs and share flags to state_path.
+        """
+        if not self.state_path:
+            return
+        if self._creds is not None and self._creds.token:
+            self._state['token'] = {
+                'account': self._creds.service_account_email,
+                'value': self._creds.token,
+                'expiry': self._creds.expiry.isoformat() if self._creds.expiry else None
+            }
+        atomic_write(self.state_path, json.dumps(self._state).encode('utf-8'))
+        os.chmod(self.state_path, 0o600)
+
+    def _restore_token(self, creds):
+        saved = self._state.get('token')
+        if not saved or saved.get('account') != creds.service_account_email or not saved.get('expiry'):
+            return
+        creds.token = saved['value']
+        creds.expiry = datetime.fromisoformat(saved['expiry'])
+        if not creds.valid:
+            creds.token = None
+
+    def client(self):
+        """
+        Returns the authorized gspread client, creating it on first use. A stored token is reused
+        until it expires; google-auth refreshes it on the next request after that.
+        """
+        if self._client is None:
+            import gspread
+            from google.oauth2.service_account import Credentials
+
+            self._creds = Credentials.from_service_account_file(self.credentials_file, scopes=self.scopes)
+            self._restore_token(self._creds)
+            self._client = gspread.authorize(self._creds)
+        return self._client
+
+    def open(self, spreadsheet_name):
+        """
+        Returns the spreadsheet called spreadsheet_name, creating it when it does not exist.
+        After the first lookup it is opened by its stored ID, or served from memory.
+        """
+        if spreadsheet_name in self._spreadsheets:
+            return self._spreadsheets[spreadsheet_name]
+
+        import gspread
+
+        client = self.client()
+        entry = self._state.setdefault('spreadsheets', {}).get(spreadsheet_name)
+        spreadsheet = None
+        if entry:
+            try:
+                spreadsheet = client.open_by_key(entry['id'])
+                logger.info(f"Opened spreadsheet {spreadsheet_name} by cached ID")
+            except gspread.SpreadsheetNotFound:
+                logger.warning(f"Cached spreadsheet ID for {spreadsheet_name} is gone; looking it up by name.")
+                entry = None
+
+        if spreadsheet is None:
+            try:
+                spreadsheet = client.open(spreadsheet_name)
+                logger.info(f"Found existing spreadsheet: {spreadsheet_name}")
+            except gspread.SpreadsheetNotFound:
+                spreadsheet = client.create(spreadsheet_name)
+                logger.info(f"Created new spreadsheet: {spreadsheet_name}")
+            entry = {'id': spreadsheet.id, 'shared': False}
+            self._state['spreadsheets'][spreadsheet_name] = entry
+
+        self._spreadsheets[spreadsheet_name] = spreadsheet
+        self.save()
+        return spreadsheet
+
+    def is_shared(self, spreadsheet_name, spreadsheet, role='writer'):
+        """
+        Returns True when the spreadsheet already grants role to anyone with the link. Checks the
+        stored flag first and the spreadsheet's permissions once, recording a match.
+        """
+        entry = self._state.get('spreadsheets', {}).get(spreadsheet_name)
+        if entry and entry.get('shared'):
+            return True
+        shared = any(permission.get('type') == 'anyone' and permission.get('role') == role
+                     for permission in spreadsheet.list_permissions())
+        if shared:
+            self.mark_shared(spreadsheet_name)
+        return shared
+
+    def mark_shared(self, spreadsheet_name):
+        self._state.setdefault('spreadsheets', {}).setdefault(spreadsheet_name, {})['shared'] = True
+        self.save()
+
+    def clear(self):
+        """
+        Forgets the client, handles and stored state.
+        """
+        self._creds = None
+        self._client = None
+        self._spreadsheets.clear()
+        self._state = {}
+        if self.state_path and os.path.exists(self.state_path):
+            os.remove(self.state_path)
@@ -1,75 +1,206 @@
-import pandas as pd
-import logging
-import re
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-def transform_data(df):
-    """
-    Transforms the scraped data by cleaning and converting to appropriate data types.
-    Converts Price from USD to IDR (1 USD = 16000 IDR).
-    Returns the transformed DataFrame.
-    """
-    try:
-        if df.empty:
-            logger.warning("Input DataFrame is empty. Skipping transformation.")
-            return df
-        
-        logger.info("Starting transformation...")
-        
-        initial_len = len(df)
-        logger.info(f"Initial records: {initial_len}")
-        
-        df = df.dropna(subset=['Title'])
-        df = df[~df['Title'].str.lower().isin(['unknown product', ''])]
-        logger.info(f"After removing invalid Title: {len(df)} records remain.")
-        
-        df['Price'] = pd.to_numeric(df['Price'], errors='coerce').fillna(0)
-        df = df[df['Price'] > 0] 
-        df['Price'] = df['Price'] * 16000  
-        
-        def extract_rating(rating_str):
-            if rating_str is None:
-                return 0.0
-            match = re.search(r'(\d+\.\d+|\d+)\s*/\s*5', rating_str)
-            return float(match.group(1)) if match else 0.0
-        
-        df['Rating'] = df['Rating'].apply(extract_rating)
-        df = df[df['Rating'] >= 0]  
-        
-        def extract_colors(colors_str):
-            match = re.search(r'(\d+)\s*Colors?', colors_str)
-            return int(match.group(1)) if match else 0
-        
-        df['Colors'] = df['Colors'].apply(extract_colors)
-        df = df[df['Colors'] > 0] 
-        
-        df['Size'] = df['Size'].str.replace('Size: ', '').str.strip()
-        df['Gender'] = df['Gender'].str.replace('Gender: ', '').str.strip()
-        df = df[(df['Size'] != '') & (df['Gender'] != '')] 
-        df = df.drop_duplicates(subset=['Title'], keep='first')
-        logger.info(f"After removing duplicates: {len(df)} records remain.")
-        
-        df['Price'] = df['Price'].astype(float)
-        df['Rating'] = df['Rating'].astype(float)
-        df['Colors'] = df['Colors'].astype(int)
-        df['Size'] = df['Size'].astype(str)
-        df['Gender'] = df['Gender'].astype(str)
-        df['timestamp'] = df['timestamp'].astype(str)
-        df['page_number'] = df['page_number'].astype(int)
-        
-        if df.isnull().any().any():
-            logger.warning("Null values found after transformation.")
-            df = df.dropna()
-        
-        if len(df) == 0:
-            logger.warning("No valid data after transformation.")
-            return pd.DataFrame()
-        
-        logger.info(f"Transformed {len(df)} records.")
-        return df
-    
-    except Exception as e:
-        logger.error(f"Transformation failed: {str(e)}")
-        return pd.DataFrame()
\ No newline at end of file
+import pandas as pd
+import numpy as np
+import logging
+import re
+from utils.metrics import TRANSFORM_ROWS, TRANSFORM_ROWS_DROPPED
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RATING_PATTERN = re.compile(r'(\d+\.\d+|\d+)\s*/\s*5')
+COLORS_PATTERN = re.compile(r'(\d+)\s*Colors?')
+INVALID_TITLES = ['unknown product', '']
+USD_TO_IDR = 16000
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+COMPACT_DTYPES = {
+    'Price': 'int64',
+    'Rating': 'float32',
+    'Colors': 'uint8',
+    'Size': 'category',
+    'Gender': 'category',
+    'timestamp': 'datetime64[ns]',
+    'page_number': 'uint16'
+}
+
+def _distinct(series):
+    """
+    Factorizes series into (codes, distinct values). Scraped columns repeat a handful of values
+    (ratings, colors, sizes), so parsing the distinct values and indexing the results back by
+    code avoids running the same regex or string operation once per row.
+    The distinct values end with a None that code -1 (missing values) selects.
+    """
+    codes, uniques = pd.factorize(series)
+    return codes, pd.Series(list(uniques) + [None], dtype=object)
+
+def is_valid_record(record):
+    """
+    Returns True when transform_data would keep a raw record, duplicate titles aside: a valid
+    Title, a positive Price and Colors count, and a Size and Gender that are not blank.
+    Missing Size or Gender values are rejected too; erring on the strict side only means a
+    record's Title is not remembered by a DedupIndex, never that a kept product is lost.
+    """
+    title = record.get('Title')
+    if pd.isna(title) or str(title).lower() in INVALID_TITLES:
+        return False
+    try:
+        if not float(record.get('Price')) > 0:
+            return False
+    except (TypeError, ValueError):
+        return False
+    colors = record.get('Colors')
+    match = COLORS_PATTERN.search(colors) if isinstance(colors, str) else None
+    if match is None or int(match.group(1)) <= 0:
+        return False
+    size, gender = record.get('Size'), record.get('Gender')
+    return (isinstance(size, str) and size.replace('Size: ', '').strip() != ''
+            and isinstance(gender, str) and gender.replace('Gender: ', '').strip() != '')
+
+def transform_data(df):
+    """
+    Transforms the scraped data by cleaning and converting to appropriate data types.
+    Converts Price from USD to IDR (1 USD = 16000 IDR).
+    Each column is parsed with vectorized string operations over its distinct values, the row
+    filters are combined into a single boolean mask, and the kept rows are taken in one pass.
+    Returns the transformed DataFrame.
+    """
+    try:
+        if df.empty:
+            logger.warning("Input DataFrame is empty. Skipping transformation.")
+            return df
+        
+        logger.info("Starting transformation...")
+        
+        initial_len = len(df)
+        logger.info(f"Initial records: {initial_len}")
+        
+        TRANSFORM_ROWS.inc(initial_len, stage='input')
+        remaining = initial_len
+        
+        def drop(name, mask):
+            nonlocal remaining
+            kept_count = int(mask.sum())
+            TRANSFORM_ROWS_DROPPED.inc(remaining - kept_count, filter=name)
+            remaining = kept_count
+        
+        title_codes, titles = _distinct(df['Title'])
+        valid = (title_codes >= 0) & ~titles.str.lower().isin(INVALID_TITLES).to_numpy()[title_codes]
+        drop('invalid_title', valid)
+        logger.info(f"After removing invalid Title: {int(valid.sum())} records remain.")
+        
+        price_codes, prices = _distinct(df['Price'])
+        prices = pd.to_numeric(prices, errors='coerce').fillna(0).to_numpy()
+        rating_codes, ratings = _distinct(df['Rating'])
+        ratings = ratings.str.extract(RATING_PATTERN, expand=False).astype(float).fillna(0.0).to_numpy()
+        color_codes, colors = _distinct(df['Colors'])
+        colors = pd.to_numeric(colors.str.extract(COLORS_PATTERN, expand=False)).fillna(0).to_numpy()
+        size_codes, sizes = _distinct(df['Size'])
+        sizes = sizes.str.replace('Size: ', '').str.strip()
+        gender_codes, genders = _distinct(df['Gender'])
+        genders = genders.str.replace('Gender: ', '').str.strip()
+        
+        valid &= (prices > 0)[price_codes]
+        drop('invalid_price', valid)
+        valid &= (colors > 0)[color_codes]
+        drop('invalid_colors', valid)
+        valid &= (sizes != '').to_numpy()[size_codes] & (genders != '').to_numpy()[gender_codes]
+        drop('missing_size_gender', valid)
+        valid[valid] = ~pd.Series(title_codes[valid]).duplicated(keep='first').to_numpy()
+        drop('duplicate_title', valid)
+        
+        selected = df[valid]
+        
+        def kept(values, codes):
+            return pd.Series(values[codes[valid]], index=selected.index)
+        
+        df = selected.assign(
+            Price=(kept(prices, price_codes) * USD_TO_IDR).astype(float),
+            Rating=kept(ratings, rating_codes).astype(float),
+            Colors=kept(colors, color_codes).astype(int),
+            Size=kept(sizes.to_numpy(), size_codes).astype(str),
+            Gender=kept(genders.to_numpy(), gender_codes).astype(str),
+            timestamp=selected['timestamp'].astype(str),
+            page_number=selected['page_number'].astype(int)
+        )
+        logger.info(f"After removing duplicates: {len(df)} records remain.")
+        
+        if df.isnull().any().any():
+            logger.warning("Null values found after transformation.")
+            df = df.dropna()
+            TRANSFORM_ROWS_DROPPED.inc(remaining - len(df), filter='null_values')
+        TRANSFORM_ROWS.inc(len(df), stage='output')
+        
+        if len(df) == 0:
+            logger.warning("No valid data after transformation.")
+            return pd.DataFrame()
+        
+        logger.info(f"Transformed {len(df)} records.")
+        return df
+    
+    except Exception as e:
+        logger.error(f"Transformation failed: {str(e)}")
+        return pd.DataFrame()
+
+def transform_batches(batches, seen_titles=None):
+    """
+    Streaming counterpart of transform_data: transforms each incoming DataFrame batch and drops
+    titles already emitted by an earlier batch, so deduplication on Title spans the whole stream.
+    Yields the non-empty transformed batches.
+    """
+    if seen_titles is None:
+        seen_titles = set()
+
+    for batch in batches:
+        df = transform_data(batch)
+        if df.empty:
+            continue
+
+        df = df[~df['Title'].isin(seen_titles)]
+        if df.empty:
+            continue
+
+        seen_titles.update(df['Title'])
+        yield df
+
+def _to_small_int(series, dtype):
+    values = pd.to_numeric(series)
+    info = np.iinfo(dtype)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        raise ValueError(f"Column '{series.name}' has values outside the {dtype} range.")
+    return values.astype(dtype)
+
+def compact_dtypes(df):
+    """
+    Converts a transformed DataFrame to the compact schema in COMPACT_DTYPES: categorical Size and
+    Gender, small unsigned integers for Colors and page_number, float32 Rating, a datetime64
+    timestamp and Price as whole rupiah in int64 (rounded, so float noise from the USD conversion
+    cannot truncate a price). Also accepts frames read back from a sink, where values may be strings.
+    Returns a new DataFrame; the input is left untouched.
+    """
+    if df.empty:
+        return df
+
+    return df.assign(
+        Price=pd.to_numeric(df['Price']).round().astype(COMPACT_DTYPES['Price']),
+        Rating=pd.to_numeric(df['Rating']).astype(COMPACT_DTYPES['Rating']),
+        Colors=_to_small_int(df['Colors'], COMPACT_DTYPES['Colors']),
+        Size=df['Size'].astype(str).astype('category'),
+        Gender=df['Gender'].astype(str).astype('category'),
+        timestamp=pd.to_datetime(df['timestamp'], format=TIMESTAMP_FORMAT),
+        page_number=_to_small_int(df['page_number'], COMPACT_DTYPES['page_number'])
+    )
+
+def memory_report(before, after):
+    """
+    Compares the deep memory usage of two versions of a frame column by column.
+    Returns a DataFrame of before/after bytes per column with a 'total' row, and logs the totals.
+    """
+    report = pd.DataFrame({
+        'before_bytes': before.memory_usage(deep=True, index=False),
+        'after_bytes': after.memory_usage(deep=True, index=False)
+    })
+    report.loc['total'] = report.sum()
+    report = report.astype('int64')
+    total_before, total_after = report.loc['total']
+    saved = 100 * (1 - total_after / total_before) if total_before else 0.0
+    logger.info(f"Memory usage: {total_before} bytes -> {total_after} bytes ({saved:.1f}% smaller)")
+    return report
@@ -0,0 +1,329 @@
+import pandas as pd
+import argparse
+import glob
+import multiprocessing
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import logging
+from utils.extract import BASE_URL, DEFAULT_PARSER, HEADERS, TOTAL_PAGES, build_page_url, iter_pages
+from utils.parsers import parse_pagination
+from utils.session import PooledSession
+from utils.transform import transform_data
+from utils.load import save_to_csv
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = 'workqueue.db'
+SHARD_DIR = 'shards'
+SHARD_SIZE = 10
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+class WorkQueue:
+    """
+    A queue of page-range shards in a SQLite file, shared by worker processes on one machine or
+    by machines that mount the same directory (on a filesystem with working file locks).
+    Workers lease a shard for lease_seconds, renew the lease while they scrape it, and complete
+    or release it. The lease of a worker that died expires and the shard goes to the next
+    worker; a shard leased max_attempts times without completing is marked failed.
+    """
+
+    def __init__(self, path=QUEUE_PATH, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with self._transaction() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS shards (
+                    shard_id INTEGER PRIMARY KEY,
+                    first_page INTEGER NOT NULL,
+                    last_page INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    rows INTEGER,
+                    error TEXT
+                )""")
+
+    def _transaction(self):
+        return _Transaction(self.path)
+
+    def seed(self, last_page, shard_size=SHARD_SIZE):
+        """
+        Adds shards of shard_size pages covering the pages after the highest one already queued
+        up to last_page, so seeding again after the catalogue grew only adds the new pages.
+        Returns the number of shards added.
+        """
+        if shard_size < 1:
+            raise ValueError("shard_size must be at least 1.")
+        with self._transaction() as connection:
+            queued = connection.execute("SELECT COALESCE(MAX(last_page), 0) FROM shards").fetchone()[0]
+            shards = [(first, min(first + shard_size - 1, last_page), PENDING)
+                      for first in range(queued + 1, last_page + 1, shard_size)]
+            connection.executemany("INSERT INTO shards (first_page, last_page, status) VALUES (?, ?, ?)", shards)
+        logger.info(f"Queued {len(shards)} shards for pages {queued + 1}-{last_page}")
+        return len(shards)
+
+    def lease(self, worker):
+        """
+        Leases the next pending or expired shard to worker.
+        Returns {'shard_id', 'first_page', 'last_page', 'attempts'}, or None when nothing is left.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE shards SET status = ?, error = 'lease expired', worker = NULL, lease_expires = NULL "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, LEASED, now, self.max_attempts))
+            row = connection.execute(
+                "SELECT shard_id, first_page, last_page, attempts FROM shards "
+                "WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY shard_id LIMIT 1",
+                (PENDING, LEASED, now)).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE shards SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE shard_id = ?",
+                (LEASED, worker, now + self.lease_seconds, row[0]))
+        return {'shard_id': row[0], 'first_page': row[1], 'last_page': row[2], 'attempts': row[3] + 1}
+
+    def _update_lease(self, shard_id, worker, assignments, params):
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                f"UPDATE shards SET {assignments} WHERE shard_id = ? AND worker = ? AND status = ?",
+                (*params, shard_id, worker, LEASED))
+            return cursor.rowcount == 1
+
+    def renew(self, shard_id, worker):
+        """
+        Extends worker's lease on a shard. Returns False when the lease was lost.
+        """
+        return self._update_lease(shard_id, worker, "lease_expires = ?", (time.time() + self.lease_seconds,))
+
+    def complete(self, shard_id, worker, rows):
+        """
+        Marks worker's shard done. Returns False when the lease was lost to another worker.
+        """
+        return self._update_lease(shard_id, worker, "status = ?, rows = ?, error = NULL, lease_expires = NULL",
+                                  (DONE, rows))
+
+    def release(self, shard_id, worker, error):
+        """
+        Gives a shard back after a failure: it is queued again, or marked failed once it has
+        been attempted max_attempts times.
+        """
+        return self._update_lease(
+            shard_id, worker,
+            "status = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, lease_expires = NULL, error = ?",
+            (self.max_attempts, FAILED, PENDING, error))
+
+    def shards(self):
+        with self._transaction() as connection:
+            rows = connection.execute(
+                "SELECT shard_id, first_page, last_page, status, worker, attempts, rows, error FROM shards "
+                "ORDER BY shard_id").fetchall()
+        names = ('shard_id', 'first_page', 'last_page', 'status', 'worker', 'attempts', 'rows', 'error')
+        return [dict(zip(names, row)) for row in rows]
+
+    def progress(self):
+        """
+        Returns the number of shards in each status.
+        """
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for shard in self.shards():
+            counts[shard['status']] += 1
+        return counts
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so two workers cannot lease the same shard.
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.connection.close()
+
+def shard_path(shard_dir, shard_id):
+    return os.path.join(shard_dir, f"shard-{shard_id:05d}.parquet")
+
+def write_shard(df, shard_dir, shard_id):
+    """
+    Writes the raw records of one shard next to its final path and renames them into place,
+    so the merge step never reads a partial shard file.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    path = shard_path(shard_dir, shard_id)
+    fd, tmp_path = tempfile.mkstemp(dir=shard_dir, prefix='.tmp-', suffix='.parquet')
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, engine='pyarrow', index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+def reset_run(queue_path=QUEUE_PATH, shard_dir=SHARD_DIR):
+    """
+    Deletes the queue database and the shard files, so the next seed starts a fresh run.
+    """
+    for path in [queue_path, f"{queue_path}-journal"] + glob.glob(os.path.join(shard_dir, 'shard-*.parquet')):
+        if os.path.exists(path):
+            os.remove(path)
+
+def discover_last_page(session, base_url=BASE_URL):
+    """
+    Reads the last page from the pagination of page 1. Falls back to TOTAL_PAGES when the page
+    only links its neighbours, since the queue needs the whole page range up front.
+    """
+    response = session.get(build_page_url(1, base_url))
+    response.raise_for_status()
+    next_page, last_page = parse_pagination(response.text)
+    if last_page and last_page != next_page:
+        return last_page
+    return TOTAL_PAGES
+
+def _keep_lease(queue, shard_id, worker, stop):
+    while not stop.wait(queue.lease_seconds / 3):
+        if not queue.renew(shard_id, worker):
+            logger.warning(f"Worker {worker} lost its lease on shard {shard_id}")
+            return
+
+def run_worker(queue_path=QUEUE_PATH, shard_dir=SHARD_DIR, worker=None, lease_seconds=LEASE_SECONDS,
+               max_attempts=MAX_ATTEMPTS, max_workers=1, parser=DEFAULT_PARSER, base_url=BASE_URL):
+    """
+    Leases shards from the queue until none is left, scraping each shard's page range into
+    shard_dir/shard-<id>.parquet. The lease is renewed in the background while a shard is
+    scraped; a shard with failed pages is released for another attempt.
+    Returns the number of shards this worker completed.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    completed = 0
+    with PooledSession(headers=HEADERS, pool_maxsize=max(max_workers, 10)) as session:
+        while True:
+            shard = queue.lease(worker)
+            if shard is None:
+                break
+            shard_id = shard['shard_id']
+            stop = threading.Event()
+            keeper = threading.Thread(target=_keep_lease, args=(queue, shard_id, worker, stop), daemon=True)
+            keeper.start()
+            try:
+                page_errors = {}
+                records = []
+                for page, page_records in iter_pages(max_workers=max_workers, session=session, parser=parser,
+                                                     page_errors=page_errors, base_url=base_url,
+                                                     pages=range(shard['first_page'], shard['last_page'] + 1)):
+                    records.extend(page_records)
+                if page_errors:
+                    raise RuntimeError(f"{len(page_errors)} pages failed: {page_errors}")
+                if records:
+                    write_shard(pd.DataFrame(records), shard_dir, shard_id)
+                if queue.complete(shard_id, worker, len(records)):
+                    completed += 1
+                    logger.info(f"Worker {worker} completed shard {shard_id} "
+                                f"(pages {shard['first_page']}-{shard['last_page']}, {len(records)} records)")
+            except Exception as e:
+                logger.error(f"Worker {worker} failed shard {shard_id}: {str(e)}")
+                queue.release(shard_id, worker, str(e))
+            finally:
+                stop.set()
+                keeper.join()
+    return completed
+
+def run_workers(processes, queue_path=QUEUE_PATH, shard_dir=SHARD_DIR, **options):
+    """
+    Runs run_worker in the given number of local processes and waits for them.
+    Returns the queue progress afterwards.
+    """
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=run_worker, args=(queue_path, shard_dir), kwargs=options)
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    progress = WorkQueue(queue_path).progress()
+    logger.info(f"Workers finished: {progress}")
+    return progress
+
+def merge_shards(shard_dir=SHARD_DIR, queue_path=None):
+    """
+    Combines the shard files in page order, applies transform_data (which keeps the first row of
+    each Title) and returns the transformed DataFrame. With queue_path, warns about shards
+    that are not done.
+    """
+    try:
+        if queue_path:
+            progress = WorkQueue(queue_path).progress()
+            if progress[DONE] != sum(progress.values()):
+                logger.warning(f"Merging an incomplete run: {progress}")
+
+        paths = sorted(glob.glob(os.path.join(shard_dir, 'shard-*.parquet')))
+        if not paths:
+            raise ValueError(f"No shard files in {shard_dir}.")
+        df = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+        df = df.sort_values('page_number', kind='stable').reset_index(drop=True)
+        logger.info(f"Merged {len(paths)} shards into {len(df)} records")
+        return transform_data(df)
+
+    except Exception as e:
+        logger.error(f"Failed to merge shards: {str(e)}")
+        raise
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape the catalogue with workers sharing a SQLite work queue.")
+    parser.add_argument('--queue', default=QUEUE_PATH, help="queue database, on a shared mount for several machines")
+    parser.add_argument('--shards', default=SHARD_DIR, help="directory of the per-shard record files")
+    parser.add_argument('--base-url', default=BASE_URL)
+    commands = parser.add_subparsers(dest='command', required=True)
+    seed = commands.add_parser('seed', help="queue the catalogue's page ranges")
+    seed.add_argument('--pages', type=int, help="last page; read from the catalogue's pagination when omitted")
+    seed.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    work = commands.add_parser('work', help="lease and scrape shards until the queue is empty")
+    work.add_argument('--processes', type=int, default=1)
+    work.add_argument('--threads', type=int, default=4, help="fetch threads per process")
+    work.add_argument('--parser', default='lxml')
+    commands.add_parser('status', help="print every shard's status")
+    commands.add_parser('reset', help="delete the queue and the shard files")
+    merge = commands.add_parser('merge', help="merge and transform the shards into a CSV file")
+    merge.add_argument('--output', default='products.csv')
+    args = parser.parse_args(argv)
+
+    if args.command == 'seed':
+        last_page = args.pages
+        if last_page is None:
+            with PooledSession(headers=HEADERS) as session:
+                last_page = discover_last_page(session, args.base_url)
+        WorkQueue(args.queue).seed(last_page, args.shard_size)
+    elif args.command == 'work':
+        run_workers(args.processes, args.queue, args.shards, max_workers=args.threads, parser=args.parser,
+                    base_url=args.base_url)
+    elif args.command == 'status':
+        for shard in WorkQueue(args.queue).shards():
+            print(f"{shard['shard_id']:>5} pages {shard['first_page']}-{shard['last_page']}: {shard['status']} "
+                  f"(attempts {shard['attempts']}, rows {shard['rows']}, worker {shard['worker']}, error {shard['error']})")
+    elif args.command == 'reset':
+        reset_run(args.queue, args.shards)
+    else:
+        save_to_csv(merge_shards(args.shards, args.queue), args.output)
+
+if __name__ == '__main__':
+    main()